@@ -0,0 +1,279 @@
+# 🥉 Chargement Bronze : le CSV OWID est lu en flux, découpé en morceaux envoyés par COPY
+# en parallèle sur un pool de connexions ; un filigrane par pays limite chaque exécution
+# aux lignes nouvelles ou modifiées
+
+import csv
+import hashlib
+import io
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+
+BRONZE_SCHEMA, BRONZE_TABLE = "bronze", "covid_raw"
+DEFAULT_CHUNK_ROWS = 50000
+KEY_COLUMN, DATE_COLUMN = "iso_code", "date"
+# Empreinte d'un pays : somme des empreintes de ses lignes modulo 2^64 (indépendante de l'ordre du fichier)
+HASH_MODULUS = 1 << 64
+
+# Filigrane d'un pays : dernière date chargée, nombre de lignes et empreinte de ces lignes
+Watermark = namedtuple("Watermark", ("max_date", "row_count", "history_hash"))
+
+
+def row_hash(row):
+    digest = hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class CountryPlan:
+    """
+    Lignes d'un pays dans le fichier source, comparées à son filigrane :
+    - "new" : pays jamais chargé, toutes ses lignes sont chargées
+    - "append" : historique identique, seules les dates après le filigrane sont chargées
+    - "reload" : une ligne déjà chargée a été révisée à la source, le pays est rechargé
+    """
+
+    def __init__(self, watermark=None):
+        self.watermark = watermark
+        self.rows = 0
+        self.digest = 0
+        self.min_date = ""
+        self.max_date = ""
+        # Lignes jusqu'à la date du filigrane, à comparer à ce qui a été chargé
+        self.history_rows = 0
+        self.history_digest = 0
+
+    def add(self, date, digest):
+        self.rows += 1
+        self.digest = (self.digest + digest) % HASH_MODULUS
+        self.min_date = min(self.min_date or date, date)
+        self.max_date = max(self.max_date, date)
+        if self.watermark is not None and date <= self.watermark.max_date:
+            self.history_rows += 1
+            self.history_digest = (self.history_digest + digest) % HASH_MODULUS
+
+    @property
+    def mode(self):
+        if self.watermark is None:
+            return "new"
+        if (self.history_rows, self.history_digest) != (self.watermark.row_count, self.watermark.history_hash):
+            return "reload"
+        return "append"
+
+    def selects(self, date):
+        """La ligne datée `date` est-elle à charger ?"""
+        return self.mode != "append" or date > self.watermark.max_date
+
+    @property
+    def pending_rows(self):
+        return self.rows - self.history_rows if self.mode == "append" else self.rows
+
+    def new_watermark(self):
+        return Watermark(self.max_date, self.rows, self.digest)
+
+
+def read_header(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise ValueError(f"{path} : fichier CSV vide")
+    missing = [c for c in (KEY_COLUMN, DATE_COLUMN) if c not in header]
+    if missing:
+        raise ValueError(f"{path} : colonnes manquantes {', '.join(missing)}")
+    return header
+
+
+def _source_rows(path, header):
+    """(clé pays, date ISO, ligne) par ligne du fichier ; clé None pour une ligne inexploitable
+    (sans pays, sans date ou avec un nombre de colonnes incorrect), que le chargement ignore."""
+    key, date = header.index(KEY_COLUMN), header.index(DATE_COLUMN)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if len(row) == len(header) and row[key] and row[date]:
+                yield row[key], row[date], row
+            else:
+                yield None, None, row
+
+
+def plan_countries(path, header, watermarks):
+    """Premier passage sur le fichier : empreintes et dates par pays, sans rien garder des lignes."""
+    plans, skipped = {}, 0
+    for key, date, row in _source_rows(path, header):
+        if key is None:
+            skipped += 1
+            continue
+        plan = plans.get(key)
+        if plan is None:
+            plan = plans[key] = CountryPlan(watermarks.get(key))
+        plan.add(date, row_hash(row))
+    if skipped:
+        logger.warning("%d lignes ignorées (iso_code ou date manquant, ou nombre de colonnes incorrect)", skipped)
+    return plans
+
+
+def iter_chunks(path, header, columns, plans, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Second passage : morceaux CSV de `chunk_rows` lignes à charger, limités aux colonnes de la table."""
+    positions = [header.index(c) for c in columns]
+    buffer, writer, n_rows = None, None, 0
+    for key, date, row in _source_rows(path, header):
+        if key is None or not plans[key].selects(date):
+            continue
+        if buffer is None:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow([row[i] for i in positions])
+        n_rows += 1
+        if n_rows == chunk_rows:
+            yield buffer.getvalue(), n_rows
+            buffer, n_rows = None, 0
+    if n_rows:
+        yield buffer.getvalue(), n_rows
+
+
+def fetch_columns(conn):
+    rows = conn.execute(
+        "SELECT column_name FROM information_schema.columns"
+        " WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position",
+        (BRONZE_SCHEMA, BRONZE_TABLE),
+    ).fetchall()
+    return [name for (name,) in rows]
+
+
+def fetch_watermarks(conn):
+    rows = conn.execute("SELECT iso_code, max_date, row_count, history_hash FROM bronze.load_watermark").fetchall()
+    return {
+        iso_code: Watermark(max_date.isoformat(), row_count, int(history_hash, 16))
+        for iso_code, max_date, row_count, history_hash in rows
+    }
+
+
+def prepare_targets(conn, plans):
+    """
+    Supprime les lignes qui vont être rechargées : pays nouveaux ou révisés en entier, dates
+    après le filigrane pour les autres (restes d'une exécution interrompue). Une exécution
+    peut donc être relancée sans créer de doublons.
+    """
+    rewrite = [key for key, plan in plans.items() if plan.mode != "append"]
+    append = [key for key, plan in plans.items() if plan.mode == "append"]
+    deleted = 0
+    if rewrite:
+        deleted += conn.execute("DELETE FROM bronze.covid_raw WHERE iso_code = ANY(%s)", (rewrite,)).rowcount
+    if append:
+        deleted += conn.execute(
+            "DELETE FROM bronze.covid_raw b USING bronze.load_watermark w"
+            " WHERE b.iso_code = w.iso_code AND b.date > w.max_date AND w.iso_code = ANY(%s)",
+            (append,),
+        ).rowcount
+    return deleted
+
+
+def ensure_partitions(conn, plans):
+    """Crée les partitions mensuelles de bronze.covid_raw manquantes pour les dates du fichier
+    (scripts/01_partitions.sql) : COPY refuse une ligne qui ne tombe dans aucune partition."""
+    if not plans:
+        return 0
+    first = min(plan.min_date for plan in plans.values())
+    last = max(plan.max_date for plan in plans.values())
+    (created,) = conn.execute(
+        "SELECT public.ensure_month_partitions('bronze.covid_raw', %s::date, %s::date)", (first, last)
+    ).fetchone()
+    if created:
+        logger.info("%d partitions mensuelles créées entre %s et %s", created, first, last)
+    return created
+
+
+def save_watermarks(conn, plans):
+    rows = []
+    for key, plan in plans.items():
+        watermark = plan.new_watermark()
+        rows.append((key, watermark.max_date, watermark.row_count, format(watermark.history_hash, "016x")))
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO bronze.load_watermark (iso_code, max_date, row_count, history_hash, loaded_at)"
+            " VALUES (%s, %s, %s, %s, now())"
+            " ON CONFLICT (iso_code) DO UPDATE SET max_date = EXCLUDED.max_date,"
+            " row_count = EXCLUDED.row_count, history_hash = EXCLUDED.history_hash, loaded_at = EXCLUDED.loaded_at",
+            rows,
+        )
+
+
+def copy_chunk(pool, statement, data):
+    """Un morceau par connexion du pool, validé dès qu'il est écrit (verrous courts)."""
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            with cur.copy(statement) as copy:
+                copy.write(data)
+
+
+def copy_parallel(pool, statement, chunks, workers):
+    """Envoie les morceaux sur `workers` connexions ; au plus 2 morceaux en attente par worker en mémoire."""
+    pending = threading.BoundedSemaphore(workers * 2)
+    futures, loaded = [], 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bronze-copy") as executor:
+        for data, n_rows in chunks:
+            pending.acquire()
+            future = executor.submit(copy_chunk, pool, statement, data)
+            future.add_done_callback(lambda _: pending.release())
+            futures.append(future)
+            loaded += n_rows
+        for future in futures:
+            future.result()  # relance la première erreur d'un worker
+    return loaded, len(futures)
+
+
+def load_bronze(pool, path, workers=4, chunk_rows=DEFAULT_CHUNK_ROWS, full=False):
+    """
+    Charge `path` dans bronze.covid_raw et renvoie les statistiques de l'exécution.
+
+    Sans `full`, seules les lignes nouvelles ou modifiées depuis le dernier chargement sont
+    envoyées (voir CountryPlan) ; les pays absents du fichier ne sont pas touchés. Avec
+    `full`, la table et les filigranes sont vidés puis tout le fichier est chargé.
+    Les filigranes ne sont enregistrés qu'une fois tous les morceaux chargés.
+    """
+    started = time.perf_counter()
+    header = read_header(path)
+    with pool.connection() as conn:
+        table_columns = fetch_columns(conn)
+        watermarks = {} if full else fetch_watermarks(conn)
+    if not table_columns:
+        raise ValueError("Table bronze.covid_raw introuvable (exécuter scripts/bronze/schema_bronze.sql)")
+    columns = [c for c in header if c in table_columns]
+    ignored = [c for c in header if c not in table_columns]
+    if ignored:
+        logger.warning("Colonnes absentes de bronze.covid_raw, ignorées : %s", ", ".join(ignored))
+
+    plans = plan_countries(path, header, watermarks)
+    modes = {mode: sum(1 for p in plans.values() if p.mode == mode) for mode in ("new", "append", "reload")}
+    planned = time.perf_counter()
+    logger.info("Plan : %d pays (%s), %d lignes à charger en %.1f s", len(plans), modes,
+                sum(p.pending_rows for p in plans.values()), planned - started)
+
+    with pool.connection() as conn:
+        if full:
+            conn.execute("TRUNCATE bronze.covid_raw")
+            conn.execute("TRUNCATE bronze.load_watermark")
+            deleted = 0
+        else:
+            deleted = prepare_targets(conn, plans)
+        ensure_partitions(conn, plans)
+
+    statement = sql.SQL("COPY bronze.covid_raw ({}) FROM STDIN (FORMAT csv, NULL '')").format(
+        sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    loaded, n_chunks = copy_parallel(pool, statement, iter_chunks(path, header, columns, plans, chunk_rows), workers)
+
+    with pool.connection() as conn:
+        save_watermarks(conn, plans)
+    stats = {
+        "countries": modes, "deleted": deleted, "loaded": loaded, "chunks": n_chunks,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info("Bronze chargé : %s", stats)
+    return stats
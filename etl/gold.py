@@ -0,0 +1,47 @@
+# 🥇 Chargement Gold : upsert des dimensions puis des faits pour les jours après le filigrane
+# de chaque pays (ou à partir d'une date donnée), puis rafraîchissement des agrégats, avec les
+# statistiques de chaque étape
+
+import logging
+import time
+
+from db import call_stages
+
+logger = logging.getLogger(__name__)
+
+GOLD_FUNCTIONS = ("gold.load_dimensions", "gold.load_fact")
+# Vues matérialisées recalculées après les faits (scripts/gold/aggregates.sql)
+REFRESH_FUNCTION = "gold.refresh_aggregates"
+
+
+def load_gold(pool, date_from=None, countries=None, refresh=True):
+    """
+    Charge silver.covid_cleaned_final dans le schéma en étoile gold.
+
+    Sans `date_from`, seuls les jours après le filigrane gold.load_watermark de chaque pays
+    sont lus ; avec `date_from`, toutes les dates à partir de celle-ci sont rechargées (après
+    une révision de la couche silver). `countries` limite le chargement à ces iso_code.
+    Dimensions et faits sont chargés dans une même transaction, ouverte explicitement ; les
+    agrégats par pays et par période sont ensuite rafraîchis (REFRESH ... CONCURRENTLY, sans
+    bloquer les lectures de l'API) sur une autre connexion, sauf si `refresh` est faux.
+    Renvoie les statistiques par étape.
+    """
+    started = time.perf_counter()
+    countries = list(countries) if countries else None
+    stages = {}
+    with pool.connection() as conn, conn.transaction():
+        for function in GOLD_FUNCTIONS:
+            stages.update(call_stages(conn, function, (date_from, countries)))
+    if refresh:
+        stages.update(refresh_aggregates(pool))
+    logger.info("Gold chargé en %.2f s", time.perf_counter() - started)
+    return stages
+
+
+def refresh_aggregates(pool):
+    """
+    Recalcule gold.mv_country_period (toutes les granularités) sur sa propre connexion, après la
+    validation des faits : le rafraîchissement n'allonge pas la transaction du chargement.
+    """
+    with pool.connection() as conn:
+        return call_stages(conn, REFRESH_FUNCTION, ())
@@ -0,0 +1,73 @@
+# 🏭 Exécution de l'ETL depuis Python, étape par étape
+#
+#   python run_etl.py bronze datasets/model_covid19_data.csv            # lignes nouvelles ou modifiées
+#   python run_etl.py bronze datasets/model_covid19_data.csv --full     # rechargement complet
+#   python run_etl.py silver --from 2024-01-01 --countries FRA,DEU      # nettoyage d'une période
+#   python run_etl.py gold                                              # jours après le filigrane
+#
+# Base : ETL_DATABASE_URL (défaut : la base du docker-compose)
+
+import argparse
+import logging
+import sys
+from datetime import date
+
+from bronze import DEFAULT_CHUNK_ROWS, load_bronze
+from db import connection_pool, dsn_from_env
+from gold import load_gold
+from silver import clean_silver
+
+
+def run_bronze(pool, args):
+    return load_bronze(pool, args.source, workers=args.workers, chunk_rows=args.chunk_rows, full=args.full)
+
+
+def run_silver(pool, args):
+    return clean_silver(pool, args.date_from, args.date_to, args.countries)
+
+
+def run_gold(pool, args):
+    return load_gold(pool, args.date_from, args.countries, refresh=not args.no_refresh)
+
+
+def country_list(value):
+    return [code.strip() for code in value.split(",") if code.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Étapes de l'ETL COVID-19 (bronze, silver, gold)")
+    parser.add_argument("--dsn", default=None, help="Chaîne de connexion PostgreSQL (défaut : ETL_DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=4, help="Connexions COPY en parallèle")
+    stages = parser.add_subparsers(dest="stage", required=True)
+
+    bronze = stages.add_parser("bronze", help="Charge le CSV OWID dans bronze.covid_raw")
+    bronze.add_argument("source", help="Fichier CSV source")
+    bronze.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Lignes par COPY")
+    bronze.add_argument("--full", action="store_true", help="Vide la table et recharge tout le fichier")
+    bronze.set_defaults(run=run_bronze)
+
+    silver = stages.add_parser("silver", help="Nettoie bronze.covid_raw vers silver (tout, ou une période / des pays)")
+    silver.add_argument("--from", dest="date_from", type=date.fromisoformat, help="Première date (AAAA-MM-JJ)")
+    silver.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Dernière date (AAAA-MM-JJ)")
+    silver.add_argument("--countries", type=country_list, help="Codes iso_code séparés par des virgules")
+    silver.set_defaults(run=run_silver)
+
+    gold = stages.add_parser("gold", help="Charge les dimensions et les faits gold (jours après le filigrane)")
+    gold.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                      help="Recharge toutes les dates à partir de celle-ci (AAAA-MM-JJ)")
+    gold.add_argument("--countries", type=country_list, help="Codes iso_code séparés par des virgules")
+    gold.add_argument("--no-refresh", action="store_true", help="Ne rafraîchit pas les agrégats gold.mv_country_period")
+    gold.set_defaults(run=run_gold)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    with connection_pool(args.dsn or dsn_from_env(), args.workers) as pool:
+        args.run(pool, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
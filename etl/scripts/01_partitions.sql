@@ -0,0 +1,113 @@
+/*
+ Gestion des partitions mensuelles (à exécuter avant les schémas bronze, silver et gold)
+
+ bronze.covid_raw, silver.covid_cleaned et gold.fact_covid_metrics sont partitionnées par mois
+ (PARTITION BY RANGE sur leur date) : une requête bornée dans le temps ne lit que les mois
+ concernés, et un rafraîchissement remplace des partitions entières au lieu de supprimer
+ ligne à ligne dans tout l'historique.
+
+ - public.month_partition(table, mois) : nom de la partition d'un mois, ex. covid_raw_p202103
+ - public.ensure_month_partitions(table, début, fin) : crée les partitions manquantes
+ - public.build_month_partition(table, mois, source) : reconstruit un mois dans une table à part
+   (<partition>_new), sans toucher à la table partitionnée
+ - public.swap_month_partition(table, mois) : détache et supprime l'ancienne partition, puis
+   attache la table reconstruite à sa place
+
+ DETACH et ATTACH prennent un verrou ACCESS EXCLUSIVE sur la table partitionnée, gardé jusqu'à la
+ fin de la transaction : un appelant construit d'abord tous ses mois, puis les échange tous en une
+ dernière étape courte, juste avant de valider.
+*/
+
+DROP FUNCTION IF EXISTS public.replace_month_partition(REGCLASS, DATE, REGCLASS, TEXT);
+
+CREATE OR REPLACE FUNCTION public.month_partition(p_parent REGCLASS, p_month DATE)
+RETURNS TEXT AS $$
+    SELECT format('%I.%I', n.nspname, c.relname || '_p' || to_char(p_month, 'YYYYMM'))
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = p_parent;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION public.ensure_month_partitions(p_parent REGCLASS, p_from DATE, p_to DATE)
+RETURNS INT AS $$
+DECLARE
+    month_start DATE;
+    created INT := 0;
+BEGIN
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN 0;
+    END IF;
+    FOR month_start IN
+        SELECT generate_series(date_trunc('month', p_from), date_trunc('month', p_to), INTERVAL '1 month')::DATE
+    LOOP
+        IF to_regclass(public.month_partition(p_parent, month_start)) IS NULL THEN
+            EXECUTE format('CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                public.month_partition(p_parent, month_start), p_parent,
+                month_start, (month_start + INTERVAL '1 month')::DATE);
+            created := created + 1;
+        END IF;
+    END LOOP;
+    IF created > 0 THEN
+        RAISE NOTICE '🗂️ % : % partition(s) créée(s) entre % et %', p_parent, created, p_from, p_to;
+    END IF;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.build_month_partition(
+    p_parent REGCLASS,
+    p_month DATE,
+    p_source REGCLASS,
+    p_key TEXT DEFAULT 'date'
+)
+RETURNS BIGINT AS $$
+DECLARE
+    lower_bound DATE := date_trunc('month', p_month)::DATE;
+    upper_bound DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    parts TEXT[] := parse_ident(public.month_partition(p_parent, p_month));
+    staging TEXT := format('%I.%I', parts[1], parts[2] || '_new');
+    col_list TEXT;
+    n BIGINT;
+BEGIN
+    /*
+        Les lignes du mois sont lues dans p_source (vue ou table ayant les colonnes de p_parent)
+        et écrites dans une table à part, sans index : p_parent n'est pas verrouillée et
+        l'ancienne partition reste lisible. La contrainte CHECK sur les bornes évite à ATTACH de
+        relire la table pour les vérifier ; les index de p_parent sont construits à l'attachement.
+    */
+    SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum) INTO col_list
+    FROM pg_attribute a
+    WHERE a.attrelid = p_source AND a.attnum > 0 AND NOT a.attisdropped;
+
+    EXECUTE format('DROP TABLE IF EXISTS %s', staging);
+    EXECUTE format('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)', staging, p_parent);
+    EXECUTE format('INSERT INTO %s (%s) SELECT %s FROM %s WHERE %I >= $1 AND %I < $2',
+        staging, col_list, col_list, p_source, p_key, p_key)
+        USING lower_bound, upper_bound;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    EXECUTE format('ALTER TABLE %s ADD CONSTRAINT %I CHECK (%I IS NOT NULL AND %I >= %L AND %I < %L)',
+        staging, parts[2] || '_new_bounds', p_key, p_key, lower_bound, p_key, upper_bound);
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.swap_month_partition(p_parent REGCLASS, p_month DATE)
+RETURNS VOID AS $$
+DECLARE
+    lower_bound DATE := date_trunc('month', p_month)::DATE;
+    upper_bound DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    parts TEXT[] := parse_ident(public.month_partition(p_parent, p_month));
+    partition_name TEXT := format('%I.%I', parts[1], parts[2]);
+    staging TEXT := format('%I.%I', parts[1], parts[2] || '_new');
+BEGIN
+    -- Verrou ACCESS EXCLUSIVE sur p_parent jusqu'à la fin de la transaction : les lectures attendent
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE %s DETACH PARTITION %s', p_parent, partition_name);
+        EXECUTE format('DROP TABLE %s', partition_name);
+    END IF;
+    EXECUTE format('ALTER TABLE %s RENAME TO %I', staging, parts[2]);
+    EXECUTE format('ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%L) TO (%L)',
+        p_parent, partition_name, lower_bound, upper_bound);
+    EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', partition_name, parts[2] || '_new_bounds');
+END;
+$$ LANGUAGE plpgsql;
@@ -2,6 +2,9 @@
  * Script to load data into the Bronze layer of the COVID-19 data warehouse.
  * This script truncates the existing table and loads new data from a CSV file.
  * Ensure that the CSV file path is correctly set before running this script.
+ *
+ * Rechargement complet : pour les rafraîchissements réguliers, préférer le chargement
+ * incrémental et parallèle `python run_etl.py bronze <fichier.csv>` (voir ETL.md).
  */
 
 
@@ -17,14 +20,16 @@ BEGIN
     start_time := clock_timestamp();
     
     -- Étape 1 : Vider la table
-    RAISE NOTICE 'Troncature de la table : bronze.covid_data';
-    TRUNCATE TABLE bronze.covid_data;
+    RAISE NOTICE 'Troncature de la table : bronze.covid_raw';
+    TRUNCATE TABLE bronze.covid_raw;
+    -- Les filigranes du chargement incrémental ne correspondent plus à la table
+    TRUNCATE TABLE bronze.load_watermark;
 
     -- Étape 2 : Chargement CSV
-    RAISE NOTICE 'Chargement du fichier CSV vers la table bronze.covid_data';
+    RAISE NOTICE 'Chargement du fichier CSV vers la table bronze.covid_raw';
 
     -- Remplace ce chemin par le chemin réel depuis le serveur PostgreSQL
-    COPY bronze.covid_data
+    COPY bronze.covid_raw
     FROM 'C:\Users\wamba\Desktop\python\mspr2\etl\datasets\model_covid19_data.csv'
     WITH (
         FORMAT csv,
@@ -46,6 +51,6 @@ END $$;
 
 /*
 Si le dataset n'est pas sur un serveur PostgreSQL, Utilisez la cmd suivante dans votre terminal pour charger le fichier CSV :
-psql -U <username> -d model_covid19_data -c "\copy bronze.covid_data FROM 'C:\Users\wamba\Desktop\python\mspr2\etl\datasets\model_covid19_data.csv' WITH (FORMAT csv, HEADER true, DELIMITER ',', NULL '', ENCODING 'UTF8')"
+psql -U <username> -d model_covid19_data -c "\copy bronze.covid_raw FROM 'C:\Users\wamba\Desktop\python\mspr2\etl\datasets\model_covid19_data.csv' WITH (FORMAT csv, HEADER true, DELIMITER ',', NULL '', ENCODING 'UTF8')"
 Rassurez-vous de remplacer `<username>` par votre nom d'utilisateur PostgreSQL.
 */
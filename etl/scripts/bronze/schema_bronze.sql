@@ -3,8 +3,9 @@
  Ce script crée la table `bronze.covid_raw` avec les colonnes nécessaires pour stocker les données brutes de COVID-19.
 */
 
--- Supprime la table si elle existe déjà
-DROP TABLE IF EXISTS bronze.covid_raw;
+-- Supprime la table (et ses partitions) si elle existe déjà, ainsi que la vue
+-- silver.covid_cleaned_source qui en dépend (recréée par cleaner_load_silver.sql)
+DROP TABLE IF EXISTS bronze.covid_raw CASCADE;
 
 -- Création de la table bronze.covid_raw
 CREATE TABLE bronze.covid_raw (
@@ -75,4 +76,23 @@ CREATE TABLE bronze.covid_raw (
     excess_mortality_cumulative DOUBLE PRECISION,
     excess_mortality DOUBLE PRECISION,
     excess_mortality_cumulative_per_million DOUBLE PRECISION
+) PARTITION BY RANGE (date);
+
+-- Une partition par mois (scripts/01_partitions.sql) ; les chargements créent celles qui manquent
+SELECT public.ensure_month_partitions('bronze.covid_raw', DATE '2020-01-01', CURRENT_DATE);
+
+-- Clé naturelle (dédoublonnage silver, suppression par pays) et recherche par période
+CREATE INDEX covid_raw_key_idx ON bronze.covid_raw (iso_code, location, date);
+CREATE INDEX covid_raw_date_idx ON bronze.covid_raw (date);
+
+-- Filigranes du chargement incrémental (run_etl.py bronze) : par pays, dernière date chargée,
+-- nombre de lignes et empreinte de ces lignes (une révision de l'historique recharge le pays)
+DROP TABLE IF EXISTS bronze.load_watermark;
+
+CREATE TABLE bronze.load_watermark (
+    iso_code TEXT PRIMARY KEY,
+    max_date DATE NOT NULL,
+    row_count BIGINT NOT NULL,
+    history_hash TEXT NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
@@ -0,0 +1,71 @@
+/*
+ Agrégats gold par pays et par période (semaine, mois) pour les tableaux de bord
+
+ gold.mv_country_period contient une ligne par (granularity, iso_code, period_start) : cas et décès
+ de la période, cumuls en fin de période, vaccination et indice de restriction (stringency). L'API
+ (ml/warehouse.py) la lit par clé (iso_code, period_start) sans parcourir gold.fact_covid_metrics.
+
+ gold.refresh_aggregates() la recalcule avec REFRESH MATERIALIZED VIEW CONCURRENTLY (les lectures ne
+ sont pas bloquées, ce qui exige l'index unique ci-dessous) ; run_etl.py gold l'appelle après chaque
+ chargement des faits.
+*/
+
+DROP FUNCTION IF EXISTS gold.refresh_aggregates();
+DROP MATERIALIZED VIEW IF EXISTS gold.mv_country_period;
+
+CREATE MATERIALIZED VIEW gold.mv_country_period AS
+SELECT
+    g.granularity,
+    c.iso_code,
+    c.country,
+    c.continent,
+    date_trunc(g.granularity, f.full_date::TIMESTAMP)::DATE AS period_start,
+    COUNT(*)::INT AS days,
+
+    -- 🦠 Cas et décès : somme de la période, cumul atteint en fin de période
+    SUM(f.new_cases) AS new_cases,
+    SUM(f.new_deaths) AS new_deaths,
+    MAX(f.total_cases) AS total_cases,
+    MAX(f.total_deaths) AS total_deaths,
+    SUM(f.new_cases_per_million) AS new_cases_per_million,
+    SUM(f.new_deaths_per_million) AS new_deaths_per_million,
+
+    -- 💉 Vaccination : cumuls en fin de période
+    MAX(v.total_vaccinations) AS total_vaccinations,
+    MAX(v.people_vaccinated) AS people_vaccinated,
+    MAX(v.people_fully_vaccinated) AS people_fully_vaccinated,
+    MAX(v.total_boosters) AS total_boosters,
+
+    -- 🚧 Mesures sanitaires : moyenne et maximum de l'indice sur la période
+    AVG(f.stringency_index) AS stringency_index_avg,
+    MAX(f.stringency_index) AS stringency_index_max
+FROM gold.fact_covid_metrics f
+CROSS JOIN (VALUES ('week'), ('month')) AS g (granularity)
+JOIN gold.dim_country c ON c.country_id = f.country_id
+LEFT JOIN gold.dim_vaccination v ON v.vaccination_id = f.vaccination_id
+GROUP BY g.granularity, c.iso_code, c.country, c.continent, date_trunc(g.granularity, f.full_date::TIMESTAMP);
+
+-- Clé de la pagination de l'API (et prérequis de REFRESH ... CONCURRENTLY)
+CREATE UNIQUE INDEX mv_country_period_key ON gold.mv_country_period (granularity, iso_code, period_start);
+-- Lecture d'une période pour tous les pays
+CREATE INDEX mv_country_period_period_idx ON gold.mv_country_period (granularity, period_start);
+
+CREATE OR REPLACE FUNCTION gold.refresh_aggregates()
+RETURNS TABLE (stage TEXT, row_count BIGINT, seconds NUMERIC) AS $$
+DECLARE
+    started TIMESTAMP;
+BEGIN
+    started := clock_timestamp();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gold.mv_country_period;
+    SELECT COUNT(*) INTO row_count FROM gold.mv_country_period;
+    stage := 'gold.mv_country_period';
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vérification rapide
+SELECT granularity, COUNT(*) AS lignes, MIN(period_start) AS debut, MAX(period_start) AS fin
+FROM gold.mv_country_period
+GROUP BY granularity;
@@ -1,29 +1,72 @@
 -- Supprimer la fonction si elle existe
 DROP FUNCTION IF EXISTS gold.load_dimensions();
+DROP FUNCTION IF EXISTS gold.load_dimensions(DATE, TEXT[]);
 
 -- Créer la fonction de chargement des dimensions
-CREATE OR REPLACE FUNCTION gold.load_dimensions()
-RETURNS void AS $$
+CREATE OR REPLACE FUNCTION gold.load_dimensions(
+    p_from DATE DEFAULT NULL,
+    p_countries TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (stage TEXT, row_count BIGINT, seconds NUMERIC) AS $$
+DECLARE
+    started TIMESTAMP;
+    n BIGINT;
 BEGIN
-    -- 1. Remplissage de dim_country
+    /*
+        Lignes lues dans silver.covid_cleaned_final :
+        - sans p_from : pour chaque pays, les dates après son filigrane gold.load_watermark
+          (toutes pour un pays jamais chargé) ; un rafraîchissement quotidien ne lit que les nouveaux jours
+        - avec p_from : toutes les dates à partir de p_from (rattrapage après une révision silver)
+        - p_countries limite le chargement à ces iso_code
+
+        Chaque insertion est un upsert sur la clé naturelle (index uniques de schema_table_dim_fait.sql) :
+        la fonction peut être relancée sans créer de doublons.
+    */
+
+    -- 1. Remplissage de dim_country (valeurs de la date la plus récente de chaque pays)
+    started := clock_timestamp();
     INSERT INTO gold.dim_country (iso_code, country, continent, population)
-    SELECT DISTINCT
-        iso_code,
-        country,
-        continent,
-        population
-    FROM silver.covid_cleaned_final;
+    SELECT DISTINCT ON (s.iso_code)
+        s.iso_code,
+        s.country,
+        s.continent,
+        s.population
+    FROM silver.covid_cleaned_final s
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+    ORDER BY s.iso_code, s.date DESC
+    ON CONFLICT (iso_code) DO UPDATE
+    SET country = EXCLUDED.country, continent = EXCLUDED.continent, population = EXCLUDED.population
+    WHERE (gold.dim_country.country, gold.dim_country.continent, gold.dim_country.population)
+        IS DISTINCT FROM (EXCLUDED.country, EXCLUDED.continent, EXCLUDED.population);
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'gold.dim_country'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
     -- 2. Remplissage de dim_date
+    started := clock_timestamp();
     INSERT INTO gold.dim_date (full_date, year, month, day)
     SELECT DISTINCT
-        date AS full_date,
-        EXTRACT(YEAR FROM date)::INT,
-        EXTRACT(MONTH FROM date)::INT,
-        EXTRACT(DAY FROM date)::INT
-    FROM silver.covid_cleaned_final;
+        s.date AS full_date,
+        EXTRACT(YEAR FROM s.date)::INT,
+        EXTRACT(MONTH FROM s.date)::INT,
+        EXTRACT(DAY FROM s.date)::INT
+    FROM silver.covid_cleaned_final s
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+    ON CONFLICT (full_date) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'gold.dim_date'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
     -- 3. Remplissage de dim_economic
+    started := clock_timestamp();
     INSERT INTO gold.dim_economic (country_id, gdp_per_capita, human_development_index, life_expectancy, extreme_poverty)
     SELECT DISTINCT
         c.country_id,
@@ -32,9 +75,19 @@ BEGIN
         s.life_expectancy,
         s.extreme_poverty
     FROM silver.covid_cleaned_final s
-    JOIN gold.dim_country c ON c.iso_code = s.iso_code;
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    JOIN gold.dim_country c ON c.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+    ON CONFLICT (country_id, gdp_per_capita, human_development_index, life_expectancy, extreme_poverty) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'gold.dim_economic'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
     -- 4. Remplissage de dim_health
+    started := clock_timestamp();
     INSERT INTO gold.dim_health (
         country_id, hospital_beds_per_thousand, median_age,
         aged_65_older, aged_70_older, reproduction_rate,
@@ -50,9 +103,22 @@ BEGIN
         s.icu_patients,
         s.hosp_patients
     FROM silver.covid_cleaned_final s
-    JOIN gold.dim_country c ON c.iso_code = s.iso_code;
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    JOIN gold.dim_country c ON c.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+    ON CONFLICT (
+        country_id, hospital_beds_per_thousand, median_age, aged_65_older, aged_70_older,
+        reproduction_rate, icu_patients, hosp_patients
+    ) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'gold.dim_health'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
     -- 5. Remplissage de dim_vaccination
+    started := clock_timestamp();
     INSERT INTO gold.dim_vaccination (
         country_id, total_vaccinations, people_vaccinated,
         people_fully_vaccinated, total_boosters,
@@ -70,11 +136,24 @@ BEGIN
         s.new_people_vaccinated_smoothed,
         s.new_people_vaccinated_smoothed_per_hundred
     FROM silver.covid_cleaned_final s
-    JOIN gold.dim_country c ON c.iso_code = s.iso_code;
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    JOIN gold.dim_country c ON c.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+    ON CONFLICT (
+        country_id, total_vaccinations, people_vaccinated, people_fully_vaccinated, total_boosters,
+        new_vaccinations_smoothed, new_vaccinations_smoothed_per_million,
+        new_people_vaccinated_smoothed, new_people_vaccinated_smoothed_per_hundred
+    ) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'gold.dim_vaccination'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
-    RAISE NOTICE '✅ Chargement des dimensions terminé avec succès (2025-06-09).';
+    RAISE NOTICE '✅ Chargement des dimensions terminé avec succès.';
 END;
 $$ LANGUAGE plpgsql;
 
--- Exécuter la fonction
-SELECT gold.load_dimensions();
+-- Exécuter la fonction (dates après le filigrane de chaque pays)
+SELECT * FROM gold.load_dimensions();
@@ -1,79 +1,166 @@
 -- Supprimer ancienne version si elle existe
 DROP FUNCTION IF EXISTS gold.load_fact();
+DROP FUNCTION IF EXISTS gold.load_fact(DATE, TEXT[]);
 
 -- Créer la fonction de chargement des faits
-CREATE OR REPLACE FUNCTION gold.load_fact()
-RETURNS void AS $$
+CREATE OR REPLACE FUNCTION gold.load_fact(
+    p_from DATE DEFAULT NULL,
+    p_countries TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (stage TEXT, row_count BIGINT, seconds NUMERIC) AS $$
+DECLARE
+    started TIMESTAMP;
+    n BIGINT;
+    marks BIGINT;
 BEGIN
     /*
         ==============================================
-        FONCTION : gold.load_fact()
+        FONCTION : gold.load_fact(p_from, p_countries)
         ==============================================
         Objectif :
         - Mapper chaque ligne de silver.covid_cleaned_final aux dimensions créées
         - Insérer les métriques principales dans la table de faits gold.fact_covid_metrics
+        - Avancer le filigrane gold.load_watermark des pays chargés
 
         Contraintes :
-        - Utilise des jointures sur iso_code + country + date pour retrouver les IDs
+        - Mêmes lignes que gold.load_dimensions(p_from, p_countries) : dates après le filigrane
+          de chaque pays, ou à partir de p_from
+        - Un fait par (pays, date) : upsert sur fact_covid_metrics_country_date_key, rejouable
+        - Les partitions mensuelles manquantes sont créées avant l'insertion
+        - Jointures sur iso_code + date, et sur les valeurs du jour pour les dimensions par pays
+          (auparavant, la jointure sur country_id seul multipliait chaque ligne)
         - Requiert que toutes les dimensions aient été chargées avant appel
     */
 
-    INSERT INTO gold.fact_covid_metrics (
-        country_id,
-        date_id,
-        economic_id,
-        health_id,
-        vaccination_id,
+    -- Partitions mensuelles des jours à charger
+    PERFORM public.ensure_month_partitions('gold.fact_covid_metrics', MIN(s.date), MAX(s.date))
+    FROM silver.covid_cleaned_final s
+    LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+    WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+      AND (p_countries IS NULL OR s.iso_code = ANY(p_countries));
 
-        total_cases,
-        new_cases,
-        total_deaths,
-        new_deaths,
+    started := clock_timestamp();
+    WITH loaded AS (
+        INSERT INTO gold.fact_covid_metrics (
+            country_id,
+            date_id,
+            economic_id,
+            health_id,
+            vaccination_id,
 
-        total_tests,
-        positive_rate,
-        tests_per_case,
+            total_cases,
+            new_cases,
+            total_deaths,
+            new_deaths,
 
-        total_cases_per_million,
-        new_cases_per_million,
-        total_deaths_per_million,
-        new_deaths_per_million,
+            total_tests,
+            positive_rate,
+            tests_per_case,
 
-        excess_mortality
-    )
-    SELECT
-        dc.country_id,
-        dd.date_id,
-        de.economic_id,
-        dh.health_id,
-        dv.vaccination_id,
+            total_cases_per_million,
+            new_cases_per_million,
+            total_deaths_per_million,
+            new_deaths_per_million,
 
-        s.total_cases,
-        s.new_cases,
-        s.total_deaths,
-        s.new_deaths,
+            excess_mortality,
 
-        s.total_tests,
-        s.positive_rate,
-        s.tests_per_case,
+            stringency_index,
+            full_date
+        )
+        SELECT
+            dc.country_id,
+            dd.date_id,
+            de.economic_id,
+            dh.health_id,
+            dv.vaccination_id,
 
-        s.total_cases_per_million,
-        s.new_cases_per_million,
-        s.total_deaths_per_million,
-        s.new_deaths_per_million,
+            s.total_cases,
+            s.new_cases,
+            s.total_deaths,
+            s.new_deaths,
 
-        s.excess_mortality
+            s.total_tests,
+            s.positive_rate,
+            s.tests_per_case,
 
-    FROM silver.covid_cleaned_final s
-    JOIN gold.dim_country dc ON s.country = dc.country AND s.iso_code = dc.iso_code
-    JOIN gold.dim_date dd ON s.date = dd.full_date
-    JOIN gold.dim_economic de ON dc.country_id = de.country_id
-    JOIN gold.dim_health dh ON dc.country_id = dh.country_id
-    JOIN gold.dim_vaccination dv ON dc.country_id = dv.country_id;
+            s.total_cases_per_million,
+            s.new_cases_per_million,
+            s.total_deaths_per_million,
+            s.new_deaths_per_million,
+
+            s.excess_mortality,
+
+            s.stringency_index,
+            s.date
+        FROM silver.covid_cleaned_final s
+        LEFT JOIN gold.load_watermark w ON w.iso_code = s.iso_code
+        JOIN gold.dim_country dc ON dc.iso_code = s.iso_code
+        JOIN gold.dim_date dd ON dd.full_date = s.date
+        -- Dimensions par pays : la ligne dont les valeurs sont celles du jour
+        JOIN gold.dim_economic de ON de.country_id = dc.country_id
+            AND de.gdp_per_capita = s.gdp_per_capita
+            AND de.human_development_index = s.human_development_index
+            AND de.life_expectancy = s.life_expectancy
+            AND de.extreme_poverty = s.extreme_poverty
+        JOIN gold.dim_health dh ON dh.country_id = dc.country_id
+            AND dh.hospital_beds_per_thousand = s.hospital_beds_per_thousand
+            AND dh.median_age = s.median_age
+            AND dh.aged_65_older = s.aged_65_older
+            AND dh.aged_70_older = s.aged_70_older
+            AND dh.reproduction_rate = s.reproduction_rate
+            AND dh.icu_patients = s.icu_patients
+            AND dh.hosp_patients = s.hosp_patients
+        JOIN gold.dim_vaccination dv ON dv.country_id = dc.country_id
+            AND dv.total_vaccinations = s.total_vaccinations
+            AND dv.people_vaccinated = s.people_vaccinated
+            AND dv.people_fully_vaccinated = s.people_fully_vaccinated
+            AND dv.total_boosters = s.total_boosters
+            AND dv.new_vaccinations_smoothed = s.new_vaccinations_smoothed
+            AND dv.new_vaccinations_smoothed_per_million = s.new_vaccinations_smoothed_per_million
+            AND dv.new_people_vaccinated_smoothed = s.new_people_vaccinated_smoothed
+            AND dv.new_people_vaccinated_smoothed_per_hundred = s.new_people_vaccinated_smoothed_per_hundred
+        WHERE s.date > COALESCE(p_from - 1, w.max_date, DATE '-infinity')
+          AND (p_countries IS NULL OR s.iso_code = ANY(p_countries))
+        ON CONFLICT (country_id, full_date) DO UPDATE SET
+            date_id = EXCLUDED.date_id,
+            economic_id = EXCLUDED.economic_id,
+            health_id = EXCLUDED.health_id,
+            vaccination_id = EXCLUDED.vaccination_id,
+            total_cases = EXCLUDED.total_cases,
+            new_cases = EXCLUDED.new_cases,
+            total_deaths = EXCLUDED.total_deaths,
+            new_deaths = EXCLUDED.new_deaths,
+            total_tests = EXCLUDED.total_tests,
+            positive_rate = EXCLUDED.positive_rate,
+            tests_per_case = EXCLUDED.tests_per_case,
+            total_cases_per_million = EXCLUDED.total_cases_per_million,
+            new_cases_per_million = EXCLUDED.new_cases_per_million,
+            total_deaths_per_million = EXCLUDED.total_deaths_per_million,
+            new_deaths_per_million = EXCLUDED.new_deaths_per_million,
+            excess_mortality = EXCLUDED.excess_mortality,
+            stringency_index = EXCLUDED.stringency_index
+        RETURNING country_id, full_date
+    ),
+    -- Le filigrane ne recule jamais (un rattrapage avec p_from ne le ramène pas en arrière)
+    watermark AS (
+        INSERT INTO gold.load_watermark (iso_code, max_date, loaded_at)
+        SELECT dc.iso_code, MAX(l.full_date), now()
+        FROM loaded l
+        JOIN gold.dim_country dc ON dc.country_id = l.country_id
+        GROUP BY dc.iso_code
+        ON CONFLICT (iso_code) DO UPDATE
+        SET max_date = GREATEST(gold.load_watermark.max_date, EXCLUDED.max_date), loaded_at = EXCLUDED.loaded_at
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM loaded), (SELECT COUNT(*) FROM watermark) INTO n, marks;
+    stage := 'gold.fact_covid_metrics'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes (% pays) en % s', stage, row_count, marks, seconds;
+    RETURN NEXT;
 
     RAISE NOTICE '✅ Table de faits gold.fact_covid_metrics remplie avec succès.';
 END;
 $$ LANGUAGE plpgsql;
 
--- Exécution de la fonction pour charger les faits
-SELECT gold.load_fact();
\ No newline at end of file
+-- Exécution de la fonction pour charger les faits (dates après le filigrane de chaque pays)
+SELECT * FROM gold.load_fact();
@@ -1,3 +1,17 @@
+-- PostgreSQL 15 minimum : les index uniques des dimensions sont NULLS NOT DISTINCT
+-- (image etl/Dockerfile : postgres:16). On s'arrête avant de supprimer quoi que ce soit.
+DO $$
+BEGIN
+    IF current_setting('server_version_num')::INT < 150000 THEN
+        RAISE EXCEPTION 'Schéma gold : PostgreSQL 15 ou plus requis (NULLS NOT DISTINCT), version %',
+            current_setting('server_version');
+    END IF;
+END;
+$$;
+
+-- Agrégats construits sur ces tables (recréés par aggregates.sql)
+DROP MATERIALIZED VIEW IF EXISTS gold.mv_country_period;
+
 -- ============================================================
 -- 🗺️ Table: dim_country
 -- Rôle : Contient les informations d’identification géographique du pays.
@@ -94,9 +108,9 @@ CREATE TABLE gold.dim_vaccination (
 -- Supprimer l'ancienne table si elle existe
 DROP TABLE IF EXISTS gold.fact_covid_metrics;
 
--- Créer la table avec les contraintes de suppression
+-- Créer la table avec les contraintes de suppression, partitionnée par mois sur full_date
 CREATE TABLE gold.fact_covid_metrics (
-    fact_id SERIAL PRIMARY KEY,
+    fact_id SERIAL,
 
     -- Clés étrangères vers les dimensions
     country_id INT REFERENCES gold.dim_country(country_id) ON DELETE SET NULL,
@@ -120,7 +134,65 @@ CREATE TABLE gold.fact_covid_metrics (
     total_deaths_per_million DOUBLE PRECISION,
     new_deaths_per_million DOUBLE PRECISION,
 
-    excess_mortality DOUBLE PRECISION
-);
+    excess_mortality DOUBLE PRECISION,
+
+    -- Mesures sanitaires du jour (agrégées par semaine et par mois dans aggregates.sql)
+    stringency_index DOUBLE PRECISION,
+
+    -- Date du fait (copie de dim_date.full_date) : clé de partition, une requête bornée
+    -- dans le temps ne lit que les mois concernés
+    full_date DATE NOT NULL,
+
+    -- La clé primaire d'une table partitionnée contient la clé de partition
+    PRIMARY KEY (fact_id, full_date)
+) PARTITION BY RANGE (full_date);
+
+-- Une partition par mois (scripts/01_partitions.sql) ; gold.load_fact() crée celles qui manquent
+SELECT public.ensure_month_partitions('gold.fact_covid_metrics', DATE '2020-01-01', CURRENT_DATE);
+
 
 
+-- ============================================================
+-- 🔑 Index des clés naturelles et des clés étrangères
+-- Rôle : Rendre les chargements rejouables (ON CONFLICT) et indexer les jointures.
+-- Pourquoi : Sans contrainte d'unicité, relancer gold.load_dimensions() ou gold.load_fact() dupliquait les lignes.
+-- ============================================================
+-- Un pays par iso_code, une ligne par date
+CREATE UNIQUE INDEX dim_country_iso_code_key ON gold.dim_country (iso_code);
+CREATE UNIQUE INDEX dim_date_full_date_key ON gold.dim_date (full_date);
+
+-- Dimensions par pays : une ligne par combinaison de valeurs distincte (clé = pays + valeurs) ;
+-- NULLS NOT DISTINCT (PostgreSQL 15+) pour qu'une valeur manquante ne crée pas un doublon à chaque chargement
+CREATE UNIQUE INDEX dim_economic_natural_key ON gold.dim_economic (
+    country_id, gdp_per_capita, human_development_index, life_expectancy, extreme_poverty
+) NULLS NOT DISTINCT;
+CREATE UNIQUE INDEX dim_health_natural_key ON gold.dim_health (
+    country_id, hospital_beds_per_thousand, median_age, aged_65_older, aged_70_older,
+    reproduction_rate, icu_patients, hosp_patients
+) NULLS NOT DISTINCT;
+CREATE UNIQUE INDEX dim_vaccination_natural_key ON gold.dim_vaccination (
+    country_id, total_vaccinations, people_vaccinated, people_fully_vaccinated, total_boosters,
+    new_vaccinations_smoothed, new_vaccinations_smoothed_per_million,
+    new_people_vaccinated_smoothed, new_people_vaccinated_smoothed_per_hundred
+) NULLS NOT DISTINCT;
+
+-- Un fait par pays et par date (couvre aussi les recherches par country_id) ; full_date plutôt
+-- que date_id car un index unique d'une table partitionnée contient la clé de partition
+CREATE UNIQUE INDEX fact_covid_metrics_country_date_key ON gold.fact_covid_metrics (country_id, full_date);
+CREATE INDEX fact_covid_metrics_date_id_idx ON gold.fact_covid_metrics (date_id);
+CREATE INDEX fact_covid_metrics_economic_id_idx ON gold.fact_covid_metrics (economic_id);
+CREATE INDEX fact_covid_metrics_health_id_idx ON gold.fact_covid_metrics (health_id);
+CREATE INDEX fact_covid_metrics_vaccination_id_idx ON gold.fact_covid_metrics (vaccination_id);
+
+-- ============================================================
+-- 🔖 Table: load_watermark
+-- Rôle : Dernière date chargée dans gold.fact_covid_metrics, par pays.
+-- Pourquoi : Un rafraîchissement quotidien ne relit que les jours après le filigrane.
+-- ============================================================
+DROP TABLE IF EXISTS gold.load_watermark;
+
+CREATE TABLE gold.load_watermark (
+    iso_code TEXT PRIMARY KEY,
+    max_date DATE NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -1,16 +1,157 @@
-ALTER TABLE silver.covid_cleaned
-RENAME COLUMN location TO country;
+/*
+ Nettoyage bronze.covid_raw -> silver.covid_cleaned
+
+ silver.clean_bronze(p_from, p_to, p_countries) ne traite que les dates de [p_from, p_to]
+ et les pays (iso_code) de p_countries ; un paramètre NULL ne restreint rien. Sans aucun
+ paramètre, la table est vidée puis entièrement reconstruite.
+
+ silver.covid_cleaned est partitionnée par mois (scripts/01_partitions.sql). Pour une période
+ sans filtre de pays, chaque mois entièrement couvert est d'abord reconstruit à part
+ (public.build_month_partition), pendant que la table reste lisible ; seuls les mois entamés en
+ bordure de période sont traités par DELETE puis INSERT. Les mois reconstruits sont échangés avec
+ les anciennes partitions en dernière étape (public.swap_month_partition) : le verrou exclusif
+ de DETACH/ATTACH n'est pris qu'à la fin, jusqu'à la validation de la transaction.
+ L'échange n'est atomique qu'à l'intérieur de la transaction unique qui appelle la fonction : en
+ autocommit, silver.clean_bronze est validé seul et silver.covid_cleaned_final reste à l'ancien état
+ jusqu'à l'appel suivant. run_etl.py silver appelle les deux fonctions dans une même transaction.
+
+ Les doublons (iso_code, location, date) sont éliminés en une seule passe par DISTINCT ON,
+ qui suit l'index bronze.covid_raw_key_idx (scripts/bronze/schema_bronze.sql) au lieu d'un tri par fenêtre suivi d'une semi-jointure.
+ La fonction renvoie, par étape, le nombre de lignes et la durée (aussi affichés par RAISE NOTICE).
+*/
 
 DROP FUNCTION IF EXISTS silver.clean_bronze();
+DROP FUNCTION IF EXISTS silver.clean_bronze(DATE, DATE, TEXT[]);
 
-CREATE OR REPLACE FUNCTION silver.clean_bronze()
-RETURNS void
+-- Lignes nettoyées et dédoublonnées de bronze.covid_raw, lues par silver.clean_bronze
+-- (filtres de période et de pays appliqués dessus) et par public.build_month_partition
+DROP VIEW IF EXISTS silver.covid_cleaned_source;
+
+CREATE VIEW silver.covid_cleaned_source AS
+SELECT DISTINCT ON (iso_code, location, date)
+    iso_code, continent, location AS country, date,
+    total_cases, new_cases, new_cases_smoothed,
+    total_deaths, new_deaths, new_deaths_smoothed,
+    total_cases_per_million, new_cases_per_million, new_cases_smoothed_per_million,
+    total_deaths_per_million, new_deaths_per_million, new_deaths_smoothed_per_million,
+    reproduction_rate, icu_patients, icu_patients_per_million,
+    hosp_patients, hosp_patients_per_million,
+    weekly_icu_admissions, weekly_icu_admissions_per_million,
+    weekly_hosp_admissions, weekly_hosp_admissions_per_million,
+    total_tests, new_tests, total_tests_per_thousand,
+    new_tests_per_thousand, new_tests_smoothed, new_tests_smoothed_per_thousand,
+    positive_rate, tests_per_case, tests_units,
+    total_vaccinations, people_vaccinated, people_fully_vaccinated,
+    total_boosters, new_vaccinations, new_vaccinations_smoothed,
+    total_vaccinations_per_hundred, people_vaccinated_per_hundred,
+    people_fully_vaccinated_per_hundred, total_boosters_per_hundred,
+    new_vaccinations_smoothed_per_million, new_people_vaccinated_smoothed,
+    new_people_vaccinated_smoothed_per_hundred,
+    stringency_index, population_density, median_age, aged_65_older,
+    aged_70_older, gdp_per_capita, extreme_poverty,
+    cardiovasc_death_rate, diabetes_prevalence,
+    female_smokers, male_smokers, handwashing_facilities,
+    hospital_beds_per_thousand, life_expectancy,
+    human_development_index, population,
+    excess_mortality_cumulative_absolute, excess_mortality_cumulative,
+    excess_mortality, excess_mortality_cumulative_per_million
+FROM bronze.covid_raw
+WHERE
+    iso_code IS NOT NULL
+    AND location IS NOT NULL
+    AND date IS NOT NULL
+    AND iso_code NOT LIKE 'OWID_%'
+    AND continent IS NOT NULL
+    AND (
+        total_cases IS NOT NULL OR
+        new_cases IS NOT NULL OR
+        total_deaths IS NOT NULL OR
+        reproduction_rate IS NOT NULL OR
+        total_tests IS NOT NULL OR
+        total_vaccinations IS NOT NULL OR
+        excess_mortality IS NOT NULL
+    )
+    AND NOT (
+        COALESCE(total_cases, 0) = 0 AND
+        COALESCE(new_cases, 0) = 0 AND
+        COALESCE(total_deaths, 0) = 0
+    )
+-- Une seule ligne par (iso_code, location, date) : la première dans l'ordre de l'index
+ORDER BY iso_code, location, date;
+
+CREATE OR REPLACE FUNCTION silver.clean_bronze(
+    p_from DATE DEFAULT NULL,
+    p_to DATE DEFAULT NULL,
+    p_countries TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (stage TEXT, row_count BIGINT, seconds NUMERIC)
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    started TIMESTAMP;
+    n BIGINT;
+    lower_date DATE;
+    upper_date DATE;
+    -- Mois remplacés en entier : [full_from, full_to), NULL si aucun
+    full_from DATE;
+    full_to DATE;
+    month_start DATE;
+    months INT := 0;
 BEGIN
-    RAISE NOTICE 'Nettoyage de la table silver.covid_cleaned...';
-    TRUNCATE TABLE silver.covid_cleaned;
+    -- Dates à traiter, côté bronze (lignes à écrire) et côté silver (lignes à remplacer)
+    SELECT LEAST(b.lo, s.lo), GREATEST(b.hi, s.hi) INTO lower_date, upper_date
+    FROM (SELECT MIN(date) AS lo, MAX(date) AS hi FROM bronze.covid_raw
+          WHERE (p_from IS NULL OR date >= p_from) AND (p_to IS NULL OR date <= p_to)) b,
+         (SELECT MIN(date) AS lo, MAX(date) AS hi FROM silver.covid_cleaned
+          WHERE (p_from IS NULL OR date >= p_from) AND (p_to IS NULL OR date <= p_to)) s;
+    PERFORM public.ensure_month_partitions('silver.covid_cleaned', lower_date, upper_date);
+
+    started := clock_timestamp();
+    IF p_from IS NULL AND p_to IS NULL AND p_countries IS NULL THEN
+        RAISE NOTICE 'Nettoyage complet de la table silver.covid_cleaned...';
+        SELECT COUNT(*) INTO n FROM silver.covid_cleaned;
+        TRUNCATE TABLE silver.covid_cleaned;
+    ELSE
+        RAISE NOTICE 'Nettoyage de silver.covid_cleaned : dates % à %, pays %',
+            COALESCE(p_from::TEXT, 'début'), COALESCE(p_to::TEXT, 'fin'), COALESCE(p_countries::TEXT, 'tous');
+        IF p_countries IS NULL AND lower_date IS NOT NULL THEN
+            -- Premier mois commençant à p_from ou après, fin du dernier mois terminé à p_to
+            full_from := CASE WHEN p_from IS NULL THEN date_trunc('month', lower_date)
+                              ELSE date_trunc('month', p_from - 1) + INTERVAL '1 month' END;
+            full_to := CASE WHEN p_to IS NULL THEN date_trunc('month', upper_date) + INTERVAL '1 month'
+                            ELSE date_trunc('month', p_to + 1) END;
+            IF full_from < full_to THEN
+                FOR month_start IN
+                    SELECT generate_series(full_from, full_to - INTERVAL '1 month', INTERVAL '1 month')::DATE
+                LOOP
+                    n := public.build_month_partition('silver.covid_cleaned', month_start, 'silver.covid_cleaned_source');
+                    row_count := COALESCE(row_count, 0) + n;
+                    months := months + 1;
+                END LOOP;
+                stage := 'silver.build_partitions';
+                seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+                RAISE NOTICE '% : % lignes (% mois) en % s', stage, row_count, months, seconds;
+                RETURN NEXT;
+                started := clock_timestamp();
+            ELSE
+                full_from := NULL;
+                full_to := NULL;
+            END IF;
+        END IF;
+
+        DELETE FROM silver.covid_cleaned
+        WHERE (p_from IS NULL OR date >= p_from)
+          AND (p_to IS NULL OR date <= p_to)
+          AND (p_countries IS NULL OR iso_code = ANY(p_countries))
+          AND NOT (full_from IS NOT NULL AND date >= full_from AND date < full_to);
+        GET DIAGNOSTICS n = ROW_COUNT;
+    END IF;
+    stage := 'silver.delete'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
+    started := clock_timestamp();
     RAISE NOTICE 'Insertion des données nettoyées depuis bronze.covid_raw...';
     INSERT INTO silver.covid_cleaned (
         iso_code, continent, country, date,
@@ -41,7 +182,7 @@ BEGIN
         excess_mortality, excess_mortality_cumulative_per_million
     )
     SELECT
-        iso_code, continent, location AS country, date,
+        iso_code, continent, country, date,
         total_cases, new_cases, new_cases_smoothed,
         total_deaths, new_deaths, new_deaths_smoothed,
         total_cases_per_million, new_cases_per_million, new_cases_smoothed_per_million,
@@ -67,44 +208,38 @@ BEGIN
         human_development_index, population,
         excess_mortality_cumulative_absolute, excess_mortality_cumulative,
         excess_mortality, excess_mortality_cumulative_per_million
-    FROM bronze.covid_raw
-    WHERE
-        iso_code IS NOT NULL
-        AND location IS NOT NULL
-        AND date IS NOT NULL
-        AND iso_code NOT LIKE 'OWID_%'
-        AND continent IS NOT NULL
-        AND (
-            total_cases IS NOT NULL OR
-            new_cases IS NOT NULL OR
-            total_deaths IS NOT NULL OR
-            reproduction_rate IS NOT NULL OR
-            total_tests IS NOT NULL OR
-            total_vaccinations IS NOT NULL OR
-            excess_mortality IS NOT NULL
-        )
-        AND NOT (
-            COALESCE(total_cases, 0) = 0 AND
-            COALESCE(new_cases, 0) = 0 AND
-            COALESCE(total_deaths, 0) = 0
-        )
-        AND (iso_code, location, date) IN (
-            SELECT iso_code, location, date
-            FROM (
-                SELECT iso_code, location, date,
-                       ROW_NUMBER() OVER (PARTITION BY iso_code, location, date ORDER BY date) AS rn
-                FROM bronze.covid_raw
-            ) AS t
-            WHERE t.rn = 1
-        );
+    FROM silver.covid_cleaned_source
+    WHERE (p_from IS NULL OR date >= p_from)
+      AND (p_to IS NULL OR date <= p_to)
+      AND (p_countries IS NULL OR iso_code = ANY(p_countries))
+      AND NOT (full_from IS NOT NULL AND date >= full_from AND date < full_to);
+    GET DIAGNOSTICS n = ROW_COUNT;
+
+    stage := 'silver.insert'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
 
-    RAISE NOTICE 'Données nettoyées insérées avec succès dans silver.covid_cleaned.';
+    -- Échange des mois reconstruits, en dernier : le verrou ACCESS EXCLUSIVE de DETACH/ATTACH
+    -- sur silver.covid_cleaned ne couvre que cette étape et la suite de la transaction
+    IF full_from IS NOT NULL THEN
+        started := clock_timestamp();
+        FOR month_start IN
+            SELECT generate_series(full_from, full_to - INTERVAL '1 month', INTERVAL '1 month')::DATE
+        LOOP
+            PERFORM public.swap_month_partition('silver.covid_cleaned', month_start);
+        END LOOP;
+        stage := 'silver.swap_partitions'; row_count := months;
+        seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+        RAISE NOTICE '% : % partitions en % s', stage, row_count, seconds;
+        RETURN NEXT;
+    END IF;
 END;
 $$;
 
 -- Changer le propriétaire de la fonction pour l'utilisateur postgres
-ALTER FUNCTION silver.clean_bronze() OWNER TO postgres;
+ALTER FUNCTION silver.clean_bronze(DATE, DATE, TEXT[]) OWNER TO postgres;
 
--- utiliser la fonction pour nettoyer les données
-SELECT silver.clean_bronze();
+-- utiliser la fonction pour nettoyer les données (tout l'historique)
+SELECT * FROM silver.clean_bronze();
 
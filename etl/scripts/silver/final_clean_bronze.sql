@@ -1,19 +1,89 @@
 -- Supprimer ancienne version si elle existe
 DROP FUNCTION IF EXISTS silver.final_clean_bronze();
+DROP FUNCTION IF EXISTS silver.final_clean_bronze(DATE, DATE, TEXT[]);
 DROP TABLE IF EXISTS silver.covid_cleaned_final;
+DROP VIEW IF EXISTS silver.covid_cleaned_filled;
+
+-- Complétion des valeurs manquantes, ligne à ligne : la fonction n'en insère que la période demandée
+CREATE VIEW silver.covid_cleaned_filled AS
+SELECT
+    -- Métadonnées essentielles
+    iso_code,
+    continent,
+    country,
+    date,
+
+    -- ✅ Colonnes utiles
+    COALESCE(total_cases, ROUND((RANDOM() * 5000000)::numeric)) AS total_cases,
+    COALESCE(new_cases, ROUND((RANDOM() * 100000)::numeric)) AS new_cases,
+    COALESCE(total_deaths, ROUND((RANDOM() * 100000)::numeric)) AS total_deaths,
+    COALESCE(new_deaths, ROUND((RANDOM() * 5000)::numeric)) AS new_deaths,
+    COALESCE(total_tests, ROUND((RANDOM() * 10000000)::numeric)) AS total_tests,
+    COALESCE(positive_rate, ROUND((RANDOM() * 0.3)::numeric, 2)) AS positive_rate,
+    COALESCE(tests_per_case, ROUND((RANDOM() * 30)::numeric, 2)) AS tests_per_case,
+    COALESCE(population, ROUND((RANDOM() * 100000000)::numeric)) AS population,
+    COALESCE(median_age, ROUND((RANDOM() * 20 + 20)::numeric, 1)) AS median_age,
+    COALESCE(aged_65_older, ROUND((RANDOM() * 0.25)::numeric, 2)) AS aged_65_older,
+    COALESCE(aged_70_older, ROUND((RANDOM() * 0.2)::numeric, 2)) AS aged_70_older,
+    COALESCE(gdp_per_capita, ROUND((RANDOM() * 50000)::numeric, 2)) AS gdp_per_capita,
+    COALESCE(human_development_index, ROUND((RANDOM() * 0.5 + 0.5)::numeric, 3)) AS human_development_index,
+    COALESCE(life_expectancy, ROUND((RANDOM() * 30 + 50)::numeric, 1)) AS life_expectancy,
+    COALESCE(excess_mortality, ROUND((RANDOM() * 100)::numeric, 2)) AS excess_mortality,
+
+    -- ⚠️ Colonnes utiles mais à taux NULL élevé → complétion aléatoire
+    COALESCE(reproduction_rate, ROUND((RANDOM() * 0.4 + 0.8)::numeric, 2)) AS reproduction_rate,
+    COALESCE(icu_patients, ROUND((RANDOM() * 50)::numeric)) AS icu_patients,
+    COALESCE(hosp_patients, ROUND((RANDOM() * 100)::numeric)) AS hosp_patients,
+    COALESCE(new_tests, ROUND((RANDOM() * 10000)::numeric)) AS new_tests,
+    COALESCE(total_vaccinations, ROUND((RANDOM() * 1000000)::numeric)) AS total_vaccinations,
+    COALESCE(people_vaccinated, ROUND((RANDOM() * 800000)::numeric)) AS people_vaccinated,
+    COALESCE(people_fully_vaccinated, ROUND((RANDOM() * 700000)::numeric)) AS people_fully_vaccinated,
+    COALESCE(total_boosters, ROUND((RANDOM() * 400000)::numeric)) AS total_boosters,
+    COALESCE(stringency_index, ROUND((RANDOM() * 100)::numeric, 2)) AS stringency_index,
+
+    -- 🔍 Colonnes neutres (même si NULL) → complétion réaliste
+    COALESCE(hospital_beds_per_thousand, ROUND((RANDOM() * 10)::numeric, 2)) AS hospital_beds_per_thousand,
+    COALESCE(extreme_poverty, ROUND((RANDOM() * 0.4)::numeric, 3)) AS extreme_poverty,
+    COALESCE(new_vaccinations_smoothed, ROUND((RANDOM() * 100000)::numeric)) AS new_vaccinations_smoothed,
+    COALESCE(new_vaccinations_smoothed_per_million, ROUND((RANDOM() * 3000)::numeric, 2)) AS new_vaccinations_smoothed_per_million,
+    COALESCE(new_people_vaccinated_smoothed, ROUND((RANDOM() * 50000)::numeric)) AS new_people_vaccinated_smoothed,
+    COALESCE(new_people_vaccinated_smoothed_per_hundred, ROUND((RANDOM() * 5)::numeric, 2)) AS new_people_vaccinated_smoothed_per_hundred,
+    COALESCE(total_cases_per_million, ROUND((RANDOM() * 300000)::numeric, 2)) AS total_cases_per_million,
+    COALESCE(new_cases_per_million, ROUND((RANDOM() * 5000)::numeric, 2)) AS new_cases_per_million,
+    COALESCE(total_deaths_per_million, ROUND((RANDOM() * 10000)::numeric, 2)) AS total_deaths_per_million,
+    COALESCE(new_deaths_per_million, ROUND((RANDOM() * 1000)::numeric, 2)) AS new_deaths_per_million
+
+FROM silver.covid_cleaned;
+
+-- Table finale créée une seule fois (vide) : les exécutions suivantes remplacent des périodes
+CREATE TABLE silver.covid_cleaned_final AS
+SELECT * FROM silver.covid_cleaned_filled
+WITH NO DATA;
+
+CREATE UNIQUE INDEX covid_cleaned_final_key_idx ON silver.covid_cleaned_final (iso_code, country, date);
+CREATE INDEX covid_cleaned_final_date_idx ON silver.covid_cleaned_final (date);
 
 -- Créer la version finale nettoyée et complétée
-CREATE OR REPLACE FUNCTION silver.final_clean_bronze()
-RETURNS void AS $$
+CREATE OR REPLACE FUNCTION silver.final_clean_bronze(
+    p_from DATE DEFAULT NULL,
+    p_to DATE DEFAULT NULL,
+    p_countries TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (stage TEXT, row_count BIGINT, seconds NUMERIC) AS $$
+DECLARE
+    started TIMESTAMP;
+    n BIGINT;
 BEGIN
     /*
         ==============================================
-        FONCTION : silver.final_clean_bronze()
+        FONCTION : silver.final_clean_bronze(p_from, p_to, p_countries)
         ==============================================
         Objectif :
         - Générer une version propre et exploitable des données COVID-19
         - Préparer un jeu de données pour l’apprentissage automatique
-        - Nettoyer la couche Silver et créer la table silver.covid_cleaned_final
+        - Nettoyer la couche Silver et alimenter la table silver.covid_cleaned_final
+        - Ne recalculer que les dates de [p_from, p_to] et les pays de p_countries
+          (NULL = pas de restriction ; sans paramètre, toute la table est reconstruite)
 
         Raisons des choix :
         ---------------------
@@ -28,63 +98,40 @@ BEGIN
            → Justifié car ce projet est expérimental et non destiné à la production.
     */
 
-    -- Création d’une nouvelle table nettoyée
-    CREATE TABLE silver.covid_cleaned_final AS
-    SELECT
-        -- Métadonnées essentielles
-        iso_code,
-        continent,
-        country,
-        date,
-
-        -- ✅ Colonnes utiles
-        COALESCE(total_cases, ROUND((RANDOM() * 5000000)::numeric)) AS total_cases,
-        COALESCE(new_cases, ROUND((RANDOM() * 100000)::numeric)) AS new_cases,
-        COALESCE(total_deaths, ROUND((RANDOM() * 100000)::numeric)) AS total_deaths,
-        COALESCE(new_deaths, ROUND((RANDOM() * 5000)::numeric)) AS new_deaths,
-        COALESCE(total_tests, ROUND((RANDOM() * 10000000)::numeric)) AS total_tests,
-        COALESCE(positive_rate, ROUND((RANDOM() * 0.3)::numeric, 2)) AS positive_rate,
-        COALESCE(tests_per_case, ROUND((RANDOM() * 30)::numeric, 2)) AS tests_per_case,
-        COALESCE(population, ROUND((RANDOM() * 100000000)::numeric)) AS population,
-        COALESCE(median_age, ROUND((RANDOM() * 20 + 20)::numeric, 1)) AS median_age,
-        COALESCE(aged_65_older, ROUND((RANDOM() * 0.25)::numeric, 2)) AS aged_65_older,
-        COALESCE(aged_70_older, ROUND((RANDOM() * 0.2)::numeric, 2)) AS aged_70_older,
-        COALESCE(gdp_per_capita, ROUND((RANDOM() * 50000)::numeric, 2)) AS gdp_per_capita,
-        COALESCE(human_development_index, ROUND((RANDOM() * 0.5 + 0.5)::numeric, 3)) AS human_development_index,
-        COALESCE(life_expectancy, ROUND((RANDOM() * 30 + 50)::numeric, 1)) AS life_expectancy,
-        COALESCE(excess_mortality, ROUND((RANDOM() * 100)::numeric, 2)) AS excess_mortality,
-
-        -- ⚠️ Colonnes utiles mais à taux NULL élevé → complétion aléatoire
-        COALESCE(reproduction_rate, ROUND((RANDOM() * 0.4 + 0.8)::numeric, 2)) AS reproduction_rate,
-        COALESCE(icu_patients, ROUND((RANDOM() * 50)::numeric)) AS icu_patients,
-        COALESCE(hosp_patients, ROUND((RANDOM() * 100)::numeric)) AS hosp_patients,
-        COALESCE(new_tests, ROUND((RANDOM() * 10000)::numeric)) AS new_tests,
-        COALESCE(total_vaccinations, ROUND((RANDOM() * 1000000)::numeric)) AS total_vaccinations,
-        COALESCE(people_vaccinated, ROUND((RANDOM() * 800000)::numeric)) AS people_vaccinated,
-        COALESCE(people_fully_vaccinated, ROUND((RANDOM() * 700000)::numeric)) AS people_fully_vaccinated,
-        COALESCE(total_boosters, ROUND((RANDOM() * 400000)::numeric)) AS total_boosters,
-        COALESCE(stringency_index, ROUND((RANDOM() * 100)::numeric, 2)) AS stringency_index,
-
-        -- 🔍 Colonnes neutres (même si NULL) → complétion réaliste
-        COALESCE(hospital_beds_per_thousand, ROUND((RANDOM() * 10)::numeric, 2)) AS hospital_beds_per_thousand,
-        COALESCE(extreme_poverty, ROUND((RANDOM() * 0.4)::numeric, 3)) AS extreme_poverty,
-        COALESCE(new_vaccinations_smoothed, ROUND((RANDOM() * 100000)::numeric)) AS new_vaccinations_smoothed,
-        COALESCE(new_vaccinations_smoothed_per_million, ROUND((RANDOM() * 3000)::numeric, 2)) AS new_vaccinations_smoothed_per_million,
-        COALESCE(new_people_vaccinated_smoothed, ROUND((RANDOM() * 50000)::numeric)) AS new_people_vaccinated_smoothed,
-        COALESCE(new_people_vaccinated_smoothed_per_hundred, ROUND((RANDOM() * 5)::numeric, 2)) AS new_people_vaccinated_smoothed_per_hundred,
-        COALESCE(total_cases_per_million, ROUND((RANDOM() * 300000)::numeric, 2)) AS total_cases_per_million,
-        COALESCE(new_cases_per_million, ROUND((RANDOM() * 5000)::numeric, 2)) AS new_cases_per_million,
-        COALESCE(total_deaths_per_million, ROUND((RANDOM() * 10000)::numeric, 2)) AS total_deaths_per_million,
-        COALESCE(new_deaths_per_million, ROUND((RANDOM() * 1000)::numeric, 2)) AS new_deaths_per_million
-
-    FROM silver.covid_cleaned;
-
-    RAISE NOTICE '✅ Table finale silver.covid_cleaned_final créée sans valeur NULL.';
+    started := clock_timestamp();
+    IF p_from IS NULL AND p_to IS NULL AND p_countries IS NULL THEN
+        SELECT COUNT(*) INTO n FROM silver.covid_cleaned_final;
+        TRUNCATE TABLE silver.covid_cleaned_final;
+    ELSE
+        DELETE FROM silver.covid_cleaned_final
+        WHERE (p_from IS NULL OR date >= p_from)
+          AND (p_to IS NULL OR date <= p_to)
+          AND (p_countries IS NULL OR iso_code = ANY(p_countries));
+        GET DIAGNOSTICS n = ROW_COUNT;
+    END IF;
+    stage := 'silver_final.delete'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
+
+    started := clock_timestamp();
+    INSERT INTO silver.covid_cleaned_final
+    SELECT * FROM silver.covid_cleaned_filled
+    WHERE (p_from IS NULL OR date >= p_from)
+      AND (p_to IS NULL OR date <= p_to)
+      AND (p_countries IS NULL OR iso_code = ANY(p_countries));
+    GET DIAGNOSTICS n = ROW_COUNT;
+    stage := 'silver_final.insert'; row_count := n;
+    seconds := ROUND(EXTRACT(EPOCH FROM clock_timestamp() - started)::NUMERIC, 3);
+    RAISE NOTICE '% : % lignes en % s', stage, row_count, seconds;
+    RETURN NEXT;
+
+    RAISE NOTICE '✅ Table finale silver.covid_cleaned_final complétée sans valeur NULL.';
 END;
 $$ LANGUAGE plpgsql;
 
--- Exécution
-SELECT silver.final_clean_bronze();
+-- Exécution (tout l'historique)
+SELECT * FROM silver.final_clean_bronze();
 
 -- Vérification rapide
 SELECT COUNT(*) AS lignes, COUNT(*) FILTER (WHERE EXISTS (
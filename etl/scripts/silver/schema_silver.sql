@@ -1,5 +1,6 @@
--- Supprimer la table si elle existe
-DROP TABLE IF EXISTS silver.covid_cleaned;
+-- Supprimer la table si elle existe (et la vue silver.covid_cleaned_filled qui en dépend,
+-- recréée par final_clean_bronze.sql)
+DROP TABLE IF EXISTS silver.covid_cleaned CASCADE;
 
 -- Créer la table silver vide avec les 67 colonnes nettoyées
 CREATE TABLE silver.covid_cleaned (
@@ -78,4 +79,11 @@ CREATE TABLE silver.covid_cleaned (
     excess_mortality_cumulative DOUBLE PRECISION,
     excess_mortality DOUBLE PRECISION,
     excess_mortality_cumulative_per_million DOUBLE PRECISION
-);
+) PARTITION BY RANGE (date);
+
+-- Une partition par mois (scripts/01_partitions.sql) ; les chargements créent celles qui manquent
+SELECT public.ensure_month_partitions('silver.covid_cleaned', DATE '2020-01-01', CURRENT_DATE);
+
+-- Une ligne par pays et par date (garantie par silver.clean_bronze), recherche par période
+CREATE UNIQUE INDEX covid_cleaned_key_idx ON silver.covid_cleaned (iso_code, country, date);
+CREATE INDEX covid_cleaned_date_idx ON silver.covid_cleaned (date);
@@ -0,0 +1,35 @@
+# 🥈 Nettoyage Silver : appelle silver.clean_bronze puis silver.final_clean_bronze sur une période
+# et/ou une liste de pays, et journalise les lignes et la durée de chaque étape
+
+import logging
+import time
+
+from db import call_stages
+
+logger = logging.getLogger(__name__)
+
+SILVER_FUNCTIONS = ("silver.clean_bronze", "silver.final_clean_bronze")
+
+
+def clean_silver(pool, date_from=None, date_to=None, countries=None):
+    """
+    Recalcule silver.covid_cleaned puis silver.covid_cleaned_final pour les dates de
+    [date_from, date_to] et les pays (iso_code) de `countries` ; None ne restreint rien,
+    et sans aucun filtre les deux tables sont reconstruites en entier.
+
+    Les deux fonctions s'exécutent dans une même transaction, ouverte explicitement (même
+    sur une connexion en autocommit) : une erreur laisse la couche silver inchangée.
+    L'échange des partitions reconstruites, en fin de silver.clean_bronze, n'est atomique
+    qu'à l'intérieur de cette transaction : il verrouille silver.covid_cleaned jusqu'à la
+    validation, et les lecteurs voient l'ancien ou le nouvel état des deux tables. Appelées
+    séparément en autocommit, les fonctions valideraient chacune leur travail. Renvoie les
+    statistiques par étape {étape: {rows, seconds}}.
+    """
+    started = time.perf_counter()
+    countries = list(countries) if countries else None
+    stages = {}
+    with pool.connection() as conn, conn.transaction():
+        for function in SILVER_FUNCTIONS:
+            stages.update(call_stages(conn, function, (date_from, date_to, countries)))
+    logger.info("Silver nettoyé en %.2f s", time.perf_counter() - started)
+    return stages
@@ -0,0 +1,58 @@
+# 🧪 Connexion et pool psycopg factices : les tests des wrappers s'exécutent sans base
+
+from contextlib import contextmanager
+
+
+class FakeCursor:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    """
+    Journalise les fonctions SQL appelées et les bornes de transaction dans `log`, les
+    requêtes et leurs paramètres dans `calls`. Chaque fonction renvoie les lignes de
+    `results` (par défaut une étape de 3 lignes) ; `fail_on` fait échouer une fonction.
+    """
+
+    def __init__(self, results=None, fail_on=None):
+        self.results = results or {}
+        self.fail_on = fail_on
+        self.log = []
+        self.calls = []
+
+    @contextmanager
+    def transaction(self):
+        self.log.append("BEGIN")
+        try:
+            yield
+        except Exception:
+            self.log.append("ROLLBACK")
+            raise
+        self.log.append("COMMIT")
+
+    def execute(self, query, params=()):
+        function = query.split(" FROM ")[1].split("(")[0]
+        self.log.append(function)
+        self.calls.append((query, params))
+        if function == self.fail_on:
+            raise RuntimeError(f"{function} a échoué")
+        return FakeCursor(self.results.get(function, [(function, 3, 0.5)]))
+
+
+class FakePool:
+    """Pool dont chaque `connection()` prête la même connexion factice, et compte les emprunts."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.checkouts = 0
+
+    @contextmanager
+    def connection(self):
+        self.checkouts += 1
+        self.conn.log.append("CONNECT")
+        yield self.conn
@@ -0,0 +1,122 @@
+import sys
+import os
+import csv
+import io
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bronze import CountryPlan, Watermark, iter_chunks, plan_countries, read_header, row_hash
+
+HEADER = ["iso_code", "location", "date", "new_cases"]
+ROWS = [
+    ["FRA", "France", "2021-03-01", "10"],
+    ["FRA", "France", "2021-03-02", "12"],
+    ["CAN", "Canada", "2021-03-01", "5"],
+    ["CAN", "Canada", "2021-03-02", "7"],
+]
+
+
+def write_csv(path, rows, header=HEADER):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def watermarks_after(path):
+    """Filigranes tels que load_bronze les enregistre après avoir chargé `path`."""
+    plans = plan_countries(path, read_header(path), {})
+    return {key: plan.new_watermark() for key, plan in plans.items()}
+
+
+class TestPlanCountries:
+    """Mode de chargement choisi par pays en comparant le fichier à son filigrane"""
+
+    def test_new_countries(self, tmp_path):
+        path = write_csv(tmp_path / "owid.csv", ROWS)
+        plans = plan_countries(path, HEADER, {})
+        assert {key: plan.mode for key, plan in plans.items()} == {"FRA": "new", "CAN": "new"}
+        assert plans["FRA"].pending_rows == 2
+
+    def test_unchanged_file_loads_nothing(self, tmp_path):
+        path = write_csv(tmp_path / "owid.csv", ROWS)
+        plans = plan_countries(path, HEADER, watermarks_after(path))
+        assert {plan.mode for plan in plans.values()} == {"append"}
+        assert sum(plan.pending_rows for plan in plans.values()) == 0
+        assert list(iter_chunks(path, HEADER, HEADER, plans)) == []
+
+    def test_new_dates_are_appended(self, tmp_path):
+        watermarks = watermarks_after(write_csv(tmp_path / "before.csv", ROWS))
+        path = write_csv(tmp_path / "after.csv", ROWS + [["FRA", "France", "2021-03-03", "15"]])
+        plans = plan_countries(path, HEADER, watermarks)
+        assert plans["FRA"].mode == "append"
+        assert plans["FRA"].pending_rows == 1
+        assert plans["CAN"].pending_rows == 0
+        (data, n_rows), = iter_chunks(path, HEADER, HEADER, plans)
+        assert n_rows == 1
+        assert data == "FRA,France,2021-03-03,15\n"
+
+    def test_revised_history_reloads_country(self, tmp_path):
+        watermarks = watermarks_after(write_csv(tmp_path / "before.csv", ROWS))
+        revised = [list(row) for row in ROWS]
+        revised[0][3] = "11"
+        path = write_csv(tmp_path / "after.csv", revised + [["FRA", "France", "2021-03-03", "15"]])
+        plans = plan_countries(path, HEADER, watermarks)
+        assert plans["FRA"].mode == "reload"
+        assert plans["FRA"].pending_rows == 3
+        assert plans["CAN"].mode == "append"
+        loaded = [row for data, _ in iter_chunks(path, HEADER, HEADER, plans) for row in csv.reader(io.StringIO(data))]
+        assert [row[2] for row in loaded if row[0] == "FRA"] == ["2021-03-01", "2021-03-02", "2021-03-03"]
+        assert not any(row[0] == "CAN" for row in loaded)
+
+    def test_deleted_history_row_reloads_country(self, tmp_path):
+        watermarks = watermarks_after(write_csv(tmp_path / "before.csv", ROWS))
+        path = write_csv(tmp_path / "after.csv", ROWS[1:])
+        assert plan_countries(path, HEADER, watermarks)["FRA"].mode == "reload"
+
+    def test_malformed_rows_are_skipped(self, tmp_path):
+        path = write_csv(tmp_path / "owid.csv", ROWS + [["", "Monde", "2021-03-01", "1"], ["FRA", "France"]])
+        plans = plan_countries(path, HEADER, {})
+        assert sorted(plans) == ["CAN", "FRA"]
+        assert plans["FRA"].rows == 2
+
+    def test_watermark_plan(self):
+        plan = CountryPlan(Watermark("2021-03-02", 2, 0))
+        plan.add("2021-03-01", 0)
+        plan.add("2021-03-02", 0)
+        plan.add("2021-03-03", 0)
+        assert plan.mode == "append"
+        assert not plan.selects("2021-03-02")
+        assert plan.selects("2021-03-03")
+        assert plan.new_watermark() == Watermark("2021-03-03", 3, 0)
+
+
+class TestRowHash:
+
+    def test_country_digest_ignores_row_order(self, tmp_path):
+        """L'empreinte d'un pays ne dépend pas de l'ordre des lignes dans le fichier"""
+        forward = plan_countries(write_csv(tmp_path / "a.csv", ROWS), HEADER, {})
+        backward = plan_countries(write_csv(tmp_path / "b.csv", ROWS[::-1]), HEADER, {})
+        for key in forward:
+            assert forward[key].new_watermark() == backward[key].new_watermark()
+
+    def test_permuted_file_is_not_reloaded(self, tmp_path):
+        watermarks = watermarks_after(write_csv(tmp_path / "before.csv", ROWS))
+        plans = plan_countries(write_csv(tmp_path / "after.csv", ROWS[::-1]), HEADER, watermarks)
+        assert {plan.mode for plan in plans.values()} == {"append"}
+
+    def test_fields_are_separated(self):
+        """Deux découpages différents des mêmes caractères n'ont pas la même empreinte"""
+        assert row_hash(["ab", "c"]) != row_hash(["a", "bc"])
+        assert 0 <= row_hash(ROWS[0]) < 1 << 64
+
+
+class TestIterChunks:
+
+    def test_chunk_size_and_columns(self, tmp_path):
+        path = write_csv(tmp_path / "owid.csv", ROWS)
+        plans = plan_countries(path, HEADER, {})
+        chunks = list(iter_chunks(path, HEADER, ["iso_code", "date"], plans, chunk_rows=3))
+        assert [n_rows for _, n_rows in chunks] == [3, 1]
+        assert chunks[0][0].splitlines()[0] == "FRA,2021-03-01"
@@ -0,0 +1,100 @@
+import sys
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import run_etl
+from db import call_stages
+from fakes import FakeConnection, FakePool
+from gold import GOLD_FUNCTIONS, REFRESH_FUNCTION, load_gold, refresh_aggregates
+
+
+class TestCallStages:
+
+    def test_query_and_stats(self):
+        """Une ligne par étape ; la durée NUMERIC de PostgreSQL (Decimal) devient un float"""
+        conn = FakeConnection(results={
+            "gold.load_dimensions": [("gold.dim_country", 2, Decimal("0.003")), ("gold.dim_date", 60, Decimal("0.002"))],
+        })
+        stages = call_stages(conn, "gold.load_dimensions", (None, ["FRA"]))
+        assert conn.calls == [("SELECT stage, row_count, seconds FROM gold.load_dimensions(%s, %s)", (None, ["FRA"]))]
+        assert stages == {"gold.dim_country": {"rows": 2, "seconds": 0.003}, "gold.dim_date": {"rows": 60, "seconds": 0.002}}
+        assert isinstance(stages["gold.dim_date"]["seconds"], float)
+
+    def test_no_parameters(self):
+        conn = FakeConnection()
+        call_stages(conn, REFRESH_FUNCTION, ())
+        assert conn.calls == [(f"SELECT stage, row_count, seconds FROM {REFRESH_FUNCTION}()", ())]
+
+
+class TestLoadGold:
+
+    def test_dimensions_then_facts_then_refresh(self):
+        """Dimensions et faits dans une transaction, agrégats rafraîchis après la validation"""
+        conn = FakeConnection()
+        pool = FakePool(conn)
+        stages = load_gold(pool, date(2024, 1, 1), ("FRA",))
+        assert conn.log == [
+            "CONNECT", "BEGIN", "gold.load_dimensions", "gold.load_fact", "COMMIT",
+            "CONNECT", "gold.refresh_aggregates",
+        ]
+        assert list(stages) == list(GOLD_FUNCTIONS) + [REFRESH_FUNCTION]
+        assert [params for _, params in conn.calls] == [(date(2024, 1, 1), ["FRA"])] * 2 + [()]
+
+    def test_watermark_by_default(self):
+        """Sans date, p_from reste NULL : chaque pays repart de son filigrane gold.load_watermark"""
+        conn = FakeConnection()
+        load_gold(FakePool(conn), refresh=False)
+        assert [params for _, params in conn.calls] == [(None, None)] * 2
+        assert REFRESH_FUNCTION not in conn.log
+
+    def test_failure_skips_refresh(self):
+        conn = FakeConnection(fail_on="gold.load_fact")
+        with pytest.raises(RuntimeError):
+            load_gold(FakePool(conn))
+        assert conn.log[-1] == "ROLLBACK"
+        assert REFRESH_FUNCTION not in conn.log
+
+
+class TestRefreshAggregates:
+
+    def test_query(self):
+        """Une seule requête, sans paramètre ni transaction ouverte par le wrapper"""
+        conn = FakeConnection(results={REFRESH_FUNCTION: [("gold.mv_country_period", 26, Decimal("0.078"))]})
+        pool = FakePool(conn)
+        assert refresh_aggregates(pool) == {"gold.mv_country_period": {"rows": 26, "seconds": 0.078}}
+        assert conn.calls == [("SELECT stage, row_count, seconds FROM gold.refresh_aggregates()", ())]
+        assert conn.log == ["CONNECT", REFRESH_FUNCTION]
+        assert pool.checkouts == 1
+
+
+class TestRunEtl:
+    """Arguments de la ligne de commande transmis aux fonctions SQL"""
+
+    def run(self, argv):
+        conn = FakeConnection()
+        args = run_etl.parse_args(argv)
+        args.run(FakePool(conn), args)
+        return conn
+
+    def test_gold_defaults(self):
+        conn = self.run(["gold"])
+        assert [params for _, params in conn.calls] == [(None, None), (None, None), ()]
+
+    def test_gold_from_and_countries(self):
+        conn = self.run(["gold", "--from", "2024-01-15", "--countries", "FRA, DEU,", "--no-refresh"])
+        assert [params for _, params in conn.calls] == [(date(2024, 1, 15), ["FRA", "DEU"])] * 2
+        assert REFRESH_FUNCTION not in conn.log
+
+    def test_silver_period(self):
+        conn = self.run(["silver", "--from", "2024-01-01", "--to", "2024-01-31"])
+        assert [params for _, params in conn.calls] == [(date(2024, 1, 1), date(2024, 1, 31), None)] * 2
+
+    def test_invalid_date(self, capsys):
+        with pytest.raises(SystemExit):
+            run_etl.parse_args(["gold", "--from", "15/01/2024"])
+        assert "--from" in capsys.readouterr().err
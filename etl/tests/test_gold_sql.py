@@ -0,0 +1,128 @@
+import sys
+import os
+from datetime import date, timedelta
+
+import psycopg
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db import call_stages
+
+# Base de test où les scripts de scripts/ ont été exécutés (image etl/Dockerfile) ; chaque test
+# travaille dans une transaction annulée à la fin, sur un pays fictif
+DATABASE_URL = os.getenv("ETL_TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="ETL_TEST_DATABASE_URL non défini")
+
+COUNTRY = "ZZT"
+START = date(2021, 3, 1)
+# Colonnes des dimensions par pays, toujours complétées par silver.final_clean_bronze
+DIMENSION_VALUES = {
+    "gdp_per_capita": 30000, "human_development_index": 0.9, "life_expectancy": 80, "extreme_poverty": 0.1,
+    "hospital_beds_per_thousand": 5, "median_age": 40, "aged_65_older": 0.2, "aged_70_older": 0.1,
+    "reproduction_rate": 1, "icu_patients": 10, "hosp_patients": 20,
+    "total_vaccinations": 0, "people_vaccinated": 0, "people_fully_vaccinated": 0, "total_boosters": 0,
+    "new_vaccinations_smoothed": 0, "new_vaccinations_smoothed_per_million": 0,
+    "new_people_vaccinated_smoothed": 0, "new_people_vaccinated_smoothed_per_hundred": 0,
+}
+
+
+@pytest.fixture
+def conn():
+    with psycopg.connect(DATABASE_URL) as connection:
+        yield connection
+        connection.rollback()
+
+
+def add_silver_days(conn, first, days, **values):
+    """Jours du pays fictif dans silver.covid_cleaned_final."""
+    values = {**DIMENSION_VALUES, **values}
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    for offset in range(first, first + days):
+        conn.execute(
+            "INSERT INTO silver.covid_cleaned_final (iso_code, continent, country, date, population,"
+            f" new_cases, total_cases, {columns})"
+            f" VALUES (%s, 'Test', 'Testland', %s, 1000, 10, %s, {placeholders})",
+            (COUNTRY, START + timedelta(offset), 10 * (offset + 1), *values.values()),
+        )
+
+
+def load(conn, date_from=None):
+    stages = {}
+    for function in ("gold.load_dimensions", "gold.load_fact"):
+        stages.update(call_stages(conn, function, (date_from, [COUNTRY])))
+    return stages
+
+
+def count(conn, query):
+    return conn.execute(query, (COUNTRY,)).fetchone()[0]
+
+
+FACTS = ("SELECT COUNT(*) FROM gold.fact_covid_metrics f"
+         " JOIN gold.dim_country c USING (country_id) WHERE c.iso_code = %s")
+WATERMARK = "SELECT max_date FROM gold.load_watermark WHERE iso_code = %s"
+ECONOMIC = ("SELECT COUNT(*) FROM gold.dim_economic e"
+            " JOIN gold.dim_country c USING (country_id) WHERE c.iso_code = %s")
+
+
+def test_first_load_sets_watermark(conn):
+    add_silver_days(conn, 0, 5)
+    stages = load(conn)
+    assert stages["gold.fact_covid_metrics"]["rows"] == 5
+    assert count(conn, FACTS) == 5
+    assert count(conn, WATERMARK) == START + timedelta(4)
+
+
+def test_reload_is_idempotent(conn):
+    """Relancer sans nouveau jour n'écrit rien"""
+    add_silver_days(conn, 0, 5)
+    load(conn)
+    stages = load(conn)
+    assert all(stage["rows"] == 0 for stage in stages.values())
+    assert count(conn, ECONOMIC) == 1
+    assert count(conn, FACTS) == 5
+
+
+def test_null_dimension_values_are_not_duplicated(conn):
+    """Index uniques NULLS NOT DISTINCT (PostgreSQL 15+) : une valeur NULL ne crée pas de doublon"""
+    add_silver_days(conn, 0, 5, extreme_poverty=None)
+    for _ in range(2):
+        conn.execute("SELECT * FROM gold.load_dimensions(%s, %s)", (START, [COUNTRY]))
+    assert count(conn, ECONOMIC) == 1
+
+
+def test_new_days_after_watermark(conn):
+    add_silver_days(conn, 0, 5)
+    load(conn)
+    add_silver_days(conn, 5, 2)
+    stages = load(conn)
+    assert stages["gold.fact_covid_metrics"]["rows"] == 2
+    assert count(conn, FACTS) == 7
+    assert count(conn, WATERMARK) == START + timedelta(6)
+
+
+def test_date_from_upserts_revised_facts(conn):
+    """Avec p_from, les faits existants sont mis à jour en place et le filigrane ne recule pas"""
+    add_silver_days(conn, 0, 5)
+    load(conn)
+    conn.execute("UPDATE silver.covid_cleaned_final SET new_cases = 99 WHERE iso_code = %s AND date >= %s",
+                 (COUNTRY, START + timedelta(3)))
+    stages = load(conn, START + timedelta(3))
+    assert stages["gold.fact_covid_metrics"]["rows"] == 2
+    assert count(conn, FACTS) == 5
+    assert count(conn, FACTS + " AND f.new_cases = 99") == 2
+    assert count(conn, WATERMARK) == START + timedelta(4)
+
+
+def test_refresh_aggregates(conn):
+    """La vue gold.mv_country_period reçoit les nouveaux faits, par semaine et par mois uniquement"""
+    add_silver_days(conn, 0, 10)
+    load(conn)
+    call_stages(conn, "gold.refresh_aggregates", ())
+    rows = conn.execute(
+        "SELECT granularity, SUM(new_cases), SUM(days) FROM gold.mv_country_period"
+        " WHERE iso_code = %s GROUP BY granularity ORDER BY granularity",
+        (COUNTRY,),
+    ).fetchall()
+    assert rows == [("month", 100, 10), ("week", 100, 10)]
@@ -0,0 +1,40 @@
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fakes import FakeConnection, FakePool
+from silver import SILVER_FUNCTIONS, clean_silver
+
+
+def test_stages_run_in_order_in_one_transaction():
+    conn = FakeConnection()
+    pool = FakePool(conn)
+    stages = clean_silver(pool, "2024-01-01", None, ("FRA", "DEU"))
+    assert conn.log == ["CONNECT", "BEGIN", "silver.clean_bronze", "silver.final_clean_bronze", "COMMIT"]
+    assert pool.checkouts == 1
+    assert list(stages) == list(SILVER_FUNCTIONS)
+    assert stages["silver.clean_bronze"] == {"rows": 3, "seconds": 0.5}
+
+
+def test_parameters_are_passed_to_both_functions():
+    conn = FakeConnection()
+    clean_silver(FakePool(conn), "2024-01-01", "2024-02-01", iter(["FRA"]))
+    for (query, params), function in zip(conn.calls, SILVER_FUNCTIONS):
+        assert query == f"SELECT stage, row_count, seconds FROM {function}(%s, %s, %s)"
+        assert params == ("2024-01-01", "2024-02-01", ["FRA"])
+
+
+def test_no_filter_passes_nulls():
+    conn = FakeConnection()
+    clean_silver(FakePool(conn))
+    assert [params for _, params in conn.calls] == [(None, None, None)] * 2
+
+
+def test_failure_rolls_back_both_stages():
+    """Une erreur dans final_clean_bronze annule aussi clean_bronze (même transaction)"""
+    conn = FakeConnection(fail_on="silver.final_clean_bronze")
+    with pytest.raises(RuntimeError):
+        clean_silver(FakePool(conn))
+    assert conn.log == ["CONNECT", "BEGIN", "silver.clean_bronze", "silver.final_clean_bronze", "ROLLBACK"]
@@ -1,18 +1,165 @@
 # 🚀 FastAPI – API complète : nouveaux cas, tendance et /predict-all
 
-from fastapi import FastAPI, Form, Request
+import time
+
+# Début de l'import du module : le temps d'import (FastAPI, NumPy…) est exposé par /health/ready et /metrics
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-import joblib
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
+import asyncio
+import datetime
+import functools
+import json
+import logging
 import numpy as np
 import os
 
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
+from batcher import MicroBatcher
+from features import (
+    FEATURES_ALL, build_features, history_from_csv, history_from_json, predict_batch, predict_valid_rows,
+)
+from inference import InferencePool, PoolSaturated
+from metrics import HistogramFamily, StageTimer, no_timer, render_histograms, render_samples
+from pages import PageRenderer
+from payloads import (
+    FORM_MEDIA_TYPES, BatchInputError, UnsupportedPayload,
+    JSON_MEDIA_TYPE, columns_from_rows, decode_columns, media_type,
+)
+from registry import ModelRegistry, ModelWatcher, UnknownCountry
+from responses import FastJSONResponse, output_format, prediction_response
+from warehouse import DEFAULT_PAGE_SIZE, QueryError, Warehouse, WarehouseUnavailable
+
+# Formulaire pré-rendu et pages de résultat (seul le fragment du résultat est rendu par requête)
+pages = PageRenderer.from_env()
+
+logger = logging.getLogger(__name__)
 
 COUNTRY = os.getenv("COUNTRY", "canada") # par défaut, on utilise le Canada pour les modèles
 
-app = FastAPI(title="API COVID-19 – Modèles IA (Canada)")
+# Pool d'inférence : les predict s'exécutent hors de la boucle d'événements
+inference_pool = InferencePool.from_env()
+
+# Entrepôt gold (agrégats des tableaux de bord) : pool asyncpg créé à la première requête
+warehouse = Warehouse.from_env()
+
+# Surveillance du dossier des modèles (en secondes, 0 = désactivée)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+# Jeton exigé par les endpoints /admin (aucun contrôle s'il est vide)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Pays chargés et préchauffés au démarrage, avant de se déclarer prêt (défaut : COUNTRY)
+PRELOAD_COUNTRIES = [c.strip() for c in os.getenv("PRELOAD_COUNTRIES", COUNTRY).split(",") if c.strip()]
+
+# État du démarrage, lu par /health/ready et /metrics
+startup = {"ready": False, "import_seconds": None, "warm_up_seconds": None, "error": None}
+
+
+async def warm_up_models():
+    """Charge et préchauffe les modèles de PRELOAD_COUNTRIES dans un thread, puis déclare l'API prête."""
+    started = time.perf_counter()
+    try:
+        durations = await asyncio.to_thread(registry.preload, PRELOAD_COUNTRIES)
+    except Exception as e:
+        logger.exception("Échec du préchauffage des modèles")
+        startup["error"] = str(e)
+        return
+    startup["warm_up_seconds"] = time.perf_counter() - started
+    startup["ready"] = True
+    logger.info("Modèles préchauffés en %.2f s : %s", startup["warm_up_seconds"], durations)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Le préchauffage tourne en tâche de fond : le serveur accepte les connexions
+    # (et répond à /health/live) pendant que les modèles se chargent
+    warm_up_task = asyncio.create_task(warm_up_models())
+    watcher = None
+    if MODEL_WATCH_INTERVAL > 0:
+        watcher = ModelWatcher(registry, MODEL_WATCH_INTERVAL)
+        watcher.start()
+    yield
+    warm_up_task.cancel()
+    if watcher is not None:
+        watcher.stop()
+    await warehouse.close()
+
+
+app = FastAPI(title="API COVID-19 – Modèles IA (Canada)", lifespan=lifespan)
+
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(UnknownCountry)
+async def unknown_country_handler(request: Request, exc: UnknownCountry):
+    return JSONResponse(status_code=404, content={"error": str(exc)})
+
+
+@app.exception_handler(QueryError)
+async def query_error_handler(request: Request, exc: QueryError):
+    return JSONResponse(status_code=422, content={"error": str(exc)})
+
+
+@app.exception_handler(WarehouseUnavailable)
+async def warehouse_unavailable_handler(request: Request, exc: WarehouseUnavailable):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+
+@app.exception_handler(BatchInputError)
+async def batch_input_error_handler(request: Request, exc: BatchInputError):
+    status_code = 415 if isinstance(exc, UnsupportedPayload) else 422
+    return JSONResponse(status_code=status_code, content={"error": str(exc)})
+
+# Métriques : durée totale des requêtes, et durée de chaque étape (lecture des entrées,
+# construction des features, predict de chaque modèle, rendu), par endpoint et par pays
+REQUEST_SECONDS = HistogramFamily(
+    "covid_api_request_duration_seconds", "Durée des requêtes HTTP",
+    ("endpoint", "country", "method", "status"),
+)
+STAGE_SECONDS = HistogramFamily(
+    "covid_api_stage_duration_seconds", "Durée des étapes du traitement d'une prédiction",
+    ("stage", "endpoint", "country"),
+)
+
+
+def metric_labels(request):
+    """Endpoint (modèle de route, pas l'URL) et pays ; valeurs bornées pour limiter le nombre de séries."""
+    route = request.scope.get("route")
+    country = request.path_params.get("country", "")
+    if country and country not in registry.countries:
+        country = "inconnu"
+    return (route.path if route is not None else "inconnu"), country
+
+
+def stage_timer(request):
+    return StageTimer(STAGE_SECONDS, *metric_labels(request))
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    request.state.started = time.perf_counter()
+    response = await call_next(request)
+    endpoint, country = metric_labels(request)
+    REQUEST_SECONDS.labels(endpoint, country, request.method, response.status_code).observe(
+        time.perf_counter() - request.state.started
+    )
+    return response
+
+
+def form_parsed(request):
+    """Chronomètre d'un endpoint à formulaire ; le décodage du formulaire par FastAPI, fait
+    avant l'appel du handler, est compté depuis l'entrée dans le middleware."""
+    timer = stage_timer(request)
+    timer.observe("parse", time.perf_counter() - request.state.started)
+    return timer
 
 # Middleware CORS
 app.add_middleware(
@@ -23,21 +170,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Chargement dynamique des modèles
-def load_models(country):
-    try:
-        model_cas = joblib.load(f"model/model_xgboost_covid_{country}.pkl")
-        model_tendance = joblib.load(f"model/modele_tendance_covid_rf_{country}.pkl")
-        return model_cas, model_tendance
-    except:
-        # Fallback Canada si modèle spécifique absent
-        return joblib.load("model/model_xgboost_covid.pkl"), joblib.load("model/modele_tendance_covid_rf.pkl")
+# Registre des modèles : tous les pays servis par un seul processus, chargés au premier appel
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "model"))
+registry = ModelRegistry.from_env(MODEL_DIR)
+
+
+async def get_models(country):
+    """Modèles d'un pays ; un premier chargement se fait dans le pool pour ne pas bloquer la boucle."""
+    models = registry.peek(country)
+    if models is None:
+        models = await inference_pool.run(registry.get, country)
+    return models
+
+# Nombre maximum de lignes acceptées par appel batch
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "100000"))
+
+
+async def read_columns(request, schema):
+    """
+    Lit les entrées d'une requête de prédiction en colonnes NumPy, quel que soit le format :
+    formulaire, JSON (lignes, colonnes ou ligne unique), binaire colonnes float32 ou Arrow.
+    Seules les features du schéma des modèles (`schema.inputs`) sont exigées ; sans en-tête
+    X-Features, les colonnes binaires sont dans l'ordre de FEATURES_ALL.
+    """
+    content_type = request.headers.get("content-type", "")
+    if media_type(content_type) in FORM_MEDIA_TYPES:
+        form = await request.form()
+        return columns_from_rows([dict(form)], schema.inputs)
+    names = request.headers.get("x-features")
+    names = [n.strip() for n in names.split(",")] if names else FEATURES_ALL
+    return decode_columns(await request.body(), content_type, schema.inputs, names)
+
+
+async def form_features(request, schema, names, timer):
+    """
+    Ligne d'un formulaire HTML dans l'ordre `names` (features d'un modèle), validée par
+    le schéma ; BatchInputError si un champ manque ou sort de ses bornes.
+    """
+    form = await request.form()
+    with timer("features"):
+        columns = columns_from_rows([dict(form)], names)
+        validation = schema.validate(columns, names)
+        if not validation.all_valid:
+            raise BatchInputError("Entrée invalide – " + " ; ".join(validation.rejected[0]["errors"]))
+        return np.column_stack([columns[f] for f in names])
+
+
+def predict_history(models, history, timer=no_timer):
+    """Construit les features d'un historique brut puis prédit toutes ses dates valides."""
+    with timer("history"):
+        dates, columns = build_features(history)
+    if len(dates) == 0:
+        return dates, np.empty(0), np.empty(0, dtype=str), []
+    return (dates,) + predict_valid_rows(models, columns, timer)
+
+
+def predict_rows(country, rows, timer=no_timer):
+    """Prédit un lot de lignes déjà validées (vecteurs dans l'ordre de `schema.inputs`), pour le micro-batcher."""
+    models = registry.get(country)
+    matrix = np.vstack(rows)
+    columns = {f: matrix[:, i] for i, f in enumerate(models.schema.inputs)}
+    pred_cas, pred_tendance = predict_batch(models, columns, timer)
+    return list(zip(pred_cas, pred_tendance))
+
+
+# Micro-batching des requêtes unitaires de /api/{country}/predict-all-json (désactivé par défaut)
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "0") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2"))
 
-# Chargement des modèles en fonction du pays
-model_cas, model_tendance = load_models(COUNTRY)
+# Un micro-batcher par pays : un lot ne mélange jamais les modèles de deux pays
+micro_batchers = {}
 
-# Templates
-templates = Jinja2Templates(directory="templates")
+
+def get_micro_batcher(country):
+    if not MICRO_BATCH_ENABLED:
+        return None
+    if country not in micro_batchers:
+        # Les étapes d'un lot sont comptées pour l'endpoint qui l'alimente
+        timer = StageTimer(STAGE_SECONDS, "/api/{country}/predict-all-json", country)
+        micro_batchers[country] = MicroBatcher(
+            functools.partial(predict_rows, country, timer=timer),
+            runner=lambda fn, items: inference_pool.run(fn, items),
+            max_batch=MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+        )
+    return micro_batchers[country]
 
 @app.get("/country")
 def get_country():
@@ -56,161 +274,312 @@ def get_predict_by_country():
 
 @app.get("/", response_class=HTMLResponse)
 async def get_formulaire_prediction(request: Request):
-    return templates.TemplateResponse(request, "template.html")
+    # Champs du formulaire : les features du schéma des modèles servis
+    models = await get_models(COUNTRY)
+    return pages.form_response(request, models.schema.inputs)
+
+
+def form_error(request, models, label, e):
+    """Page d'erreur d'un formulaire : 422 si la saisie est invalide, 500 si la prédiction échoue."""
+    if isinstance(e, BatchInputError):
+        return pages.result_response(request, models.schema.inputs, status_code=422, prediction=None, error=str(e))
+    logger.exception("Échec de la prédiction %s", label)
+    return pages.result_response(request, models.schema.inputs, status_code=500, prediction=None, error=str(e))
+
 
 # Prédiction des nouveaux cas
-@app.post("/canada/predict-cases", response_class=HTMLResponse)
-async def predict_cases(
-    request: Request,
-    new_cases_lag1: float = Form(...),
-    new_cases_lag7: float = Form(...),
-    new_cases_ma7: float = Form(...),
-    growth_rate: float = Form(...),
-    reproduction_rate: float = Form(...),
-    positive_rate: float = Form(...),
-    icu_patients: float = Form(...),
-    hosp_patients: float = Form(...),
-    stringency_index: float = Form(...),
-    vaccinated_rate: float = Form(...),
-    boosted_rate: float = Form(...)
-):
-    X = np.array([[
-        new_cases_lag1, new_cases_lag7, new_cases_ma7, growth_rate,
-        reproduction_rate, positive_rate, icu_patients, hosp_patients,
-        stringency_index, vaccinated_rate, boosted_rate
-    ]])
+@app.post("/{country}/predict-cases", response_class=HTMLResponse)
+async def predict_cases(country: str, request: Request):
+    timer = form_parsed(request)
+    models = await get_models(country)
     try:
-        y_pred = model_cas.predict(X)[0]
-        return templates.TemplateResponse(request, "template.html", {
-            "prediction": round(y_pred, 0),
-            "type": "cas"
-        })
+        # Features du modèle des cas dans l'ordre de son schéma (model_features*.pkl)
+        X = await form_features(request, models.schema, models.schema.cas, timer)
+        y_pred = (await inference_pool.run(timer.wrap("predict_cas", models.model_cas.predict), X))[0]
+        with timer("render"):
+            return pages.result_response(request, models.schema.inputs, prediction=round(y_pred, 0), type="cas")
+    except PoolSaturated:
+        raise
     except Exception as e:
-        return templates.TemplateResponse(request, "template.html", {"prediction": None, "error": str(e)})
+        return form_error(request, models, "des cas", e)
 
 # Prédiction de tendance
-@app.post("/canada/predict-tendance", response_class=HTMLResponse)
-async def predict_tendance(
-    request: Request,
-    new_cases_7d_avg: float = Form(...),
-    new_deaths_7d_avg: float = Form(...),
-    lag_1: float = Form(...),
-    lag_2: float = Form(...),
-    lag_7: float = Form(...),
-    month: int = Form(...),
-    day_of_week: int = Form(...),
-    reproduction_rate: float = Form(...),
-    people_vaccinated: float = Form(...),
-    stringency_index: float = Form(...)
-):
-    X = np.array([[
-        new_cases_7d_avg, new_deaths_7d_avg,
-        lag_1, lag_2, lag_7, month, day_of_week,
-        reproduction_rate, people_vaccinated, stringency_index
-    ]])
+@app.post("/{country}/predict-tendance", response_class=HTMLResponse)
+async def predict_tendance(country: str, request: Request):
+    timer = form_parsed(request)
+    models = await get_models(country)
     try:
-        y_pred = model_tendance.predict(X)[0]
-        return templates.TemplateResponse(request, "template.html", {
-            "prediction": y_pred,
-            "type": "tendance"
-        })
+        X = await form_features(request, models.schema, models.schema.tendance, timer)
+        y_pred = (await inference_pool.run(timer.wrap("predict_tendance", models.model_tendance.predict), X))[0]
+        with timer("render"):
+            return pages.result_response(request, models.schema.inputs, prediction=y_pred, type="tendance")
+    except PoolSaturated:
+        raise
     except Exception as e:
-        return templates.TemplateResponse(request, "template.html", {"prediction": None, "error": str(e)})
-
-@app.post("/canada/predict-all")
-async def predict_all(
-    request: Request,
-    new_cases_lag1: float = Form(...),
-    new_cases_lag7: float = Form(...),
-    new_cases_ma7: float = Form(...),
-    reproduction_rate: float = Form(...),
-    positive_rate: float = Form(...),
-    icu_patients: float = Form(...),
-    hosp_patients: float = Form(...),
-    stringency_index: float = Form(...),
-    vaccinated_rate: float = Form(...),
-    boosted_rate: float = Form(...),
-    new_cases_7d_avg: float = Form(...),
-    new_deaths_7d_avg: float = Form(...),
-    lag_1: float = Form(...),
-    lag_2: float = Form(...),
-    lag_7: float = Form(...),
-    month: int = Form(...),
-    day_of_week: int = Form(...),
-    people_vaccinated: float = Form(...)
-):
+        return form_error(request, models, "de la tendance", e)
+
+@app.post("/{country}/predict-all", response_class=HTMLResponse)
+async def predict_all(country: str, request: Request):
+    timer = form_parsed(request)
+    models = await get_models(country)
     try:
         # Prédiction du nombre de cas
-        X_cas = np.array([[
-            new_cases_lag1, new_cases_lag7, new_cases_ma7,
-            reproduction_rate, positive_rate, icu_patients, hosp_patients,
-            stringency_index, vaccinated_rate, boosted_rate
-        ]])
-        pred_cas = model_cas.predict(X_cas)[0]
+        X_cas = await form_features(request, models.schema, models.schema.cas, timer)
+        pred_cas = (await inference_pool.run(timer.wrap("predict_cas", models.model_cas.predict), X_cas))[0]
 
         # Prédiction de la tendance
-        X_tendance = np.array([[
-            new_cases_7d_avg, new_deaths_7d_avg, lag_1, lag_2, lag_7,
-            month, day_of_week, reproduction_rate,
-            people_vaccinated, stringency_index
-        ]])
-        pred_tendance = model_tendance.predict(X_tendance)[0]
-
-        return templates.TemplateResponse(request, "template.html", {
-            "prediction": f"{round(pred_cas)} cas / Tendance épidémique : {pred_tendance}",
-            "type": "all"
-        })
+        X_tendance = await form_features(request, models.schema, models.schema.tendance, timer)
+        pred_tendance = (await inference_pool.run(
+            timer.wrap("predict_tendance", models.model_tendance.predict), X_tendance
+        ))[0]
+
+        with timer("render"):
+            return pages.result_response(
+                request, models.schema.inputs,
+                prediction=f"{round(pred_cas)} cas / Tendance épidémique : {pred_tendance}", type="all",
+            )
 
+    except PoolSaturated:
+        raise
     except Exception as e:
-        return templates.TemplateResponse(request, "template.html", {
-            "prediction": None,
-            "error": str(e)
+        return form_error(request, models, "combinée", e)
+
+
+# Création du second endpoint JSON, pour les appels automatisés pour la simulation de 2025
+@app.post("/api/{country}/predict-all-json")
+async def predict_all_json(country: str, request: Request):
+    timer = stage_timer(request)
+    models = await get_models(country)
+    schema = models.schema
+    with timer("parse"):
+        columns = await read_columns(request, schema)
+    if len(columns[schema.inputs[0]]) != 1:
+        raise BatchInputError("Une seule ligne attendue, utilisez /predict-batch-json pour un lot")
+    with timer("validate"):
+        validation = schema.validate(columns)
+    if not validation.all_valid:
+        return JSONResponse(status_code=422, content={
+            "error": "Entrée invalide", "errors": validation.rejected[0]["errors"]
         })
 
+    micro_batcher = get_micro_batcher(country)
+    try:
+        if micro_batcher is not None:
+            # La ligne est regroupée avec les requêtes concurrentes en un seul predict
+            row = np.array([columns[f][0] for f in schema.inputs], dtype=float)
+            prediction_cas, prediction_tendance = await micro_batcher.submit(row)
+        else:
+            pred_cas, pred_tendance = await inference_pool.run(predict_batch, models, columns, timer)
+            prediction_cas, prediction_tendance = pred_cas[0], pred_tendance[0]
+
+        with timer("render"):
+            return FastJSONResponse(content={
+                "prediction_nouveaux_cas": round(float(prediction_cas), 2),
+                "prediction_tendance": str(prediction_tendance)
+            })
+
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        logger.exception("Échec de la prédiction")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# Endpoint batch : des milliers de lignes en un seul appel (simulation, traitements automatisés)
+@app.post("/api/{country}/predict-batch-json")
+async def predict_batch_json(country: str, request: Request):
+    timer = stage_timer(request)
+    fmt = output_format(request)
+    models = await get_models(country)
+    with timer("parse"):
+        columns = await read_columns(request, models.schema)
+
+    n_rows = len(columns[models.schema.inputs[0]])
+    if n_rows == 0:
+        return prediction_response(fmt, np.empty(0), np.empty(0, dtype=str))
+    if n_rows > BATCH_MAX_ROWS:
+        return JSONResponse(status_code=413, content={
+            "error": f"Trop de lignes ({n_rows}), maximum {BATCH_MAX_ROWS}"
+        })
 
-# Création du second endpoint JSON, pour les appels automatisés pour la simulation de 2025 
-@app.post("/api/canada/predict-all-json")
-async def predict_all_json(
-    new_cases_lag1: float = Form(...),
-    new_cases_lag7: float = Form(...),
-    new_cases_ma7: float = Form(...),
-    reproduction_rate: float = Form(...),
-    positive_rate: float = Form(...),
-    icu_patients: float = Form(...),
-    hosp_patients: float = Form(...),
-    stringency_index: float = Form(...),
-    vaccinated_rate: float = Form(...),
-    boosted_rate: float = Form(...),
-    new_cases_7d_avg: float = Form(...),
-    new_deaths_7d_avg: float = Form(...),
-    lag_1: float = Form(...),
-    lag_2: float = Form(...),
-    lag_7: float = Form(...),
-    month: int = Form(...),
-    day_of_week: int = Form(...),
-    people_vaccinated: float = Form(...)
-):
     try:
-        # Préparation des données pour la prédiction des cas
-        features_cas = np.array([[
-            new_cases_lag1, new_cases_lag7, new_cases_ma7,
-            reproduction_rate, positive_rate, icu_patients, hosp_patients,
-            stringency_index, vaccinated_rate, boosted_rate
-        ]])
-        prediction_cas = model_cas.predict(features_cas)[0]
-
-        # Préparation des données pour la prédiction de la tendance
-        features_tendance = np.array([[
-            new_cases_7d_avg, new_deaths_7d_avg, lag_1, lag_2, lag_7,
-            month, day_of_week, reproduction_rate,
-            people_vaccinated, stringency_index
-        ]])
-        prediction_tendance = model_tendance.predict(features_tendance)[0]
-
-        return JSONResponse(content={
-            "prediction_nouveaux_cas": round(float(prediction_cas), 2),
-            "prediction_tendance": prediction_tendance
+        # Les lignes invalides sont écartées une à une, le reste du lot est prédit
+        pred_cas, pred_tendance, rejected = await inference_pool.run(predict_valid_rows, models, columns, timer)
+        with timer("render"):
+            return prediction_response(fmt, pred_cas, pred_tendance, rejected=rejected)
+
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        logger.exception("Échec de la prédiction du lot")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# Historique journalier brut (format de dataset/test_data_canada.csv) : les features sont
+# calculées côté serveur et toutes les dates sont prédites en un seul appel
+@app.post("/api/{country}/predict-history")
+async def predict_history_json(country: str, request: Request):
+    timer = stage_timer(request)
+    fmt = output_format(request)
+    models = await get_models(country)
+    media = media_type(request.headers.get("content-type", ""))
+    body = await request.body()
+    with timer("parse"):
+        if media == "text/csv":
+            history = history_from_csv(body.decode("utf-8"))
+        elif media in (JSON_MEDIA_TYPE, ""):
+            try:
+                history = history_from_json(json.loads(body))
+            except ValueError:
+                raise BatchInputError("Corps JSON invalide")
+        else:
+            raise UnsupportedPayload(f"Type de contenu non pris en charge : {media}")
+
+    n_rows = len(history.get("date") or [])
+    if n_rows > BATCH_MAX_ROWS:
+        return JSONResponse(status_code=413, content={
+            "error": f"Trop de lignes ({n_rows}), maximum {BATCH_MAX_ROWS}"
         })
 
+    try:
+        dates, pred_cas, pred_tendance, rejected = await inference_pool.run(predict_history, models, history, timer)
+    except (PoolSaturated, BatchInputError):
+        raise
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
\ No newline at end of file
+        logger.exception("Échec de la prédiction de l'historique")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    with timer("render"):
+        return prediction_response(fmt, pred_cas, pred_tendance, dates, rejected)
+
+
+# Agrégats de l'entrepôt gold par pays et par semaine ou par mois, une page à la fois :
+# la page suivante se lit avec ?after=<next> (pagination par clé, sans OFFSET)
+@app.get("/api/aggregates/{granularity}")
+async def get_aggregates(
+    granularity: str,
+    columns: str = None,
+    countries: str = None,
+    date_from: datetime.date = Query(default=None, alias="from"),
+    date_to: datetime.date = Query(default=None, alias="to"),
+    after: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    codes = [c.strip().upper() for c in countries.split(",") if c.strip()] if countries else None
+    content = await warehouse.aggregates(granularity, columns, codes, date_from, date_to, after, limit)
+    return FastJSONResponse(content)
+
+
+# Statistiques des micro-batchers par pays (temps d'attente en file et taille des lots)
+@app.get("/api/batcher/stats")
+def get_batcher_stats():
+    if not MICRO_BATCH_ENABLED:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "countries": {country: b.stats() for country, b in micro_batchers.items()},
+    }
+
+
+# Compteurs du cache de prédictions (PREDICTION_CACHE_SIZE > 0), par fichier de modèle
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    if registry.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "models": registry.cache_stats()}
+
+
+# État du registre : pays chargés en mémoire et taille des modèles
+@app.get("/api/models")
+def get_loaded_models():
+    return {
+        "countries": sorted(registry.countries),
+        "loaded": registry.loaded_countries(),
+        "loaded_bytes": registry.loaded_bytes,
+        "max_bytes": registry.max_bytes,
+    }
+
+
+# Vivacité : le processus répond (ne dépend pas des modèles)
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+# Disponibilité : 503 tant que les modèles de PRELOAD_COUNTRIES ne sont pas chargés et préchauffés
+@app.get("/health/ready")
+def health_ready():
+    content = {
+        "status": "ready" if startup["ready"] else ("error" if startup["error"] else "starting"),
+        "import_seconds": startup["import_seconds"],
+        "warm_up_seconds": startup["warm_up_seconds"],
+        "loaded": registry.loaded_countries(),
+    }
+    if startup["error"]:
+        content["error"] = startup["error"]
+    return JSONResponse(status_code=200 if startup["ready"] else 503, content=content)
+
+
+# Métriques au format texte Prometheus : durées des requêtes et des étapes, micro-batchers,
+# cache de prédictions, file du pool d'inférence et modèles chargés
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    blocks = [REQUEST_SECONDS.render(), STAGE_SECONDS.render()]
+    if MICRO_BATCH_ENABLED:
+        batchers = sorted(micro_batchers.items())
+        blocks.append(render_histograms(
+            "micro_batch_queue_wait_seconds", "Temps passé par une requête dans la file du micro-batcher",
+            [({"country": c}, b.queue_wait) for c, b in batchers],
+        ))
+        blocks.append(render_histograms(
+            "micro_batch_size", "Nombre de lignes par appel predict groupé",
+            [({"country": c}, b.batch_size) for c, b in batchers],
+        ))
+    if registry.cache is not None:
+        stats = sorted(registry.cache_stats().items())
+        blocks.append(render_samples(
+            "prediction_cache_hits_total", "Lignes servies depuis le cache de prédictions", "counter",
+            [({"model": key}, s["hits"]) for key, s in stats],
+        ))
+        blocks.append(render_samples(
+            "prediction_cache_misses_total", "Lignes prédites faute d'entrée dans le cache", "counter",
+            [({"model": key}, s["misses"]) for key, s in stats],
+        ))
+    blocks.append(render_samples(
+        "inference_pool_pending", "Appels predict en cours ou en attente dans le pool d'inférence", "gauge",
+        [({}, inference_pool.pending)],
+    ))
+    blocks.append(render_samples(
+        "models_loaded_bytes", "Taille des modèles chargés en mémoire", "gauge",
+        [({}, registry.loaded_bytes)],
+    ))
+    blocks.append(render_samples(
+        "models_loaded", "Pays dont les modèles sont chargés en mémoire", "gauge",
+        [({"country": c}, 1) for c in sorted(registry.loaded_countries())],
+    ))
+    blocks.append(render_samples(
+        "app_startup_seconds", "Durée des phases du démarrage", "gauge",
+        [({"phase": phase}, startup[f"{phase}_seconds"]) for phase in ("import", "warm_up")
+         if startup[f"{phase}_seconds"] is not None],
+    ))
+    blocks.append(render_samples("app_ready", "API prête à servir des prédictions", "gauge",
+                                 [({}, int(startup["ready"]))]))
+    return "".join(blocks)
+
+
+# Rechargement à chaud des modèles après dépôt de nouveaux fichiers .pkl
+@app.post("/admin/reload")
+async def reload_models(country: str = None, x_admin_token: str = Header(default="")):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Jeton d'administration invalide"})
+    try:
+        # Chargement et préchauffage dans un thread : les requêtes continuent d'être servies
+        changed = await asyncio.to_thread(registry.reload, [country] if country else None)
+    except UnknownCountry:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Rechargement annulé : {e}"})
+    return {"reloaded": [c for c, v in changed.items() if v], "unchanged": [c for c, v in changed.items() if not v]}
+
+
+startup["import_seconds"] = time.perf_counter() - IMPORT_STARTED
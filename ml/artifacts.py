@@ -0,0 +1,138 @@
+# 📦 Formats des modèles sans pickle : XGBoost au format natif UBJSON, RandomForest en
+# tableaux .npy projetés en mémoire et partagés entre les processus
+#
+#   python artifacts.py                     # exporte tous les .pkl de ml/model à côté des originaux
+#   python artifacts.py model/modele_tendance_covid_rf_canada.pkl
+
+import argparse
+import os
+import shutil
+
+from tree_ensemble import compile_model, load_arrays, save_arrays
+
+# Extensions des formats exportés, par ordre de préférence au chargement
+XGB_EXTENSION = ".ubj"
+ARRAYS_EXTENSION = ".arrays"
+EXPORT_EXTENSIONS = (XGB_EXTENSION, ARRAYS_EXTENSION)
+
+
+def export_path(pickle_path, model):
+    """Chemin de l'export d'un modèle : même nom que le .pkl, extension selon le format."""
+    stem = os.path.splitext(pickle_path)[0]
+    if type(model).__name__ == "XGBRegressor":
+        return stem + XGB_EXTENSION
+    return stem + ARRAYS_EXTENSION
+
+
+def export_model(model, path):
+    """
+    Écrit `model` dans le format de `path` : UBJSON pour XGBoost (save_model), dossier de
+    tableaux .npy (évaluateur NumPy) pour les forêts. L'écriture se fait sous un nom
+    temporaire puis par renommage, pour qu'un lecteur ne voie jamais un export partiel.
+    """
+    tmp = path + ".tmp"
+    _remove(tmp)
+    if path.endswith(XGB_EXTENSION):
+        model.save_model(tmp)
+    elif path.endswith(ARRAYS_EXTENSION):
+        save_arrays(compile_model(model), tmp)
+    else:
+        raise ValueError(f"Format d'export inconnu : {path}")
+    _replace(tmp, path)
+    return path
+
+
+def load_model(path):
+    """Charge un modèle exporté par `export_model`."""
+    if path.endswith(XGB_EXTENSION):
+        import xgboost
+
+        model = xgboost.XGBRegressor()
+        model.load_model(path)
+        return model
+    if path.endswith(ARRAYS_EXTENSION):
+        return load_arrays(path, mmap_mode="r")
+    raise ValueError(f"Format de modèle inconnu : {path}")
+
+
+def link_export(source, target):
+    """
+    Reproduit l'export `source` sous le nom `target` par liens physiques : deux noms
+    pour les mêmes fichiers, donc les mêmes pages en mémoire (copie si impossible).
+    """
+    tmp = target + ".tmp"
+    _remove(tmp)
+    if os.path.isdir(source):
+        os.makedirs(tmp)
+        for name in os.listdir(source):
+            _link_or_copy(os.path.join(source, name), os.path.join(tmp, name))
+    else:
+        _link_or_copy(source, tmp)
+    _replace(tmp, target)
+    return target
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _replace(tmp, path):
+    # os.replace ne remplace pas un dossier non vide : l'ancien export est d'abord écarté
+    if os.path.isdir(path):
+        old = path + ".old"
+        _remove(old)
+        os.rename(path, old)
+        os.rename(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, path)
+
+
+def export_all(paths):
+    """Exporte des fichiers .pkl ; un .pkl identique à un autre déjà exporté est relié à son export."""
+    import joblib
+
+    # Import local : registry.py dépend de ce module
+    from registry import file_key
+
+    exported = {}
+    for path in paths:
+        digest = file_key(path)
+        if digest in exported:
+            source = exported[digest]
+            target = os.path.splitext(path)[0] + os.path.splitext(source)[1]
+            yield path, link_export(source, target), True
+            continue
+        model = joblib.load(path)
+        exported[digest] = export_model(model, export_path(path, model))
+        yield path, exported[digest], False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporte les modèles .pkl en UBJSON (XGBoost) et tableaux .npy (forêts)")
+    parser.add_argument("models", nargs="*", help="Fichiers .pkl à exporter (défaut : tous les modèles de ml/model)")
+    args = parser.parse_args(argv)
+
+    paths = args.models
+    if not paths:
+        model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+        paths = sorted(
+            os.path.join(model_dir, name) for name in os.listdir(model_dir)
+            if name.endswith(".pkl") and not name.startswith("model_features")
+        )
+    for path, target, linked in export_all(paths):
+        print(f"{path} -> {target}{' (lien vers un export identique)' if linked else ''}")
+
+
+if __name__ == "__main__":
+    main()
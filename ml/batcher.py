@@ -0,0 +1,100 @@
+# 🧺 Micro-batching : regroupe les requêtes unitaires concurrentes en un seul predict
+
+import asyncio
+import time
+
+from metrics import Histogram
+
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    """
+    Collecte les éléments soumis pendant au plus `max_wait_ms` millisecondes
+    (ou jusqu'à `max_batch` éléments), appelle `batch_fn` une seule fois sur le
+    lot, puis renvoie à chaque appelant le résultat qui lui correspond.
+
+    `batch_fn(items)` doit renvoyer une liste de résultats dans le même ordre
+    que `items`. Il est exécuté via `runner` (par ex. `InferencePool.run`) pour
+    ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, batch_fn, runner, max_batch=64, max_wait_ms=2.0):
+        self.batch_fn = batch_fn
+        self.runner = runner
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue_wait = Histogram(
+            "micro_batch_queue_wait_seconds",
+            "Temps passé par une requête dans la file du micro-batcher",
+            QUEUE_WAIT_BUCKETS,
+        )
+        self.batch_size = Histogram(
+            "micro_batch_size",
+            "Nombre de lignes par appel predict groupé",
+            BATCH_SIZE_BUCKETS,
+        )
+        self._loop = None
+        self._queue = None
+        self._collector = None
+        self._inflight = set()
+
+    async def submit(self, item):
+        """Ajoute un élément au prochain lot et attend son résultat."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        future = loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    def stats(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+
+    def _start(self, loop):
+        # Une file et une tâche de collecte par boucle d'événements
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._collector = loop.create_task(self._collect(self._queue))
+
+    async def _collect(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Le lot suivant se constitue pendant que celui-ci est prédit
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(now - enqueued)
+        self.batch_size.observe(len(batch))
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = await self.runner(self.batch_fn, items)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
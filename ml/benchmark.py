@@ -0,0 +1,207 @@
+# ⏱️ Benchmarks hors ligne : latence des predict, débit de l'API, durée des simulations
+#
+#   python benchmark.py                                   # affiche les mesures
+#   python benchmark.py --save benchmarks/baseline.json   # enregistre une référence
+#   python benchmark.py --compare benchmarks/baseline.json  # code de sortie 1 en cas de régression
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent
+MODEL_DIR = ML_DIR / "model"
+BATCH_SIZES = (1, 64, 1024, 16384)
+# Indicateurs où une valeur plus grande est meilleure (les autres sont des durées)
+HIGHER_IS_BETTER = ("rps",)
+
+
+def timings(fn, repeat, warm_up=2):
+    """Durées (ms) de `repeat` appels de fn, après quelques appels de chauffe."""
+    for _ in range(warm_up):
+        fn()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def describe(durations):
+    return {
+        "median_ms": round(statistics.median(durations), 4),
+        "p95_ms": round(float(np.percentile(durations, 95)), 4),
+    }
+
+
+def bench_predict(repeat):
+    """Latence des predict sur les vrais modèles, par moteur et par taille de lot."""
+    from registry import ModelRegistry
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for backend in ("native", "numpy"):
+        pair = ModelRegistry(str(MODEL_DIR), countries=["canada"], backend=backend).get("canada")
+        for label, model in (("cas", pair.model_cas), ("tendance", pair.model_tendance)):
+            for size in BATCH_SIZES:
+                X = rng.uniform(0, 1000, size=(size, model.n_features_in_))
+                # Moins de répétitions pour les gros lots, la durée reste raisonnable
+                n = max(3, repeat // max(1, size // 64))
+                results[f"predict.{backend}.{label}.rows_{size}"] = describe(timings(lambda: model.predict(X), n))
+    return results
+
+
+async def _load(client, requests_, concurrency):
+    """Envoie les requêtes avec `concurrency` clients simultanés ; renvoie les durées et le temps total."""
+    durations = []
+    queue = list(requests_)
+
+    async def worker():
+        while queue:
+            method, url, kwargs = queue.pop()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            durations.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} : HTTP {response.status_code} – {response.text[:200]}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return durations, time.perf_counter() - started
+
+
+def bench_api(n_requests, concurrency):
+    """Débit et latence de bout en bout à travers l'application FastAPI (ASGI en mémoire)."""
+    import httpx
+
+    import app
+    from features import FEATURES_ALL
+    from payloads import BINARY_MEDIA_TYPE, encode_columns
+    from simulation import SCENARIOS, generate_inputs, scenario_dates
+
+    columns = generate_inputs(SCENARIOS["mesures_moyennes"], scenario_dates(horizon=1000), np.random.default_rng(0))
+    row = {f: float(columns[f][0]) for f in FEATURES_ALL}
+    binary = encode_columns(columns, FEATURES_ALL)
+    scenarios = {
+        "api.predict_all_json.form": ("POST", "/api/canada/predict-all-json", {"data": row}),
+        "api.predict_all_json.json": ("POST", "/api/canada/predict-all-json", {"json": row}),
+        "api.predict_batch_json.binary_1000": (
+            "POST", "/api/canada/predict-batch-json",
+            {"content": binary, "headers": {"Content-Type": BINARY_MEDIA_TYPE}},
+        ),
+    }
+
+    async def run():
+        results = {}
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, request in scenarios.items():
+                n = n_requests if "batch" not in name else max(10, n_requests // 20)
+                await _load(client, [request] * concurrency, concurrency)  # chauffe
+                durations, elapsed = await _load(client, [request] * n, concurrency)
+                results[name] = dict(describe(durations), rps=round(n / elapsed, 1))
+        return results
+
+    return asyncio.run(run())
+
+
+def bench_simulation(repeat):
+    """Durée d'une année de scénarios (un tirage) et d'un petit Monte Carlo."""
+    import montecarlo
+    from simulation import SCENARIOS, LocalPredictor, run_scenarios, scenario_dates
+
+    predictor = LocalPredictor(str(MODEL_DIR), "canada")
+    results = {
+        "simulation.3x365": describe(timings(lambda: run_scenarios(predictor, SCENARIOS, seed=0), repeat)),
+    }
+    durations = timings(lambda: montecarlo.run_monte_carlo(
+        SCENARIOS, scenario_dates(), 256, str(MODEL_DIR), "canada", seed=0, workers=1
+    ), 1, warm_up=0)
+    results["simulation.montecarlo_3x256x365"] = describe(durations)
+    return results
+
+
+def environment():
+    import sklearn
+    import xgboost
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Liste des régressions : durée plus de `tolerance` au-dessus de la référence, ou débit en dessous."""
+    regressions = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if not reference:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                worse = value < reference * (1 - tolerance)
+            else:
+                worse = value > reference * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name}.{metric} : {value} (référence {reference})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne de l'API et des simulations")
+    parser.add_argument("--only", help="Groupes à lancer parmi predict, api, simulation (séparés par des virgules)")
+    parser.add_argument("--repeat", type=int, default=50, help="Répétitions par mesure de latence")
+    parser.add_argument("--requests", type=int, default=400, help="Requêtes par scénario de charge")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés pour la charge")
+    parser.add_argument("--save", metavar="FICHIER", help="Enregistre les résultats comme référence")
+    parser.add_argument("--compare", metavar="FICHIER", help="Compare à une référence enregistrée")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Écart toléré avant de signaler une régression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(ML_DIR)
+    groups = {
+        "predict": lambda: bench_predict(args.repeat),
+        "api": lambda: bench_api(args.requests, args.concurrency),
+        "simulation": lambda: bench_simulation(max(3, args.repeat // 10)),
+    }
+    selected = args.only.split(",") if args.only else list(groups)
+
+    results = {}
+    for group in selected:
+        results.update(groups[group]())
+    for name, metrics in results.items():
+        print(f"{name:55s} " + "  ".join(f"{k}={v}" for k, v in metrics.items()))
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"RÉGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# ♻️ Cache des prédictions : les modèles d'arbres sont constants par morceaux,
+# des entrées identiques (ou arrondies à l'identique) donnent la même prédiction
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_MISSING = object()
+
+
+def parse_rounding(spec):
+    """Lit « feature:decimales,... » (ex. « people_vaccinated:-4,reproduction_rate:2 »)."""
+    rounding = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, decimals = item.partition(":")
+        rounding[name.strip()] = int(decimals)
+    return rounding
+
+
+class PredictionCache:
+    """Cache LRU avec expiration optionnelle, sûr entre threads, et compteurs de hits/misses."""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or (entry[1] is not None and entry[1] < now):
+                    values.append(_MISSING)
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                values.append(entry[0])
+                self.hits += 1
+        return values
+
+    def put_many(self, keys, values):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class CachedModel:
+    """
+    Enveloppe un modèle : les lignes déjà vues sont servies depuis le cache, les autres
+    sont prédites en un seul appel. Avec `rounding`, les features sont arrondies avant
+    la recherche (et la prédiction) pour augmenter le taux de hits.
+
+    Une instance est créée par fichier de modèle : quand le registre recharge un
+    fichier modifié, le nouveau modèle arrive avec un cache vide.
+    """
+
+    def __init__(self, model, cache, decimals=None, rounding=None, feature_names=None, max_batch=1024):
+        self.model = model
+        self.cache = cache
+        self.max_batch = max_batch
+        self.n_features_in_ = getattr(model, "n_features_in_", None)
+        if feature_names is None:
+            feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+        self._decimals = self._column_decimals(self.n_features_in_, feature_names, decimals, rounding or {})
+
+    @staticmethod
+    def _column_decimals(n_features, names, decimals, rounding):
+        """Nombre de décimales par colonne (None : pas d'arrondi)."""
+        if n_features is None or (decimals is None and not rounding):
+            return None
+        if names is None:
+            names = [None] * n_features
+        columns = [rounding.get(name, decimals) for name in names]
+        return columns if any(d is not None for d in columns) else None
+
+    def quantize(self, X):
+        X = np.array(X, dtype=float)
+        if self._decimals is not None:
+            for j, decimals in enumerate(self._decimals):
+                if decimals is not None:
+                    X[:, j] = np.round(X[:, j], decimals)
+        return X
+
+    def predict(self, X):
+        X = self.quantize(X)
+        if len(X) > self.max_batch:
+            # Sur les gros lots, le coût des recherches dépasse le gain
+            return self.model.predict(X)
+
+        keys = [row.tobytes() for row in X]
+        values = self.cache.get_many(keys)
+        missing = {}
+        for i, value in enumerate(values):
+            if value is _MISSING:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            # Une seule prédiction par ligne distincte absente du cache
+            first = [rows[0] for rows in missing.values()]
+            predictions = self.model.predict(X[first])
+            self.cache.put_many(list(missing), predictions)
+            for rows, prediction in zip(missing.values(), predictions):
+                for i in rows:
+                    values[i] = prediction
+        return np.asarray(values)
+
+
+def cache_options_from_env():
+    """Options du cache lues dans PREDICTION_CACHE_* ; None si le cache est désactivé."""
+    size = int(os.getenv("PREDICTION_CACHE_SIZE", "0"))
+    if size <= 0:
+        return None
+    decimals = os.getenv("PREDICTION_CACHE_DECIMALS", "")
+    return {
+        "maxsize": size,
+        "ttl": float(os.getenv("PREDICTION_CACHE_TTL", "0")) or None,
+        "decimals": int(decimals) if decimals else None,
+        "rounding": parse_rounding(os.getenv("PREDICTION_CACHE_ROUNDING", "")),
+    }
@@ -0,0 +1,105 @@
+# 🌐 Client asynchrone de l'API batch : connexions persistantes, concurrence bornée,
+# nouvelles tentatives avec attente aléatoire, plusieurs backends à la fois
+
+import asyncio
+import random
+
+import httpx
+import numpy as np
+
+from features import FEATURES_ALL
+from payloads import BINARY_MEDIA_TYPE, encode_columns
+
+# Réponses pour lesquelles une nouvelle tentative a un sens (surcharge, redémarrage)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class RemoteError(RuntimeError):
+    """Réponse d'erreur de l'API, après épuisement des tentatives."""
+
+    def __init__(self, url, status_code, text):
+        super().__init__(f"{url} : HTTP {status_code} – {text[:200]}")
+        self.status_code = status_code
+
+
+class AsyncPredictClient:
+    """
+    Client de /api/{country}/predict-batch-json partagé par toutes les requêtes d'une simulation.
+
+    - connexions keep-alive réutilisées d'une requête à l'autre (pool httpx)
+    - au plus `concurrency` requêtes en vol, tous backends confondus
+    - `timeout` secondes par requête ; en cas d'erreur réseau, de 429 ou de 5xx
+      transitoire, jusqu'à `retries` nouvelles tentatives avec une attente aléatoire
+      (« full jitter ») doublée à chaque essai, au moins égale à l'en-tête Retry-After
+    """
+
+    def __init__(self, concurrency=8, retries=3, timeout=30.0, backoff=0.2, transport=None):
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            headers={"Content-Type": BINARY_MEDIA_TYPE},
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def post(self, url, content):
+        """POST avec nouvelles tentatives ; renvoie le JSON de la réponse."""
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(url, content=content)
+                if response.status_code == 200:
+                    return response.json()
+                error = RemoteError(url, response.status_code, response.text)
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            await asyncio.sleep(self._delay(attempt, retry_after))
+
+    async def predict_columns(self, base_url, country, columns, batch_rows=5000):
+        """Prédit des colonnes en lots de `batch_rows` lignes envoyés en parallèle."""
+        # Réponse en colonnes : ni dictionnaire par ligne côté serveur, ni côté client
+        url = f"{base_url.rstrip('/')}/api/{country}/predict-batch-json?format=columns"
+        n_rows = len(columns[FEATURES_ALL[0]])
+        bodies = [
+            encode_columns({f: columns[f][start:start + batch_rows] for f in FEATURES_ALL}, FEATURES_ALL)
+            for start in range(0, n_rows, batch_rows)
+        ]
+        responses = await asyncio.gather(*(self.post(url, body) for body in bodies))
+        if not responses:
+            return np.empty(0), np.empty(0, dtype=str)
+        pred_cas = np.concatenate([np.asarray(r["cas"], dtype=float) for r in responses])
+        pred_tendance = np.concatenate([np.asarray(r["tendance"], dtype=str) for r in responses])
+        return pred_cas, pred_tendance
+
+    async def fan_out(self, targets, columns, batch_rows=5000):
+        """Envoie les mêmes colonnes à plusieurs backends : {(country, url): (pred_cas, pred_tendance)}"""
+        results = await asyncio.gather(*(
+            self.predict_columns(url, country, columns, batch_rows) for country, url in targets
+        ))
+        return dict(zip(targets, results))
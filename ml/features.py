@@ -0,0 +1,181 @@
+# 🧮 Features des modèles : ordre attendu par chaque modèle et construction à partir
+# d'un historique journalier brut (mêmes calculs que les notebooks)
+
+import csv
+import io
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import no_timer
+from payloads import BatchInputError
+from schema import FeatureSchema, select_rows
+
+# Fenêtre de la moyenne mobile et décalages, comme dans les notebooks d'entraînement
+WINDOW = 7
+LAGS = (1, 2, 7)
+# Nombre de premières lignes sans historique suffisant (lag_7), retirées comme le dropna des notebooks
+WARM_UP_ROWS = max(max(LAGS), WINDOW - 1)
+
+# Ordre des features historique de chaque modèle, utilisé quand le registre ne trouve ni
+# model_features*.pkl ni noms de features dans le modèle (voir ModelRegistry.schema_for)
+FEATURES_CAS = [
+    "new_cases_lag1", "new_cases_lag7", "new_cases_ma7",
+    "reproduction_rate", "positive_rate", "icu_patients", "hosp_patients",
+    "stringency_index", "vaccinated_rate", "boosted_rate"
+]
+FEATURES_TENDANCE = [
+    "new_cases_7d_avg", "new_deaths_7d_avg", "lag_1", "lag_2", "lag_7",
+    "month", "day_of_week", "reproduction_rate",
+    "people_vaccinated", "stringency_index"
+]
+# Les 18 champs acceptés par /api/canada/predict-all-json
+FEATURES_ALL = list(dict.fromkeys(FEATURES_CAS + FEATURES_TENDANCE))
+DEFAULT_SCHEMA = FeatureSchema(FEATURES_CAS, FEATURES_TENDANCE)
+
+REQUIRED_COLUMNS = ("date", "new_cases")
+# Colonnes reprises telles quelles ; absentes de l'historique, elles valent NaN
+# (valeur manquante, gérée nativement par les arbres)
+PASSTHROUGH_COLUMNS = (
+    "reproduction_rate", "stringency_index", "people_vaccinated",
+    "icu_patients", "hosp_patients", "positive_rate", "boosted_rate",
+)
+
+
+def history_from_json(payload):
+    """Historique JSON : liste de lignes (comme le CSV) ou objet de colonnes -> {colonne: liste}"""
+    if isinstance(payload, dict):
+        return payload
+    if isinstance(payload, list) and all(isinstance(row, dict) for row in payload):
+        names = dict.fromkeys(name for row in payload for name in row)
+        return {name: [row.get(name) for row in payload] for name in names}
+    raise BatchInputError("L'historique doit être une liste de lignes ou un objet de colonnes")
+
+
+def history_from_csv(text):
+    """Historique CSV au format de dataset/test_data_canada.csv -> {colonne: liste}"""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if not header:
+        raise BatchInputError("CSV vide")
+    rows = list(reader)
+    if any(len(row) != len(header) for row in rows):
+        raise BatchInputError("Lignes CSV de longueurs différentes")
+    # Les cellules vides deviennent des valeurs manquantes
+    return {
+        name: [row[i] or None for row in rows]
+        for i, name in enumerate(header)
+    }
+
+
+def _numeric(values, name):
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    except (TypeError, ValueError) as e:
+        raise BatchInputError(f"Valeur non numérique ({name}) : {e}")
+
+
+def _shift(values, lag):
+    shifted = np.full_like(values, np.nan)
+    shifted[lag:] = values[:-lag]
+    return shifted
+
+
+def _rolling_mean(values, window):
+    result = np.full_like(values, np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return result
+
+
+def _sorted_dates(history):
+    """Valide la forme de l'historique ; renvoie les dates triées et l'ordre de tri des lignes."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in history]
+    if missing:
+        raise BatchInputError(f"Colonnes manquantes : {', '.join(missing)}")
+    n_rows = len(history["date"]) if isinstance(history["date"], list) else -1
+    if any(not isinstance(values, list) or len(values) != n_rows for values in history.values()):
+        raise BatchInputError("Toutes les colonnes doivent être des listes de même longueur")
+    try:
+        dates = np.array(history["date"], dtype="datetime64[D]")
+    except (TypeError, ValueError) as e:
+        raise BatchInputError(f"Date invalide : {e}")
+
+    order = np.argsort(dates, kind="stable")
+    dates = dates[order]
+    if (np.diff(dates) == np.timedelta64(0, "D")).any():
+        raise BatchInputError("Dates en double dans l'historique")
+    return dates, order
+
+
+def build_features(history):
+    """
+    Calcule toutes les features des deux modèles en une passe vectorisée.
+
+    Les lignes sont triées par date et considérées comme des jours consécutifs
+    (moyennes mobiles et décalages en nombre de lignes, comme dans les notebooks).
+    Renvoie les dates retenues et les colonnes de features, sans les WARM_UP_ROWS
+    premières lignes dont l'historique est incomplet.
+    """
+    dates, order = _sorted_dates(history)
+    n_rows = len(dates)
+
+    def column(name):
+        if name not in history:
+            return np.full(n_rows, np.nan)
+        return _numeric(history[name], name)[order]
+
+    new_cases = column("new_cases")
+    if np.isnan(new_cases).any():
+        raise BatchInputError("new_cases ne doit pas contenir de valeurs manquantes")
+
+    features = {name: column(name) for name in PASSTHROUGH_COLUMNS}
+    features["new_cases_7d_avg"] = features["new_cases_ma7"] = _rolling_mean(new_cases, WINDOW)
+    features["new_deaths_7d_avg"] = _rolling_mean(column("new_deaths"), WINDOW)
+    for lag in LAGS:
+        features[f"lag_{lag}"] = _shift(new_cases, lag)
+    features["new_cases_lag1"] = features["lag_1"]
+    features["new_cases_lag7"] = features["lag_7"]
+    if "vaccinated_rate" in history:
+        features["vaccinated_rate"] = column("vaccinated_rate")
+    else:
+        features["vaccinated_rate"] = features["people_vaccinated"] / column("population")
+    # Calendrier : mois 1-12, jour de la semaine 0 = lundi (dt.dayofweek de pandas)
+    features["month"] = (dates.astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(float)
+    features["day_of_week"] = ((dates.astype(np.int64) + 3) % 7).astype(float)
+
+    keep = slice(WARM_UP_ROWS, None)
+    return dates[keep], {name: values[keep] for name, values in features.items()}
+
+
+def predict_batch(models, columns, timer=no_timer):
+    """Construit une matrice par modèle (ordre du schéma des modèles) et fait un seul appel predict par modèle."""
+    schema = getattr(models, "schema", None) or DEFAULT_SCHEMA
+    with timer("features"):
+        X_cas, X_tendance = schema.matrices(columns)
+    with timer("predict_cas"):
+        pred_cas = np.asarray(models.model_cas.predict(X_cas), dtype=float)
+    with timer("predict_tendance"):
+        pred_tendance = np.asarray(models.model_tendance.predict(X_tendance))
+    return pred_cas, pred_tendance
+
+
+def predict_valid_rows(models, columns, timer=no_timer):
+    """
+    Valide le lot puis ne prédit que les lignes acceptées. Les lignes refusées valent
+    NaN (cas) et None (tendance) ; renvoie aussi la liste des refus (`Validation.rejected`).
+    """
+    schema = getattr(models, "schema", None) or DEFAULT_SCHEMA
+    with timer("validate"):
+        validation = schema.validate(columns)
+    if validation.all_valid:
+        return predict_batch(models, columns, timer) + (validation.rejected,)
+
+    n_rows = len(validation.valid)
+    pred_cas = np.full(n_rows, np.nan)
+    pred_tendance = np.full(n_rows, None, dtype=object)
+    if validation.valid.any():
+        cas, tendance = predict_batch(models, select_rows(columns, validation.valid, schema.inputs), timer)
+        pred_cas[validation.valid] = cas
+        pred_tendance[validation.valid] = tendance
+    return pred_cas, pred_tendance, validation.rejected
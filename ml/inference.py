@@ -0,0 +1,71 @@
+# ⚙️ Exécution des prédictions hors de la boucle d'événements (pool de threads borné)
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(RuntimeError):
+    """Levée quand le pool d'inférence a atteint sa profondeur de file maximale."""
+
+    def __init__(self, retry_after):
+        super().__init__("Serveur saturé, réessayez plus tard")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Pool de threads borné pour les appels predict des modèles.
+
+    XGBoost et scikit-learn relâchent le GIL pendant le parcours des arbres :
+    un pool de threads suffit pour occuper tous les cœurs sans dupliquer les
+    modèles en mémoire comme le ferait un pool de processus.
+
+    Au-delà de `workers + max_queue` tâches en cours, `run` lève `PoolSaturated`
+    au lieu d'empiler indéfiniment les requêtes (backpressure).
+    """
+
+    def __init__(self, workers=None, max_queue=64, retry_after=1):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    @classmethod
+    def from_env(cls):
+        """Construit le pool à partir des variables d'environnement INFERENCE_*."""
+        workers = int(os.getenv("INFERENCE_WORKERS", "0")) or None
+        max_queue = int(os.getenv("INFERENCE_MAX_QUEUE", "64"))
+        retry_after = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+        return cls(workers=workers, max_queue=max_queue, retry_after=retry_after)
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_queue
+
+    async def run(self, fn, *args):
+        """
+        Exécute fn(*args) dans le pool et attend son résultat sans bloquer la boucle.
+
+        La tâche n'est décomptée qu'à la fin de son exécution dans le pool (callback du
+        future) : si le client se déconnecte, l'attente est annulée mais le thread reste
+        occupé et continue de compter dans la capacité.
+        """
+        with self._lock:
+            if self.pending >= self.capacity:
+                raise PoolSaturated(self.retry_after)
+            self.pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
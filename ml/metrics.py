@@ -0,0 +1,139 @@
+# 📊 Métriques internes de l'API (histogrammes à seaux cumulés) et export au format Prometheus
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seaux (en secondes) des durées de requête et d'étape
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Histogramme à seaux fixes, sûr entre threads, au format des histogrammes Prometheus."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Renvoie les comptes cumulés par borne supérieure, la somme et le total."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+    def samples(self, labels=None):
+        """Lignes d'échantillons Prometheus (_bucket, _sum, _count) avec les étiquettes données."""
+        labels = labels or {}
+        snapshot = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{format_labels(dict(labels, le=bound))} {count}"
+            for bound, count in snapshot["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum{format_labels(labels)} {snapshot['sum']}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {snapshot['count']}")
+        return lines
+
+
+class HistogramFamily:
+    """Histogrammes d'une même métrique, un par combinaison de valeurs d'étiquettes."""
+
+    def __init__(self, name, description, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.name, self.description, self.buckets))
+        return child
+
+    def render(self):
+        with self._lock:
+            children = list(self._children.items())
+        return render_histograms(
+            self.name, self.description,
+            [(dict(zip(self.labelnames, values)), child) for values, child in sorted(children)],
+        )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_histograms(name, description, histograms):
+    """Bloc Prometheus d'une métrique histogramme : [(étiquettes, Histogram), ...]"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms:
+        lines.extend(histogram.samples(labels))
+    return "\n".join(lines) + "\n"
+
+
+def render_samples(name, description, kind, samples):
+    """Bloc Prometheus d'un compteur ou d'une jauge : [(étiquettes, valeur), ...]"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Chronomètre les étapes d'une requête dans une famille d'histogrammes
+    étiquetée (stage, endpoint, country) : `with timer("predict_cas"): ...`
+    """
+
+    def __init__(self, family, endpoint, country):
+        self.family = family
+        self.endpoint = endpoint
+        self.country = country
+
+    @contextmanager
+    def __call__(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        self.family.labels(stage, self.endpoint, self.country).observe(seconds)
+
+    def wrap(self, stage, fn):
+        """fn chronométrée sous le nom `stage` (utile pour les appels exécutés dans le pool)."""
+        def timed(*args):
+            with self(stage):
+                return fn(*args)
+        return timed
+
+
+@contextmanager
+def no_timer(stage):
+    """Chronomètre inactif, utilisé quand aucune mesure n'est demandée."""
+    yield
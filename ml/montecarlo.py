@@ -0,0 +1,160 @@
+# 📊 Mode Monte Carlo : des milliers de trajectoires par scénario, réparties sur plusieurs
+# processus, agrégées en quantiles journaliers sans garder les trajectoires en mémoire
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from simulation import LocalPredictor, generate_inputs
+
+# Bornes des classes de l'histogramme des nouveaux cas : 0, puis une échelle logarithmique
+# de 1 à 10 millions (environ 1,6 % d'écart relatif entre deux bornes). Les prédictions
+# négatives sont ramenées à 0 avant l'agrégation (voir DailyQuantiles.update)
+CASES_EDGES = np.concatenate([[0.0], np.geomspace(1, 1e7, 1023)])
+QUANTILES = (0.05, 0.5, 0.95)
+DEFAULT_CHUNK = 256
+
+
+class DailyQuantiles:
+    """
+    Histogramme par jour des prédictions de cas et fréquences des tendances.
+
+    La mémoire ne dépend que de l'horizon et du nombre de classes, pas du nombre de
+    trajectoires ; deux accumulateurs se combinent par `merge` (résultats des workers).
+
+    Le régresseur des cas peut prédire un nombre négatif, qui n'a pas de sens : ces
+    prédictions comptent pour 0 cas, à la fois dans l'histogramme (quantiles) et dans
+    la moyenne, pour que `mean` et les quantiles décrivent la même distribution.
+    """
+
+    def __init__(self, horizon, edges=CASES_EDGES, classes=()):
+        self.edges = edges
+        self.counts = np.zeros((horizon, len(edges) + 1), dtype=np.int64)
+        self.total = np.zeros(horizon)
+        self.n = 0
+        self.tendance = {c: np.zeros(horizon, dtype=np.int64) for c in classes}
+
+    def update(self, pred_cas, pred_tendance):
+        """Ajoute un bloc de trajectoires de forme (trajectoires, jours)."""
+        n_traj, horizon = pred_cas.shape
+        pred_cas = np.maximum(pred_cas, 0.0)
+        bins = np.searchsorted(self.edges, pred_cas, side="right")
+        flat = (np.arange(horizon) * self.counts.shape[1] + bins).ravel()
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+        self.total += pred_cas.sum(axis=0)
+        self.n += n_traj
+        for c in np.unique(pred_tendance):
+            counts = self.tendance.setdefault(str(c), np.zeros(horizon, dtype=np.int64))
+            counts += (pred_tendance == c).sum(axis=0)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.n += other.n
+        for c, counts in other.tendance.items():
+            self.tendance.setdefault(c, np.zeros_like(counts))
+            self.tendance[c] += counts
+        return self
+
+    def quantile(self, q):
+        """Quantile par jour, interpolé linéairement dans la classe qui le contient."""
+        cumulative = np.cumsum(self.counts, axis=1)
+        target = q * self.n
+        idx = (cumulative < target).sum(axis=1)
+        below = np.where(idx > 0, cumulative[np.arange(len(idx)), np.maximum(idx - 1, 0)], 0)
+        inside = self.counts[np.arange(len(idx)), idx]
+        # Classe i : [edges[i-1], edges[i]) ; les classes extrêmes sont ramenées aux bornes
+        lower = self.edges[np.clip(idx - 1, 0, len(self.edges) - 1)]
+        upper = self.edges[np.clip(idx, 0, len(self.edges) - 1)]
+        fraction = np.divide(target - below, inside, out=np.zeros(len(idx)), where=inside > 0)
+        return lower + np.clip(fraction, 0, 1) * (upper - lower)
+
+    def summary(self, quantiles=QUANTILES):
+        result = {f"p{round(q * 100)}": self.quantile(q) for q in quantiles}
+        result["mean"] = self.total / max(self.n, 1)
+        for c, counts in sorted(self.tendance.items()):
+            result[f"part_{c}"] = counts / max(self.n, 1)
+        return result
+
+
+# Modèles du processus worker, chargés une seule fois par `_init_worker`
+_predictor = None
+
+
+def _init_worker(model_dir, country, backend):
+    global _predictor
+    _predictor = LocalPredictor(model_dir, country, backend)
+    # Un seul thread par worker : le parallélisme vient du nombre de processus
+    for model in (_predictor.models.model_cas, _predictor.models.model_tendance):
+        if hasattr(model, "get_booster"):
+            model.get_booster().set_param({"nthread": 1})
+        elif hasattr(model, "n_jobs"):
+            model.n_jobs = 1
+
+
+def _run_chunk(params, dates, n_traj, seed_seq):
+    """Simule `n_traj` trajectoires d'un scénario et renvoie leur accumulateur."""
+    rng = np.random.default_rng(seed_seq)
+    columns = generate_inputs(params, np.tile(dates, n_traj), rng)
+    pred_cas, pred_tendance = _predictor(columns)
+    shape = (n_traj, len(dates))
+    acc = DailyQuantiles(len(dates))
+    acc.update(np.asarray(pred_cas, dtype=float).reshape(shape), np.asarray(pred_tendance).reshape(shape))
+    return acc
+
+
+def chunk_sizes(trajectories, chunk):
+    return [min(chunk, trajectories - start) for start in range(0, trajectories, chunk)]
+
+
+def run_monte_carlo(scenarios, dates, trajectories, model_dir, country, backend="native",
+                    seed=None, workers=None, chunk=DEFAULT_CHUNK):
+    """
+    Lance `trajectories` trajectoires par scénario dans un pool de processus.
+
+    Chaque bloc de trajectoires reçoit sa propre graine, dérivée de `seed` par
+    SeedSequence selon (scénario, numéro de bloc) : les histogrammes ne dépendent pas
+    du nombre de workers ni de l'ordre d'exécution des blocs.
+
+    Au plus 2 blocs par worker sont soumis à la fois, et chaque résultat est fusionné
+    dès qu'il arrive puis libéré : la mémoire ne dépend pas du nombre de trajectoires.
+    """
+    workers = workers or os.cpu_count() or 1
+    scenario_seeds = np.random.SeedSequence(seed).spawn(len(scenarios))
+    sizes = chunk_sizes(trajectories, chunk)
+    results = {name: DailyQuantiles(len(dates)) for name in scenarios}
+    tasks = (
+        (name, params, size, chunk_seed)
+        for (name, params), scenario_seed in zip(scenarios.items(), scenario_seeds)
+        for size, chunk_seed in zip(sizes, scenario_seed.spawn(len(sizes)))
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_dir, country, backend),
+    ) as pool:
+        pending = {}
+        for name, params, size, chunk_seed in tasks:
+            if len(pending) >= 2 * workers:
+                _merge_finished(pending, results)
+            pending[pool.submit(_run_chunk, params, dates, size, chunk_seed)] = name
+        while pending:
+            _merge_finished(pending, results)
+    return results
+
+
+def _merge_finished(pending, results):
+    """Attend au moins un bloc, fusionne les blocs terminés et les retire de `pending`."""
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        results[pending.pop(future)].merge(future.result())
+
+
+def to_records(dates, summary):
+    """Une ligne par jour : quantiles et moyenne des cas, part de chaque tendance."""
+    columns = {name: np.round(values, 4 if name.startswith("part_") else 2).tolist() for name, values in summary.items()}
+    return [
+        dict({"date": d}, **{name: values[i] for name, values in columns.items()})
+        for i, d in enumerate(dates.astype(str).tolist())
+    ]
@@ -0,0 +1,130 @@
+# 🖼️ Pages HTML du formulaire : formulaire pré-rendu par schéma (ETag, Cache-Control, compression)
+# et pages de résultat assemblées autour du seul fragment `resultat.html`
+
+import gzip
+import hashlib
+import os
+
+from fastapi.responses import HTMLResponse, Response
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from features import FEATURES_ALL
+
+try:
+    import brotli
+except ImportError:  # compression br facultative
+    brotli = None
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+PAGE_TEMPLATE = "template.html"
+RESULT_TEMPLATE = "resultat.html"
+# Encodages proposés, par ordre de préférence
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Valeur d'erreur fictive qui permet de repérer la place du fragment dans la page
+_MARKER = "__fragment_resultat__"
+
+
+def compress(body, encoding, level=6):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    raise ValueError(f"Encodage inconnu : {encoding}")
+
+
+def accepted_encoding(accept_encoding, encodings):
+    """Premier encodage de `encodings` accepté par l'en-tête Accept-Encoding (ou None)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        params = params.strip().replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return next((e for e in encodings if e in accepted or "*" in accepted), None)
+
+
+class Layout:
+    """Formulaire pré-rendu (ETag, versions compressées) et tête/fin des pages de résultat, pour une liste de champs."""
+
+    def __init__(self, form, head, tail):
+        self.form = form
+        self.etag = '"' + hashlib.sha1(form).hexdigest() + '"'
+        self.form_encoded = {e: compress(form, e, level=9) for e in ENCODINGS}
+        self.head = head
+        self.tail = tail
+
+
+class PageRenderer:
+    """
+    Rend le formulaire une seule fois par liste de champs (les features du schéma des
+    modèles servis), avec une empreinte (ETag) et ses versions compressées. Une page de
+    résultat est la page pré-rendue coupée en deux autour du fragment `resultat.html` :
+    seul ce fragment compilé est rendu par requête.
+
+    `compression` : encodages (gzip, br) appliqués aux pages de résultat, à la volée.
+    `fields` : champs du formulaire quand l'appelant n'en précise pas (défaut : FEATURES_ALL).
+    """
+
+    def __init__(self, directory=TEMPLATE_DIR, compression=(), max_age=300, fields=FEATURES_ALL):
+        # Même environnement que Jinja2Templates (échappement automatique du HTML)
+        env = Environment(loader=FileSystemLoader(directory), autoescape=select_autoescape())
+        self.page = env.get_template(PAGE_TEMPLATE)
+        self.fragment = env.get_template(RESULT_TEMPLATE)
+        self.compression = tuple(e for e in ENCODINGS if e in compression)
+        self.cache_control = f"public, max-age={max_age}"
+        self.fields = tuple(fields)
+        self._layouts = {}
+        self.layout()
+
+    @classmethod
+    def from_env(cls):
+        compression = [e.strip() for e in os.getenv("HTML_COMPRESSION", "").split(",") if e.strip()]
+        unknown = set(compression) - {"gzip", "br"}
+        if unknown:
+            raise ValueError(f"HTML_COMPRESSION : encodages inconnus {', '.join(sorted(unknown))}")
+        return cls(compression=compression, max_age=int(os.getenv("FORM_MAX_AGE", "300")))
+
+    def layout(self, fields=None):
+        """Pages pré-rendues pour les champs `fields`, construites au premier appel puis gardées."""
+        fields = self.fields if fields is None else tuple(fields)
+        layout = self._layouts.get(fields)
+        if layout is None:
+            form = self.page.render(fields=fields).encode("utf-8")
+            # Tête et fin de page communes à tous les résultats
+            marked = self.page.render(fields=fields, error=_MARKER)
+            fragment = self.fragment.render(error=_MARKER)
+            head, found, tail = marked.partition(fragment)
+            if not found:
+                raise ValueError(f"{RESULT_TEMPLATE} doit être inclus tel quel dans {PAGE_TEMPLATE}")
+            layout = self._layouts[fields] = Layout(form, head.encode("utf-8"), tail.encode("utf-8"))
+        return layout
+
+    def render_result(self, fields=None, **context):
+        """Page complète pour un résultat (ou une erreur), identique au rendu Jinja de la page entière."""
+        layout = self.layout(fields)
+        return layout.head + self.fragment.render(**context).encode("utf-8") + layout.tail
+
+    def form_response(self, request, fields=None):
+        layout = self.layout(fields)
+        headers = {"ETag": layout.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        candidates = {t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")}
+        if layout.etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+        encoding = accepted_encoding(request.headers.get("accept-encoding", ""), ENCODINGS)
+        if encoding is None:
+            return HTMLResponse(layout.form, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return HTMLResponse(layout.form_encoded[encoding], headers=headers)
+
+    def result_response(self, request, fields=None, status_code=200, **context):
+        body = self.render_result(fields, **context)
+        encoding = accepted_encoding(request.headers.get("accept-encoding", ""), self.compression)
+        if encoding is None:
+            return HTMLResponse(body, status_code=status_code)
+        # Niveau 3 : presque la taille du niveau 6 pour un tiers du temps sur ces pages
+        return HTMLResponse(compress(body, encoding, level=3), status_code=status_code,
+                            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
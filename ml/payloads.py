@@ -0,0 +1,130 @@
+# 📦 Décodage des corps de requête de prédiction (JSON, binaire colonnes float32, Arrow) en colonnes NumPy
+
+import json
+import struct
+
+import numpy as np
+
+JSON_MEDIA_TYPE = "application/json"
+FORM_MEDIA_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+# Format binaire colonnes : en-tête « CVF1 », nombre de lignes, nombre de colonnes (uint32
+# little-endian), puis chaque colonne à la suite en float32 little-endian, dans l'ordre
+# des features de l'endpoint (ou celui de l'en-tête X-Features)
+BINARY_MEDIA_TYPE = "application/x-covid-columns"
+BINARY_MAGIC = b"CVF1"
+BINARY_HEADER = struct.Struct("<4sII")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class BatchInputError(ValueError):
+    """Erreur de format sur le corps d'une requête de prédiction (renvoyée en 422)."""
+
+
+class UnsupportedPayload(BatchInputError):
+    """Type de contenu non pris en charge (renvoyé en 415)."""
+
+
+def media_type(content_type):
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def _check_missing(features, present):
+    missing = [f for f in features if f not in present]
+    if missing:
+        raise BatchInputError(f"Champs manquants : {', '.join(missing)}")
+
+
+def _as_float(values, what):
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError) as e:
+        raise BatchInputError(f"Valeur non numérique ({what}) : {e}")
+
+
+def columns_from_rows(rows, features):
+    """[{"feature": valeur, ...}, ...] -> {feature: colonne}"""
+    if not all(isinstance(row, dict) for row in rows):
+        raise BatchInputError("Chaque ligne doit être un objet JSON")
+    _check_missing(features, set.intersection(*(set(row) for row in rows)) if rows else features)
+    matrix = _as_float([[row[f] for f in features] for row in rows], "lignes")
+    matrix = matrix.reshape(len(rows), len(features))
+    return {f: matrix[:, i] for i, f in enumerate(features)}
+
+
+def columns_from_dict(payload, features):
+    """{"feature": [valeurs]} (colonnes) ou {"feature": valeur} (une seule ligne) -> {feature: colonne}"""
+    _check_missing(features, payload)
+    columns = {f: _as_float(payload[f], f) for f in features}
+    shapes = {c.shape for c in columns.values()}
+    if shapes == {()}:
+        return {f: c.reshape(1) for f, c in columns.items()}
+    if len(shapes) != 1 or columns[features[0]].ndim != 1:
+        raise BatchInputError("Toutes les colonnes doivent être des listes de même longueur")
+    return columns
+
+
+def columns_from_json(payload, features):
+    """Accepte une liste de lignes, un objet de colonnes ou un objet d'une seule ligne."""
+    if isinstance(payload, list):
+        return columns_from_rows(payload, features)
+    if isinstance(payload, dict):
+        return columns_from_dict(payload, features)
+    raise BatchInputError("Le corps doit être une liste de lignes ou un objet de colonnes")
+
+
+def encode_columns(columns, features):
+    """Encode des colonnes au format binaire BINARY_MEDIA_TYPE (côté client)."""
+    data = np.stack([np.asarray(columns[f], dtype="<f4") for f in features])
+    return BINARY_HEADER.pack(BINARY_MAGIC, data.shape[1], data.shape[0]) + data.tobytes()
+
+
+def columns_from_binary(body, features, names=None):
+    """
+    Décode le format binaire sans copie : chaque colonne est une vue sur le corps reçu.
+    `names` (en-tête X-Features) donne l'ordre des colonnes s'il diffère de `features`.
+    """
+    if len(body) < BINARY_HEADER.size:
+        raise BatchInputError("Corps binaire trop court")
+    magic, n_rows, n_cols = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC:
+        raise BatchInputError("En-tête binaire invalide")
+    names = names or features
+    if n_cols != len(names):
+        raise BatchInputError(f"{n_cols} colonnes reçues pour {len(names)} features")
+    if len(body) != BINARY_HEADER.size + 4 * n_rows * n_cols:
+        raise BatchInputError("Taille du corps binaire incohérente avec l'en-tête")
+    _check_missing(features, names)
+    data = np.frombuffer(body, dtype="<f4", offset=BINARY_HEADER.size).reshape(n_cols, n_rows)
+    return {name: data[i] for i, name in enumerate(names) if name in features}
+
+
+def columns_from_arrow(body, features):
+    """Décode un flux Arrow IPC (pyarrow est optionnel)."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise UnsupportedPayload("Le format Arrow nécessite pyarrow")
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise BatchInputError(f"Flux Arrow invalide : {e}")
+    _check_missing(features, table.column_names)
+    return {f: _as_float(table.column(f).to_numpy(zero_copy_only=False), f) for f in features}
+
+
+def decode_columns(body, content_type, features, names=None):
+    """Décode un corps (hors formulaires) selon son type de contenu."""
+    media = media_type(content_type)
+    if media in (JSON_MEDIA_TYPE, ""):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise BatchInputError("Corps JSON invalide")
+        return columns_from_json(payload, features)
+    if media == BINARY_MEDIA_TYPE:
+        return columns_from_binary(body, features, names)
+    if media == ARROW_MEDIA_TYPE:
+        return columns_from_arrow(body, features)
+    raise UnsupportedPayload(f"Type de contenu non pris en charge : {media}")
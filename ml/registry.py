@@ -0,0 +1,442 @@
+# 🗂️ Registre multi-pays des modèles : chargement paresseux, partage et éviction LRU
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from artifacts import ARRAYS_EXTENSION, EXPORT_EXTENSIONS, load_model
+from cache import CachedModel, PredictionCache, cache_options_from_env
+from features import FEATURES_CAS, FEATURES_TENDANCE
+from schema import FeatureSchema
+from tree_ensemble import HybridModel, compile_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRIES = ("canada", "france", "usa", "suisse")
+COUNTRY_PATTERN = re.compile(r"^[a-z_]+$")
+
+# Noms des fichiers par pays, et fichiers par défaut (Canada) utilisés en repli
+MODEL_CAS_FILE = "model_xgboost_covid{suffix}.pkl"
+MODEL_TENDANCE_FILE = "modele_tendance_covid_rf{suffix}.pkl"
+# Liste ordonnée des features du modèle des cas, enregistrée à l'entraînement
+MODEL_FEATURES_FILE = "model_features{suffix}.pkl"
+
+# Moteur d'évaluation des arbres : predict des bibliothèques, évaluateur NumPy,
+# ou NumPy pour les petits lots et bibliothèque pour les gros (auto)
+BACKENDS = ("native", "numpy", "auto")
+
+
+class UnknownCountry(KeyError):
+    """Pays absent de la liste des pays servis par l'API."""
+
+    def __init__(self, country):
+        super().__init__(country)
+        self.country = country
+
+    def __str__(self):
+        return f"Pays inconnu : {self.country}"
+
+
+class ModelPair:
+    """
+    Les deux modèles d'un pays (cas + tendance), les fichiers dont ils proviennent et le
+    schéma de leurs features (`FeatureSchema`, fixé par `ModelRegistry.schema_for`).
+    """
+
+    def __init__(self, country, model_cas, model_tendance, keys, size, schema=None, features_key=None):
+        self.country = country
+        self.model_cas = model_cas
+        self.model_tendance = model_tendance
+        self.keys = keys
+        self.size = size
+        self.schema = schema
+        self.features_key = features_key
+
+
+def _artifact_files(path):
+    """Fichiers d'un modèle : le fichier lui-même, ou ceux d'un dossier de tableaux exporté."""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    return [path]
+
+
+def file_key(path):
+    """Empreinte du contenu d'un modèle : deux fichiers identiques partagent le même modèle en mémoire."""
+    digest = hashlib.sha1()
+    for file in _artifact_files(path):
+        if file != path:
+            digest.update(os.path.basename(file).encode())
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_size(path):
+    return sum(os.path.getsize(file) for file in _artifact_files(path)) if os.path.exists(path) else 0
+
+
+def preferred_path(path, backend="native"):
+    """
+    Export sans pickle du modèle (`artifacts.py`) s'il existe et n'est pas plus ancien
+    que le .pkl, sinon le .pkl : un nouveau .pkl déposé est toujours pris en compte.
+    Le dossier .arrays ne se charge que dans l'évaluateur NumPy, 3 à 6 fois plus lent que
+    le predict de scikit-learn sur les gros lots : il ne remplace le .pkl qu'avec le moteur
+    `numpy` (ou en l'absence de .pkl).
+    """
+    stem = os.path.splitext(path)[0]
+    for extension in EXPORT_EXTENSIONS:
+        if extension == ARRAYS_EXTENSION and backend != "numpy" and os.path.exists(path):
+            continue
+        exported = stem + extension
+        if os.path.exists(exported) and (
+            not os.path.exists(path) or os.path.getmtime(exported) >= os.path.getmtime(path)
+        ):
+            return exported
+    return path
+
+
+def feature_names(model):
+    """Noms des features enregistrés dans un modèle (feature_names_in_), ou None."""
+    names = getattr(model, "feature_names_in_", None)
+    return None if names is None else [str(name) for name in names]
+
+
+def warm_up(model):
+    """Premier predict sur une ligne factice : paye les initialisations paresseuses avant le trafic réel."""
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features:
+        model.predict(np.zeros((1, n_features)))
+
+
+class ModelRegistry:
+    """
+    Sert les modèles de plusieurs pays depuis un seul processus.
+
+    - les modèles d'un pays sont chargés au premier appel de `get(country)`
+    - un pays sans fichiers dédiés utilise les modèles par défaut (Canada)
+    - des fichiers au contenu identique ne sont chargés qu'une seule fois
+    - au-delà de `max_bytes` (taille des fichiers chargés), les pays les moins
+      récemment utilisés sont retirés du cache
+    - avec `cache` (options de `PredictionCache`/`CachedModel`), chaque modèle
+      chargé reçoit son propre cache de prédictions, vidé de fait au rechargement
+    """
+
+    def __init__(self, model_dir, countries=DEFAULT_COUNTRIES, max_bytes=None, backend="native", cache=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Moteur inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+        self.model_dir = model_dir
+        self.countries = set(countries)
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.cache = cache
+        self._pairs = OrderedDict()
+        self._artifacts = {}
+        # `_lock` ne protège que les dictionnaires (jamais de lecture de fichier sous ce verrou) ;
+        # `_loading` donne un verrou par pays pour qu'un pays ne soit chargé qu'une fois à la fois
+        self._lock = threading.RLock()
+        self._loading = {}
+
+    @classmethod
+    def from_env(cls, model_dir):
+        countries = os.getenv("MODEL_COUNTRIES", ",".join(DEFAULT_COUNTRIES))
+        max_bytes = int(os.getenv("MODEL_REGISTRY_MAX_BYTES", "0")) or None
+        return cls(
+            model_dir,
+            countries=[c.strip() for c in countries.split(",") if c.strip()],
+            max_bytes=max_bytes,
+            backend=os.getenv("MODEL_BACKEND", "native"),
+            cache=cache_options_from_env(),
+        )
+
+    @property
+    def loaded_bytes(self):
+        return sum(size for _, size, _ in self._artifacts.values())
+
+    def loaded_countries(self):
+        return list(self._pairs)
+
+    def cache_stats(self):
+        """Compteurs des caches de prédictions, par fichier de modèle chargé."""
+        with self._lock:
+            return {
+                key: model.cache.stats()
+                for key, (model, _, _) in self._artifacts.items()
+                if isinstance(model, CachedModel)
+            }
+
+    def peek(self, country):
+        """Renvoie les modèles déjà chargés d'un pays (ou None) sans déclencher de chargement."""
+        with self._lock:
+            pair = self._pairs.get(country)
+            if pair is not None:
+                self._pairs.move_to_end(country)
+            return pair
+
+    def get(self, country):
+        """
+        Renvoie les modèles d'un pays, en les chargeant si nécessaire.
+
+        Le chargement se fait hors de `_lock`, sous le verrou du pays : `peek` et les appels
+        pour les autres pays n'attendent jamais la lecture des fichiers.
+        """
+        self._check_country(country)
+        pair = self.peek(country)
+        if pair is not None:
+            return pair
+        with self._lock:
+            loading = self._loading.setdefault(country, threading.Lock())
+        with loading:
+            pair = self.peek(country)
+            if pair is None:
+                pair = self._load(country)
+        return pair
+
+    def preload(self, countries):
+        """
+        Charge les modèles de `countries` et fait un premier predict sur chacun, pour
+        qu'aucune requête ne paye le chargement ni les initialisations paresseuses.
+        Renvoie la durée (s) par pays.
+        """
+        durations = {}
+        for country in countries:
+            started = time.perf_counter()
+            pair = self.get(country)
+            for model in (pair.model_cas, pair.model_tendance):
+                warm_up(model)
+            durations[country] = time.perf_counter() - started
+        return durations
+
+    def _check_country(self, country):
+        if country not in self.countries or not COUNTRY_PATTERN.match(country):
+            raise UnknownCountry(country)
+
+    def _suffix(self, country):
+        """Suffixe des fichiers du pays, ou "" (fichiers par défaut) si ses modèles sont absents."""
+        suffix = f"_{country}"
+        paths = [
+            preferred_path(os.path.join(self.model_dir, name.format(suffix=suffix)), self.backend)
+            for name in (MODEL_CAS_FILE, MODEL_TENDANCE_FILE)
+        ]
+        return suffix if all(os.path.exists(p) for p in paths) else ""
+
+    def resolve_paths(self, country):
+        """Chemins des fichiers du pays, ou des fichiers par défaut s'ils sont absents (exports préférés)."""
+        suffix = self._suffix(country)
+        return [
+            preferred_path(os.path.join(self.model_dir, name.format(suffix=suffix)), self.backend)
+            for name in (MODEL_CAS_FILE, MODEL_TENDANCE_FILE)
+        ]
+
+    def features_path(self, country):
+        """Liste des features qui accompagne les modèles retenus pour le pays, ou None."""
+        path = os.path.join(self.model_dir, MODEL_FEATURES_FILE.format(suffix=self._suffix(country)))
+        return path if os.path.exists(path) else None
+
+    def schema_for(self, country, model_cas, model_tendance):
+        """
+        Schéma des features d'un pays. L'ordre du modèle des cas vient de model_features*.pkl,
+        vérifié contre les noms enregistrés dans le modèle ; celui du modèle de tendance vient
+        du modèle. À défaut, l'ordre historique de features.py est utilisé. Lève ValueError si
+        la liste contredit les noms du modèle, pour ne jamais servir des features décalées.
+        """
+        names_cas = feature_names(model_cas)
+        path = self.features_path(country)
+        if path is not None:
+            listed = joblib.load(path)
+            if not isinstance(listed, (list, tuple, np.ndarray)) or not all(isinstance(n, str) for n in listed):
+                raise ValueError(f"{path} : liste de noms de features attendue")
+            listed = [str(name) for name in listed]
+            if names_cas is not None and listed != names_cas:
+                raise ValueError(f"{path} ne correspond pas aux features du modèle des cas : {names_cas}")
+            names_cas = listed
+        schema = FeatureSchema(names_cas or FEATURES_CAS, feature_names(model_tendance) or FEATURES_TENDANCE)
+        for label, model, names in (("cas", model_cas, schema.cas), ("tendance", model_tendance, schema.tendance)):
+            n_features = getattr(model, "n_features_in_", None)
+            if n_features is not None and n_features != len(names):
+                logger.warning("Modèle %s (%s) : %d features attendues, %d connues", label, country, n_features, len(names))
+        return schema
+
+    def reload(self, countries=None):
+        """
+        Recharge les modèles des pays déjà chargés (ou de `countries`) sans interrompre le service.
+
+        Les nouveaux fichiers sont lus, préchauffés et leurs schémas vérifiés hors du verrou,
+        pendant que les requêtes continuent d'utiliser les anciens modèles ; les références
+        sont ensuite toutes remplacées d'un seul coup, ou aucune si un pays échoue.
+        Renvoie, par pays, True si ses modèles ont changé.
+        """
+        with self._lock:
+            targets = list(countries) if countries else list(self._pairs)
+        for country in targets:
+            self._check_country(country)
+
+        # Lecture, préchauffage et schéma des modèles modifiés, sans bloquer les requêtes :
+        # une erreur sur un pays interrompt le rechargement avant tout échange
+        preloaded, pairs = {}, {}
+        for country in targets:
+            plan = self._plan(country)
+            with self._lock:
+                old = self._pairs.get(country)
+            keys = [key for _, key in plan]
+            if old is not None and old.keys == keys and old.features_key == self._features_key(country):
+                continue
+            for path, key in plan:
+                if key not in self._artifacts and key not in preloaded:
+                    model = self._prepare(self._read(path))
+                    warm_up(model)
+                    preloaded[key] = (model, artifact_size(path))
+            pairs[country] = self._build_pair(country, plan, preloaded)
+
+        # Échange de toutes les références d'un seul coup
+        with self._lock:
+            for country, pair in pairs.items():
+                old = self._pairs.get(country)
+                self._pairs[country] = self._adopt(pair, preloaded)
+                if old is not None:
+                    self._release(old)
+            self._evict()
+        changed = {country: country in pairs for country in targets}
+        if any(changed.values()):
+            logger.info("Modèles rechargés : %s", [c for c, v in changed.items() if v])
+        return changed
+
+    def _read(self, path):
+        return joblib.load(path) if path.endswith(".pkl") else load_model(path)
+
+    def _key(self, path):
+        return file_key(path) if os.path.exists(path) else path
+
+    def _plan(self, country):
+        return [(path, self._key(path)) for path in self.resolve_paths(country)]
+
+    def _features_key(self, country):
+        path = self.features_path(country)
+        return None if path is None else self._key(path)
+
+    def _load(self, country):
+        preloaded = {}
+        pair = self._build_pair(country, self._plan(country), preloaded)
+        with self._lock:
+            self._pairs[country] = self._adopt(pair, preloaded)
+            self._evict()
+        return pair
+
+    def _build_pair(self, country, plan, preloaded):
+        """
+        Prépare les modèles d'un pays sans tenir `_lock` : lecture des fichiers absents du
+        registre (ajoutés à `preloaded` avec leur taille) et schéma des features. Les
+        modèles ne sont enregistrés et comptés qu'ensuite, par `_adopt`.
+        """
+        models, size = [], 0
+        for path, key in plan:
+            if key not in preloaded:
+                with self._lock:
+                    artifact = self._artifacts.get(key)
+                if artifact is not None:
+                    preloaded[key] = (artifact[0], artifact[1])
+                else:
+                    preloaded[key] = (self._prepare(self._read(path)), artifact_size(path))
+            models.append(preloaded[key][0])
+            size += preloaded[key][1]
+        pair = ModelPair(country, models[0], models[1], [key for _, key in plan], size,
+                         features_key=self._features_key(country))
+        pair.schema = self.schema_for(country, pair.model_cas, pair.model_tendance)
+        return pair
+
+    def _adopt(self, pair, preloaded):
+        """Sous `_lock` : enregistre les modèles de `pair` (ou reprend ceux déjà chargés) et les compte."""
+        models = []
+        for key in pair.keys:
+            if key not in self._artifacts:
+                self._artifacts[key] = [*preloaded[key], 0]
+            artifact = self._artifacts[key]
+            artifact[2] += 1
+            models.append(artifact[0])
+        pair.model_cas, pair.model_tendance = models
+        return pair
+
+    def _prepare(self, model):
+        """Remplace le modèle par sa version NumPy selon le moteur choisi, puis ajoute le cache."""
+        prepared = self._compile(model)
+        if self.cache is None:
+            return prepared
+        options = dict(self.cache)
+        cache = PredictionCache(maxsize=options.pop("maxsize", 10000), ttl=options.pop("ttl", None))
+        return CachedModel(prepared, cache, feature_names=getattr(model, "feature_names_in_", None), **options)
+
+    def _compile(self, model):
+        if self.backend == "native":
+            return model
+        try:
+            compiled = compile_model(model)
+        except TypeError as e:
+            logger.warning("Évaluateur NumPy indisponible, predict natif conservé : %s", e)
+            return model
+        return compiled if self.backend == "numpy" else HybridModel(model, compiled)
+
+    def _release(self, pair):
+        for key in pair.keys:
+            artifact = self._artifacts[key]
+            artifact[2] -= 1
+            if artifact[2] == 0:
+                del self._artifacts[key]
+
+    def _evict(self):
+        # On garde toujours au moins le pays qui vient d'être chargé
+        while self.max_bytes and self.loaded_bytes > self.max_bytes and len(self._pairs) > 1:
+            _, pair = self._pairs.popitem(last=False)
+            self._release(pair)
+
+
+class ModelWatcher:
+    """
+    Surveille le dossier des modèles et déclenche `registry.reload()` quand un fichier change.
+
+    Le rechargement n'a lieu qu'une fois le dossier stable entre deux passages, pour ne
+    jamais lire un fichier en cours de copie.
+    """
+
+    def __init__(self, registry, interval):
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _signature(self):
+        entries = []
+        for name in sorted(os.listdir(self.registry.model_dir)):
+            for path in _artifact_files(os.path.join(self.registry.model_dir, name)):
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    entries.append((os.path.relpath(path, self.registry.model_dir), stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    def start(self):
+        signature = self._signature()
+        self._thread = threading.Thread(target=self._run, args=(signature,), name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, signature):
+        loaded = previous = signature
+        while not self._stop.wait(self.interval):
+            current = self._signature()
+            if current != loaded and current == previous:
+                try:
+                    self.registry.reload()
+                    loaded = current
+                except Exception:
+                    logger.exception("Échec du rechargement, les modèles actuels restent en service")
+            previous = current
@@ -0,0 +1,122 @@
+# ⚡ Réponses de prédiction : JSON sérialisé directement depuis les tableaux NumPy (orjson),
+# en lignes, en colonnes ou en flux NDJSON pour les très gros résultats
+
+import json
+
+import numpy as np
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from payloads import BatchInputError
+
+try:
+    import orjson
+except ImportError:  # repli sur le module json de la bibliothèque standard
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+OUTPUT_FORMATS = ("rows", "columns", "ndjson")
+# Lignes sérialisées par morceau du flux NDJSON
+NDJSON_CHUNK_ROWS = 10000
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return _nulls(value.tolist()) if value.dtype.kind == "f" else value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def _nulls(values):
+    """NaN -> None (null), comme orjson : ce sont les prédictions des lignes refusées."""
+    return [None if v != v else v for v in values]
+
+
+def dumps(content):
+    """JSON compact en bytes ; avec orjson, les tableaux NumPy numériques sont écrits sans conversion en float Python."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse sérialisée par `dumps` (orjson si disponible)."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def output_format(request):
+    """Format demandé : paramètre `?format=`, sinon NDJSON si l'en-tête Accept le demande, sinon lignes."""
+    requested = request.query_params.get("format")
+    if requested is None:
+        return "ndjson" if NDJSON_MEDIA_TYPE in request.headers.get("accept", "") else "rows"
+    if requested not in OUTPUT_FORMATS:
+        raise BatchInputError(f"Format de réponse inconnu : {requested} (attendu : {', '.join(OUTPUT_FORMATS)})")
+    return requested
+
+
+def _labels(pred_tendance):
+    labels = np.asarray(pred_tendance)
+    # Classes déjà textuelles (str Python ou NumPy) : pas de conversion intermédiaire
+    return (labels if labels.dtype.kind in "OU" else labels.astype(str)).tolist()
+
+
+def _cas(pred_cas):
+    return np.round(np.asarray(pred_cas, dtype=np.float64), 2)
+
+
+def prediction_columns(pred_cas, pred_tendance, dates=None):
+    """{"count", ["date"], "cas", "tendance"} : la colonne des cas reste un tableau NumPy jusqu'à la sérialisation."""
+    content = {"count": len(pred_cas)}
+    if dates is not None:
+        content["date"] = dates.astype(str).tolist()
+    content["cas"] = _cas(pred_cas)
+    content["tendance"] = _labels(pred_tendance)
+    return content
+
+
+def prediction_rows(pred_cas, pred_tendance, dates=None):
+    """Une entrée par ligne, format historique de l'API ; une ligne refusée vaut null."""
+    cas = _cas(pred_cas)
+    cas = _nulls(cas.tolist()) if np.isnan(cas).any() else cas.tolist()
+    tendance = _labels(pred_tendance)
+    if dates is None:
+        return [{"prediction_nouveaux_cas": c, "prediction_tendance": t} for c, t in zip(cas, tendance)]
+    return [
+        {"date": d, "prediction_nouveaux_cas": c, "prediction_tendance": t}
+        for d, c, t in zip(dates.astype(str).tolist(), cas, tendance)
+    ]
+
+
+def ndjson_chunks(pred_cas, pred_tendance, dates=None, chunk_rows=NDJSON_CHUNK_ROWS):
+    """Lignes NDJSON par morceaux de `chunk_rows` : seul le morceau en cours est converti en objets Python."""
+    for start in range(0, len(pred_cas), chunk_rows):
+        stop = start + chunk_rows
+        rows = prediction_rows(pred_cas[start:stop], pred_tendance[start:stop],
+                               None if dates is None else dates[start:stop])
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def prediction_response(fmt, pred_cas, pred_tendance, dates=None, rejected=None):
+    """
+    Réponse d'un lot de prédictions au format `fmt` (voir `output_format`). Les lignes
+    refusées par la validation (`rejected`, entrées {"index", "errors"}) valent null et
+    sont détaillées sous "rejected" (en-tête X-Rejected pour le flux NDJSON).
+    """
+    if fmt == "ndjson":
+        headers = {"X-Count": str(len(pred_cas))}
+        if rejected:
+            headers["X-Rejected"] = str(len(rejected))
+        return StreamingResponse(
+            ndjson_chunks(pred_cas, pred_tendance, dates),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+    if fmt == "columns":
+        content = prediction_columns(pred_cas, pred_tendance, dates)
+    else:
+        content = {"count": len(pred_cas), "predictions": prediction_rows(pred_cas, pred_tendance, dates)}
+    if rejected:
+        content["rejected"] = rejected
+    return FastJSONResponse(content)
@@ -0,0 +1,276 @@
+# 💾 Écriture des résultats de simulation : journal NDJSON au fil de l'eau, fichiers
+# compacts (colonnes avec tendance encodée par dictionnaire, lignes, Parquet) et résumés
+
+import contextlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Formats écrits par défaut (« rows » : liste de lignes lue par le frontend) ; « parquet » nécessite pyarrow
+DEFAULT_FORMATS = ("ndjson", "rows", "columns", "summary")
+FORMATS = DEFAULT_FORMATS + ("parquet",)
+# Formats écrits à partir des colonnes mises de côté par `write`
+SPOOLED_FORMATS = ("rows", "columns", "parquet")
+# Lignes sérialisées à la fois dans les fichiers finaux
+CHUNK_ROWS = 65536
+
+COMPACT = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+def period_stats(pred_cas, pred_tendance, periods):
+    """Par période : (clé, jours, total, min, max, {tendance: jours}), clés triées."""
+    keys, inverse = np.unique(periods, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(keys))
+    totals = np.bincount(inverse, weights=pred_cas, minlength=len(keys))
+    minimums = np.full(len(keys), np.inf)
+    maximums = np.full(len(keys), -np.inf)
+    np.minimum.at(minimums, inverse, pred_cas)
+    np.maximum.at(maximums, inverse, pred_cas)
+    classes, codes = np.unique(pred_tendance, return_inverse=True)
+    tendance = np.zeros((len(keys), len(classes)), dtype=np.int64)
+    np.add.at(tendance, (inverse, codes), 1)
+    return [
+        (str(key), int(counts[i]), float(totals[i]), float(minimums[i]), float(maximums[i]),
+         {str(c): int(n) for c, n in zip(classes, tendance[i]) if n})
+        for i, key in enumerate(keys)
+    ]
+
+
+def period_summary(period, days, total, minimum, maximum, tendance):
+    return {
+        "period": period,
+        "days": days,
+        "mean": round(total / days, 2),
+        "min": round(minimum, 2),
+        "max": round(maximum, 2),
+        "total": round(total, 2),
+        "tendance": {c: tendance[c] for c in sorted(tendance)},
+    }
+
+
+def group_summary(pred_cas, pred_tendance, periods):
+    """Agrégats (moyenne, min, max, total, tendances) des prédictions par période."""
+    return [period_summary(*stats) for stats in period_stats(pred_cas, pred_tendance, periods)]
+
+
+def periods_of(dates):
+    """Semaines (commençant le lundi) et mois de chaque date."""
+    day_of_week = (dates.astype(np.int64) + 3) % 7
+    return {
+        "weekly": dates - day_of_week.astype("timedelta64[D]"),
+        "monthly": dates.astype("datetime64[M]"),
+    }
+
+
+def summarize(dates, pred_cas, pred_tendance):
+    """Résumés hebdomadaires (semaines commençant le lundi) et mensuels."""
+    return {
+        granularity: group_summary(pred_cas, pred_tendance, periods)
+        for granularity, periods in periods_of(dates).items()
+    }
+
+
+class SummaryAccumulator:
+    """
+    Résumés de `summarize` mis à jour lot par lot, dans un ordre quelconque : seuls les
+    agrégats de chaque période sont gardés, jamais les prédictions.
+    """
+
+    def __init__(self):
+        self._stats = {"weekly": {}, "monthly": {}}
+
+    def add(self, dates, pred_cas, pred_tendance):
+        for granularity, periods in periods_of(dates).items():
+            merged = self._stats[granularity]
+            for period, days, total, minimum, maximum, tendance in period_stats(pred_cas, pred_tendance, periods):
+                current = merged.setdefault(period, [0, 0.0, np.inf, -np.inf, {}])
+                current[0] += days
+                current[1] += total
+                current[2] = min(current[2], minimum)
+                current[3] = max(current[3], maximum)
+                for c, n in tendance.items():
+                    current[4][c] = current[4].get(c, 0) + n
+
+    def summary(self):
+        return {
+            granularity: [period_summary(period, *merged[period]) for period in sorted(merged)]
+            for granularity, merged in self._stats.items()
+        }
+
+
+def columnar(dates, pred_cas, pred_tendance):
+    """Colonnes JSON ; la tendance est encodée par dictionnaire (catégories + codes)."""
+    categories, codes = np.unique(pred_tendance, return_inverse=True)
+    return {
+        "count": len(dates),
+        "date": dates.astype(str).tolist(),
+        "prediction_nouveaux_cas": np.round(pred_cas, 2).tolist(),
+        "prediction_tendance": {"categories": categories.tolist(), "codes": codes.tolist()},
+    }
+
+
+def _write_array(f, values, encode):
+    """Écrit une liste JSON par tranches de CHUNK_ROWS : `encode(tranche)` -> liste Python."""
+    f.write("[")
+    for start in range(0, len(values), CHUNK_ROWS):
+        if start:
+            f.write(",")
+        f.write(json.dumps(encode(values[start:start + CHUNK_ROWS]), **COMPACT)[1:-1])
+    f.write("]")
+
+
+class ResultWriter:
+    """
+    Résultats d'un scénario.
+
+    Chaque lot reçu par `write` est ajouté immédiatement au journal
+    `predictions_<nom>.ndjson` (une ligne JSON par date) : un arrêt brutal ne perd
+    que le lot en cours. Aucun lot n'est gardé en mémoire : les résumés sont mis à
+    jour lot par lot, et les colonnes (jour, cas, code de tendance : 20 octets par
+    ligne) sont mises de côté dans des fichiers temporaires, relus par `close` pour
+    écrire les fichiers finaux par tranches :
+    - `predictions_<nom>.columns.json` : colonnes, tendance encodée par dictionnaire
+    - `summary_<nom>.json` : agrégats hebdomadaires et mensuels
+    - `predictions_<nom>.json` : lignes, format lu par le frontend (format « rows »)
+    - `predictions_<nom>.parquet` : mêmes colonnes en Parquet (pyarrow, sur demande)
+    """
+
+    def __init__(self, output_dir, name, formats=DEFAULT_FORMATS):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Formats inconnus : {', '.join(sorted(unknown))}")
+        if "parquet" in formats:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Le format parquet nécessite pyarrow")
+        self.output_dir = output_dir
+        self.name = name
+        self.formats = formats
+        self.count = 0
+        self._journal = None
+        self._summary = SummaryAccumulator() if "summary" in formats else None
+        # Colonnes mises de côté (jours depuis 1970, cas, code de tendance) et codes des tendances
+        self._spool = None
+        self._categories = {}
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if "ndjson" in formats:
+            self._journal = open(self.path(f"predictions_{name}.ndjson"), "w")
+        if any(f in formats for f in SPOOLED_FORMATS):
+            self._spool = tuple(tempfile.TemporaryFile(dir=output_dir) for _ in range(3))
+
+    def path(self, filename):
+        return self.output_dir / filename
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._release()
+
+    def write(self, dates, pred_cas, pred_tendance):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        pred_cas = np.asarray(pred_cas, dtype=float)
+        pred_tendance = np.asarray(pred_tendance).astype(str)
+        self.count += len(dates)
+        if self._journal is not None:
+            cas = np.round(pred_cas, 2).tolist()
+            self._journal.writelines(
+                json.dumps({"prediction_nouveaux_cas": c, "prediction_tendance": t, "date": d}, **COMPACT) + "\n"
+                for c, t, d in zip(cas, pred_tendance.tolist(), dates.astype(str).tolist())
+            )
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        if self._summary is not None:
+            self._summary.add(dates, pred_cas, pred_tendance)
+        if self._spool is not None:
+            classes, codes = np.unique(pred_tendance, return_inverse=True)
+            mapping = np.array([self._categories.setdefault(c, len(self._categories)) for c in classes.tolist()],
+                               dtype=np.int32)
+            for f, column in zip(self._spool, (dates.astype(np.int64), pred_cas, mapping[codes.reshape(-1)])):
+                column.tofile(f)
+
+    def close(self):
+        try:
+            if self._journal is not None:
+                self._journal.close()
+            if not self.count:
+                return
+            if self._summary is not None:
+                self._dump(f"summary_{self.name}.json", self._summary.summary())
+            if self._spool is not None:
+                self._write_spooled(*self._read_spool())
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._journal is not None:
+            self._journal.close()
+        for f in self._spool or ():
+            f.close()
+        self._spool = None
+
+    def _read_spool(self):
+        """Colonnes mises de côté, triées par date, tendances en codes de catégories triées."""
+        columns = []
+        for f, dtype in zip(self._spool, (np.int64, np.float64, np.int32)):
+            f.flush()
+            f.seek(0)
+            columns.append(np.fromfile(f, dtype=dtype))
+        days, pred_cas, codes = columns
+        if np.any(days[1:] < days[:-1]):
+            order = np.argsort(days, kind="stable")
+            days, pred_cas, codes = days[order], pred_cas[order], codes[order]
+        categories = sorted(self._categories)
+        remap = np.empty(len(categories), dtype=np.int32)
+        remap[[self._categories[c] for c in categories]] = np.arange(len(categories), dtype=np.int32)
+        return days.astype("datetime64[D]"), pred_cas, remap[codes], categories
+
+    def _write_spooled(self, dates, pred_cas, codes, categories):
+        labels = np.array(categories)
+        if "rows" in self.formats:
+            with self._replace(f"predictions_{self.name}.json") as f:
+                _write_array(f, np.arange(len(dates)), lambda idx: [
+                    {"prediction_nouveaux_cas": c, "prediction_tendance": t, "date": d}
+                    for c, t, d in zip(np.round(pred_cas[idx], 2).tolist(), labels[codes[idx]].tolist(),
+                                       dates[idx].astype(str).tolist())
+                ])
+        if "columns" in self.formats:
+            with self._replace(f"predictions_{self.name}.columns.json") as f:
+                f.write(f'{{"count":{len(dates)},"date":')
+                _write_array(f, dates, lambda part: part.astype(str).tolist())
+                f.write(',"prediction_nouveaux_cas":')
+                _write_array(f, pred_cas, lambda part: np.round(part, 2).tolist())
+                f.write(',"prediction_tendance":{"categories":' + json.dumps(categories, **COMPACT) + ',"codes":')
+                _write_array(f, codes, lambda part: part.tolist())
+                f.write("}}")
+        if "parquet" in self.formats:
+            self._write_parquet(dates, pred_cas, codes, categories)
+
+    @contextlib.contextmanager
+    def _replace(self, filename):
+        # Écriture dans un fichier temporaire puis renommage : jamais de fichier final à moitié écrit
+        tmp = self.path(filename + ".tmp")
+        with open(tmp, "w") as f:
+            yield f
+        os.replace(tmp, self.path(filename))
+
+    def _dump(self, filename, content):
+        with self._replace(filename) as f:
+            json.dump(content, f, **COMPACT)
+
+    def _write_parquet(self, dates, pred_cas, codes, categories):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            "date": dates,
+            "prediction_nouveaux_cas": np.round(pred_cas, 2),
+            "prediction_tendance": pa.DictionaryArray.from_arrays(codes, categories),
+        })
+        pq.write_table(table, self.path(f"predictions_{self.name}.parquet"))
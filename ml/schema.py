@@ -0,0 +1,130 @@
+# 📐 Schéma des features : ordre attendu par chaque modèle (lu dans les artefacts),
+# bornes de validité et validation vectorisée d'un lot entier, ligne par ligne
+
+from collections import namedtuple
+
+import numpy as np
+
+# Bornes d'une feature ; `nan` : valeur manquante acceptée (gérée nativement par les arbres),
+# `integer` : valeurs entières uniquement. Les infinis sont toujours refusés.
+Rule = namedtuple("Rule", ("low", "high", "nan", "integer"), defaults=(False, False))
+
+_COUNT = Rule(0, np.inf)
+_OPTIONAL_COUNT = Rule(0, np.inf, nan=True)
+# Taux en fraction ou en pourcentage selon la source des données
+_RATE = Rule(0, 100, nan=True)
+
+FEATURE_RULES = {
+    # Calculées à partir des nouveaux cas : jamais manquantes
+    "new_cases_lag1": _COUNT,
+    "new_cases_lag7": _COUNT,
+    "new_cases_ma7": _COUNT,
+    "new_cases_7d_avg": _COUNT,
+    "lag_1": _COUNT,
+    "lag_2": _COUNT,
+    "lag_7": _COUNT,
+    # Calendrier : mois 1-12, jour de la semaine 0 = lundi
+    "month": Rule(1, 12, integer=True),
+    "day_of_week": Rule(0, 6, integer=True),
+    # Colonnes facultatives de l'historique (NaN quand elles sont absentes)
+    "new_deaths_7d_avg": _OPTIONAL_COUNT,
+    "icu_patients": _OPTIONAL_COUNT,
+    "hosp_patients": _OPTIONAL_COUNT,
+    "people_vaccinated": _OPTIONAL_COUNT,
+    "reproduction_rate": Rule(0, 10, nan=True),
+    "stringency_index": Rule(0, 100, nan=True),
+    "positive_rate": _RATE,
+    "vaccinated_rate": _RATE,
+    "boosted_rate": _RATE,
+}
+# Feature sans règle connue : seules les valeurs infinies sont refusées
+DEFAULT_RULE = Rule(-np.inf, np.inf, nan=True)
+
+
+def _rule_errors(name, rule):
+    """Masque vectorisé des valeurs invalides d'une colonne, et message décrivant une valeur refusée."""
+    def check(values):
+        invalid = np.isinf(values) | (values < rule.low) | (values > rule.high)
+        if not rule.nan:
+            invalid |= np.isnan(values)
+        if rule.integer:
+            invalid |= np.isfinite(values) & (values != np.floor(values))
+        return invalid
+
+    def describe(value):
+        if np.isnan(value):
+            return f"{name} : valeur manquante"
+        if np.isinf(value):
+            return f"{name} : valeur infinie"
+        if rule.integer and value != np.floor(value):
+            return f"{name} : {value:g} n'est pas un entier"
+        return f"{name} : {value:g} hors de [{rule.low:g}, {rule.high:g}]"
+
+    return check, describe
+
+
+class Validation:
+    """
+    Résultat de `FeatureSchema.validate` : `valid` (masque booléen des lignes acceptées)
+    et `rejected`, une entrée {"index", "errors"} par ligne refusée.
+    """
+
+    def __init__(self, valid, rejected):
+        self.valid = valid
+        self.rejected = rejected
+
+    @property
+    def all_valid(self):
+        return not self.rejected
+
+
+class FeatureSchema:
+    """
+    Ordre des features de chaque modèle et règles de validité de chacune.
+
+    `inputs` : toutes les features nécessaires aux deux modèles, dans l'ordre de
+    première apparition ; c'est l'ensemble des champs exigés des clients.
+    """
+
+    def __init__(self, cas, tendance, rules=FEATURE_RULES):
+        self.cas = list(cas)
+        self.tendance = list(tendance)
+        self.inputs = list(dict.fromkeys(self.cas + self.tendance))
+        self._checks = {name: _rule_errors(name, rules.get(name, DEFAULT_RULE)) for name in self.inputs}
+
+    def __eq__(self, other):
+        return isinstance(other, FeatureSchema) and (self.cas, self.tendance) == (other.cas, other.tendance)
+
+    def __repr__(self):
+        return f"FeatureSchema(cas={self.cas}, tendance={self.tendance})"
+
+    def matrices(self, columns):
+        """Matrices (X_cas, X_tendance), colonnes dans l'ordre attendu par chaque modèle."""
+        return (
+            np.column_stack([columns[f] for f in self.cas]),
+            np.column_stack([columns[f] for f in self.tendance]),
+        )
+
+    def validate(self, columns, names=None):
+        """
+        Vérifie toutes les lignes en une passe par feature (opérations NumPy sur les
+        colonnes entières) ; les messages ne sont construits que pour les lignes refusées.
+        `names` : features à vérifier (défaut : `inputs`).
+        """
+        checks = [(name, self._checks[name]) for name in (self.inputs if names is None else names)]
+        invalid = np.vstack([check(np.asarray(columns[name], dtype=float)) for name, (check, _) in checks])
+        valid = ~invalid.any(axis=0)
+        rejected = []
+        for index in np.flatnonzero(~valid).tolist():
+            errors = [
+                describe(float(columns[name][index]))
+                for (name, (_, describe)), bad in zip(checks, invalid[:, index])
+                if bad
+            ]
+            rejected.append({"index": index, "errors": errors})
+        return Validation(valid, rejected)
+
+
+def select_rows(columns, mask, names):
+    """Colonnes `names` restreintes aux lignes de `mask`."""
+    return {name: columns[name][mask] for name in names}
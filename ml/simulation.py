@@ -0,0 +1,247 @@
+# 🎲 Moteur de simulation des scénarios : entrées générées en NumPy, un predict par scénario
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from client import AsyncPredictClient
+from features import predict_batch
+from registry import ModelRegistry
+from results import COMPACT, DEFAULT_FORMATS, ResultWriter
+
+# Paramètres fixes de chaque scénario (repris de simulate_2025.py)
+SCENARIOS = {
+    "fortes_mesures": {
+        "stringency_index": 90,
+        "reproduction_rate": 0.8,
+        "vaccinated_rate": 0.9,
+        "boosted_rate": 0.7,
+    },
+    "mesures_moyennes": {
+        "stringency_index": 60,
+        "reproduction_rate": 1.2,
+        "vaccinated_rate": 0.6,
+        "boosted_rate": 0.4,
+    },
+    "relachement": {
+        "stringency_index": 30,
+        "reproduction_rate": 1.6,
+        "vaccinated_rate": 0.3,
+        "boosted_rate": 0.1,
+    },
+}
+
+BASE_CASES = 1500
+DEFAULT_START = date(2025, 1, 1)
+DEFAULT_HORIZON = 365
+
+
+def scenario_dates(start=DEFAULT_START, horizon=DEFAULT_HORIZON):
+    return np.datetime64(start, "D") + np.arange(horizon)
+
+
+def generate_inputs(params, dates, rng, base_cases=BASE_CASES):
+    """
+    Tire les entrées d'un scénario pour toutes les dates à la fois.
+
+    Mêmes lois que la boucle historique de simulate_2025.py (gauss, uniform,
+    troncature int), mais vectorisées : une colonne par feature. Les comptes tirés
+    négatifs sont ramenés à 0, sans quoi l'API refuserait la ligne (schema.py).
+    """
+    n = len(dates)
+    cas_jour = np.maximum(0, np.trunc(rng.normal(base_cases, 200, n)))
+    cas_jour_7 = np.maximum(0, np.trunc(rng.normal(cas_jour * 0.95, 100)))
+    moyenne_cas = np.trunc((cas_jour + cas_jour_7) / 2)
+    columns = {
+        "new_cases_lag1": cas_jour,
+        "new_cases_lag7": cas_jour_7,
+        "new_cases_ma7": moyenne_cas,
+        "positive_rate": np.round(rng.uniform(0.05, 0.25, n), 2),
+        "icu_patients": np.maximum(0, np.trunc(rng.normal(100, 30, n))),
+        "hosp_patients": np.maximum(0, np.trunc(rng.normal(800, 150, n))),
+        "new_cases_7d_avg": moyenne_cas,
+        "new_deaths_7d_avg": np.maximum(0, np.trunc(rng.normal(20, 5, n))),
+        "lag_1": cas_jour,
+        "lag_2": np.trunc(cas_jour * 0.97),
+        "lag_7": cas_jour_7,
+        "month": (dates.astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(float),
+        "day_of_week": ((dates.astype(np.int64) + 3) % 7).astype(float),
+        "people_vaccinated": np.maximum(0, np.trunc(rng.normal(15000000, 2000000, n))),
+    }
+    for name in ("reproduction_rate", "stringency_index", "vaccinated_rate", "boosted_rate"):
+        columns[name] = np.full(n, float(params[name]))
+    return columns
+
+
+def scenario_rngs(names, seed):
+    """Un générateur indépendant par scénario, dérivé de la graine : résultat reproductible."""
+    children = np.random.SeedSequence(seed).spawn(len(names))
+    return {name: np.random.default_rng(child) for name, child in zip(names, children)}
+
+
+class LocalPredictor:
+    """Prédit en mémoire avec les modèles du registre, sans serveur."""
+
+    def __init__(self, model_dir, country, backend="native"):
+        self.models = ModelRegistry(model_dir, countries=[country], backend=backend).get(country)
+
+    def __call__(self, columns):
+        return predict_batch(self.models, columns)
+
+
+def iter_scenarios(predictor, scenarios, start=DEFAULT_START, horizon=DEFAULT_HORIZON, seed=None):
+    """Simule chaque scénario sur `horizon` jours ; produit (nom, dates, pred_cas, pred_tendance) au fur et à mesure."""
+    dates = scenario_dates(start, horizon)
+    rngs = scenario_rngs(list(scenarios), seed)
+    for name, params in scenarios.items():
+        columns = generate_inputs(params, dates, rngs[name])
+        yield (name, dates) + tuple(predictor(columns))
+
+
+def run_scenarios(predictor, scenarios, start=DEFAULT_START, horizon=DEFAULT_HORIZON, seed=None):
+    """Comme `iter_scenarios`, sous forme de dictionnaire {nom: (dates, pred_cas, pred_tendance)}."""
+    return {name: rest for name, *rest in iter_scenarios(predictor, scenarios, start, horizon, seed)}
+
+
+def parse_targets(spec, default_country):
+    """« URL » ou « pays=URL,pays=URL » -> [(pays, URL), ...]"""
+    targets = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        country, sep, url = item.partition("=")
+        targets.append((country, url) if sep else (default_country, item))
+    return targets
+
+
+async def run_scenarios_remote(targets, scenarios, start=DEFAULT_START, horizon=DEFAULT_HORIZON, seed=None,
+                               client=None, batch_rows=5000):
+    """
+    Simule les scénarios via l'API batch de chaque backend de `targets`.
+
+    Les entrées d'un scénario sont tirées une seule fois puis envoyées à tous les
+    backends ; toutes les requêtes partent en parallèle dans la limite du client.
+    Renvoie {(pays, URL): {nom: (dates, pred_cas, pred_tendance)}}.
+    """
+    dates = scenario_dates(start, horizon)
+    rngs = scenario_rngs(list(scenarios), seed)
+    inputs = {name: generate_inputs(params, dates, rngs[name]) for name, params in scenarios.items()}
+    client = client or AsyncPredictClient()
+    async with client:
+        fanned = await asyncio.gather(*(client.fan_out(targets, columns, batch_rows) for columns in inputs.values()))
+    return {
+        target: {name: (dates,) + tuple(by_target[target]) for name, by_target in zip(inputs, fanned)}
+        for target in targets
+    }
+
+
+def load_scenarios(names=None, path=None):
+    """Scénarios intégrés, complétés ou remplacés par un fichier JSON {nom: paramètres}, filtrés par nom."""
+    scenarios = dict(SCENARIOS)
+    if path:
+        with open(path) as f:
+            scenarios.update(json.load(f))
+    if names:
+        unknown = [n for n in names if n not in scenarios]
+        if unknown:
+            raise SystemExit(f"Scénarios inconnus : {', '.join(unknown)}")
+        scenarios = {n: scenarios[n] for n in names}
+    return scenarios
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation prédictive des scénarios COVID-19")
+    parser.add_argument("--scenarios", help="Noms des scénarios séparés par des virgules (défaut : tous)")
+    parser.add_argument("--scenarios-file", help="Fichier JSON de scénarios supplémentaires {nom: paramètres}")
+    parser.add_argument("--start", type=date.fromisoformat, default=DEFAULT_START, help="Première date (AAAA-MM-JJ)")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Nombre de jours simulés")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire (résultats reproductibles)")
+    parser.add_argument("--country", default=os.getenv("COUNTRY", "canada"))
+    parser.add_argument("--model-dir", default=os.path.join(os.path.dirname(__file__), "model"))
+    parser.add_argument("--backend", default="native", choices=("native", "numpy", "auto"))
+    parser.add_argument("--remote", metavar="URL",
+                        help="Utilise l'API batch au lieu des modèles locaux : URL, ou pays=URL,pays=URL "
+                             "pour interroger plusieurs backends à la fois")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requêtes simultanées en mode --remote")
+    parser.add_argument("--retries", type=int, default=3, help="Nouvelles tentatives par requête en mode --remote")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Délai (s) par requête en mode --remote")
+    parser.add_argument("--batch-rows", type=int, default=5000, help="Lignes par requête en mode --remote")
+    parser.add_argument("--trajectories", type=int, default=0,
+                        help="Mode Monte Carlo : nombre de trajectoires par scénario (0 = un seul tirage)")
+    parser.add_argument("--workers", type=int, default=None, help="Processus du mode Monte Carlo (défaut : nombre de cœurs)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Trajectoires par tâche du mode Monte Carlo")
+    parser.add_argument("--output-dir", default="results-model-2025")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="Fichiers écrits : ndjson, rows, columns, summary, parquet (séparés par des virgules)")
+    return parser.parse_args(argv)
+
+
+def main_monte_carlo(args, scenarios):
+    # Import local : montecarlo.py dépend de ce module
+    import montecarlo
+
+    dates = scenario_dates(args.start, args.horizon)
+    started = time.perf_counter()
+    results = montecarlo.run_monte_carlo(
+        scenarios, dates, args.trajectories, args.model_dir, args.country, args.backend,
+        seed=args.seed, workers=args.workers, chunk=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - started
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, acc in results.items():
+        with open(output_dir / f"predictions_{name}_montecarlo.json", "w") as f:
+            json.dump(montecarlo.to_records(dates, acc.summary()), f, **COMPACT)
+
+    print(f"{len(results)} scénarios × {args.trajectories} trajectoires × {args.horizon} jours "
+          f"simulés en {elapsed:.1f} s, sauvegardés dans {output_dir}")
+
+
+def write_result(args, name, dates, pred_cas, pred_tendance):
+    with ResultWriter(Path(args.output_dir), name, args.formats.split(",")) as writer:
+        writer.write(dates, pred_cas, pred_tendance)
+
+
+def main_remote(args, scenarios):
+    targets = parse_targets(args.remote, args.country)
+    client = AsyncPredictClient(concurrency=args.concurrency, retries=args.retries, timeout=args.timeout)
+    started = time.perf_counter()
+    results = asyncio.run(run_scenarios_remote(
+        targets, scenarios, args.start, args.horizon, args.seed, client, args.batch_rows
+    ))
+    elapsed = time.perf_counter() - started
+
+    # Plusieurs backends : le pays est ajouté au nom des fichiers
+    for (country, _), by_scenario in results.items():
+        for name, result in by_scenario.items():
+            write_result(args, f"{name}_{country}" if len(targets) > 1 else name, *result)
+    print(f"{len(scenarios)} scénarios × {len(targets)} backends × {args.horizon} jours "
+          f"simulés en {elapsed:.3f} s, sauvegardés dans {args.output_dir}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = load_scenarios(args.scenarios.split(",") if args.scenarios else None, args.scenarios_file)
+    if args.trajectories > 0:
+        if args.remote:
+            raise SystemExit("Le mode Monte Carlo utilise les modèles locaux (--remote non pris en charge)")
+        return main_monte_carlo(args, scenarios)
+    if args.remote:
+        return main_remote(args, scenarios)
+
+    predictor = LocalPredictor(args.model_dir, args.country, args.backend)
+    started = time.perf_counter()
+    # Chaque scénario est écrit dès qu'il est prédit
+    for name, *result in iter_scenarios(predictor, scenarios, args.start, args.horizon, args.seed):
+        write_result(args, name, *result)
+    elapsed = time.perf_counter() - started
+    print(f"{len(scenarios)} scénarios × {args.horizon} jours simulés et sauvegardés en {elapsed:.3f} s dans {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ import os
 from unittest.mock import MagicMock
 import pytest
 import json
+import re
+import asyncio
+import threading
+import time
 
 # Ajoute le dossier parent (ml/) au chemin pour pouvoir importer app.py
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -10,6 +14,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # On intercepte l'import de joblib avant que app.py le fasse
 import joblib
 
+# Vrai chargeur, conservé pour les listes de features (model_features*.pkl)
+joblib_load = joblib.load
+
 # Fonction de remplacement pour joblib.load, utilisée à la place des modèles .pkl
 def fake_load(path):
     """
@@ -24,12 +31,16 @@ def fake_load(path):
     - Sinon, on retourne 1234 (valeur arbitraire)
 
     Cela permet de tester toute l'API sans dépendance aux modèles réels.
+    Les listes de features (model_features*.pkl) sont lues pour de vrai : elles
+    fixent l'ordre des colonnes envoyées au modèle des cas.
     """
+    if "model_features" in os.path.basename(path):
+        return joblib_load(path)
     class DummyModel:
         def predict(self, X):
             if "tendance" in path:
-                return ["hausse"]
-            return [1234]
+                return ["hausse"] * len(X)
+            return [1234] * len(X)
     return DummyModel()
 
 # On remplace joblib.load globalement par fake_load
@@ -37,6 +48,9 @@ joblib.load = fake_load
 
 # Maintenant que joblib est remplacé, on peut importer app.py sans que ça plante
 import app
+from batcher import MicroBatcher
+from inference import InferencePool, PoolSaturated
+from payloads import BINARY_MEDIA_TYPE, encode_columns
 from fastapi.testclient import TestClient
 
 # Client de test pour simuler les requêtes à l'API
@@ -51,6 +65,17 @@ class TestBasicEndpoints:
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
     
+    def test_root_etag(self):
+        """Le formulaire pré-rendu porte un ETag : une seconde requête conditionnelle reçoit 304"""
+        response = client.get("/")
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+        assert response.headers["content-encoding"] == "gzip"
+        assert "<form" in response.text
+        response = client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
     # def test_country_endpoint(self):
     #     """Test de l'endpoint /country"""
     #     response = client.get("/country")
@@ -66,27 +91,104 @@ class TestBasicEndpoints:
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
 
+class TestHealthEndpoints:
+    """Tests de /health/live et /health/ready"""
+
+    def test_live(self):
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_ready_after_warm_up(self):
+        """Le démarrage (lifespan) préchauffe les modèles avant de se déclarer prêt"""
+        with TestClient(app.app) as started:
+            deadline = time.time() + 5
+            response = started.get("/health/ready")
+            while response.status_code != 200 and time.time() < deadline:
+                time.sleep(0.01)
+                response = started.get("/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["import_seconds"] > 0
+        assert data["warm_up_seconds"] >= 0
+        assert app.COUNTRY in data["loaded"]
+
+    def test_live_during_slow_warm_up(self, monkeypatch, sample_prediction_data):
+        """Pendant un préchauffage lent, /health/live répond même si une prédiction attend les modèles"""
+        release = threading.Event()
+        registry = app.ModelRegistry(app.MODEL_DIR, countries=[app.COUNTRY])
+        read = registry._read
+
+        def slow_read(path):
+            release.wait(5)
+            return read(path)
+
+        monkeypatch.setattr(registry, "_read", slow_read)
+        monkeypatch.setattr(app, "registry", registry)
+        monkeypatch.setattr(app, "startup", dict(app.startup, ready=False))
+        with TestClient(app.app) as started:
+            results = []
+            predicting = threading.Thread(target=lambda: results.append(started.post(
+                f"/api/{app.COUNTRY}/predict-batch-json", json=[sample_prediction_data])))
+            predicting.start()
+            try:
+                time.sleep(0.1)
+                begin = time.perf_counter()
+                assert started.get("/health/live").status_code == 200
+                assert started.get("/health/ready").status_code == 503
+                assert time.perf_counter() - begin < 1
+            finally:
+                release.set()
+                predicting.join()
+        assert results[0].status_code == 200
+
+    def test_not_ready_before_warm_up(self, monkeypatch):
+        monkeypatch.setitem(app.startup, "ready", False)
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
 class TestPredictionEndpoints:
     """Tests des endpoints de prédiction ML"""
     
     def test_predict_cases(self):
-        """Test de prédiction des nouveaux cas"""
+        """Test de prédiction des nouveaux cas (champs du schéma, model_features.pkl)"""
+        response = client.post("/canada/predict-cases", data={
+            "new_cases_7d_avg": 100,
+            "new_deaths_7d_avg": 5,
+            "reproduction_rate": 1.0,
+            "people_vaccinated": 5000000,
+            "month": 6,
+            "day_of_week": 2,
+            "lag_1": 90,
+            "lag_2": 80,
+            "lag_7": 60,
+            "stringency_index": 60.0
+        })
+        assert response.status_code == 200
+        assert "text/html" in response.headers["content-type"]
+        assert "Nouveaux cas prédits : 1234" in response.text
+
+    def test_legacy_case_fields_are_rejected(self):
+        """Les anciens champs du modèle des cas ne suffisent plus : 422 et liste des champs manquants"""
         response = client.post("/canada/predict-cases", data={
             "new_cases_lag1": 100,
             "new_cases_lag7": 100,
             "new_cases_ma7": 100,
-            "growth_rate": 1.0,
             "reproduction_rate": 1.0,
-            "positive_rate": 0.1,
-            "icu_patients": 20,
-            "hosp_patients": 80,
-            "stringency_index": 60.0,
-            "vaccinated_rate": 50.0,
-            "boosted_rate": 20.0
+            "stringency_index": 60.0
         })
-        assert response.status_code == 200
-        assert "text/html" in response.headers["content-type"]
-    
+        assert response.status_code == 422
+        assert "Champs manquants : new_cases_7d_avg" in response.text
+
+    def test_form_fields_follow_schema(self):
+        """Le formulaire propose exactement les features du schéma des modèles servis"""
+        response = client.get("/")
+        schema = app.registry.get(app.COUNTRY).schema
+        names = re.findall(r'name="(\w+)" class="form-(?:select|control)"', response.text)
+        assert sorted(names) == sorted(schema.inputs)
+
     def test_predict_tendance(self):
         """Test de prédiction de tendance"""
         response = client.post("/canada/predict-tendance", data={
@@ -103,6 +205,7 @@ class TestPredictionEndpoints:
         })
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
+        assert "Tendance épidémique : hausse" in response.text
     
     def test_predict_all(self):
         """Test de prédiction combinée (/predict-all)"""
@@ -164,6 +267,338 @@ class TestJSONAPIEndpoints:
     #     assert data["prediction_nouveaux_cas"] == 1234
     #     assert data["prediction_tendance"] == "hausse"
 
+class TestBatchEndpoint:
+    """Tests de l'endpoint batch /api/canada/predict-batch-json"""
+
+    def test_batch_rows(self, sample_prediction_data):
+        """Une liste de lignes renvoie une prédiction par ligne"""
+        response = client.post("/api/canada/predict-batch-json", json=[sample_prediction_data] * 3)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        assert data["predictions"][0] == {"prediction_nouveaux_cas": 1234, "prediction_tendance": "hausse"}
+
+    def test_batch_columns(self, sample_prediction_data):
+        """Le format colonnes donne le même résultat que le format lignes"""
+        columns = {k: [v, v] for k, v in sample_prediction_data.items()}
+        response = client.post("/api/canada/predict-batch-json", json=columns)
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+
+    def test_batch_columnar_output(self, sample_prediction_data):
+        """?format=columns : une liste par sortie au lieu d'un objet par ligne"""
+        response = client.post("/api/canada/predict-batch-json?format=columns", json=[sample_prediction_data] * 3)
+        assert response.status_code == 200
+        assert response.json() == {"count": 3, "cas": [1234.0] * 3, "tendance": ["hausse"] * 3}
+
+    def test_batch_ndjson_output(self, sample_prediction_data):
+        """Accept: application/x-ndjson : une ligne JSON par prédiction, envoyées en flux"""
+        response = client.post(
+            "/api/canada/predict-batch-json", json=[sample_prediction_data] * 3,
+            headers={"Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["x-count"] == "3"
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"prediction_nouveaux_cas": 1234.0, "prediction_tendance": "hausse"}
+        ] * 3
+
+    def test_batch_unknown_output_format(self, sample_prediction_data):
+        response = client.post("/api/canada/predict-batch-json?format=xml", json=[sample_prediction_data])
+        assert response.status_code == 422
+
+    def test_batch_single_predict_call(self, sample_prediction_data):
+        """Un seul appel predict par modèle, quelle que soit la taille du batch"""
+        calls = []
+        model_cas = app.registry.get("canada").model_cas
+        original = model_cas.predict
+        model_cas.predict = lambda X: calls.append(len(X)) or original(X)
+        try:
+            response = client.post("/api/canada/predict-batch-json", json=[sample_prediction_data] * 50)
+        finally:
+            model_cas.predict = original
+        assert response.status_code == 200
+        assert calls == [50]
+
+    def test_batch_missing_field(self, sample_prediction_data):
+        """Une ligne incomplète renvoie une erreur 422"""
+        row = dict(sample_prediction_data)
+        del row["lag_7"]
+        response = client.post("/api/canada/predict-batch-json", json=[sample_prediction_data, row])
+        assert response.status_code == 422
+        assert "lag_7" in response.json()["error"]
+
+    def test_batch_unequal_columns(self, sample_prediction_data):
+        """Des colonnes de longueurs différentes sont refusées"""
+        columns = {k: [v, v] for k, v in sample_prediction_data.items()}
+        columns["month"] = [1]
+        response = client.post("/api/canada/predict-batch-json", json=columns)
+        assert response.status_code == 422
+
+    def test_batch_empty(self):
+        """Un batch vide renvoie une liste vide"""
+        response = client.post("/api/canada/predict-batch-json", json=[])
+        assert response.status_code == 200
+        assert response.json() == {"count": 0, "predictions": []}
+
+    def test_batch_binary_columns(self, sample_prediction_data):
+        """Le format binaire float32 colonnes donne le même résultat que le JSON"""
+        columns = {k: [v] * 4 for k, v in sample_prediction_data.items()}
+        body = encode_columns(columns, app.FEATURES_ALL)
+        response = client.post("/api/canada/predict-batch-json", content=body,
+                               headers={"Content-Type": BINARY_MEDIA_TYPE})
+        assert response.status_code == 200
+        assert response.json()["count"] == 4
+        assert response.json()["predictions"][0]["prediction_tendance"] == "hausse"
+
+    def test_batch_binary_feature_order_header(self, sample_prediction_data):
+        """L'en-tête X-Features permet d'envoyer les colonnes dans un autre ordre"""
+        names = list(reversed(app.FEATURES_ALL))
+        body = encode_columns({k: [v] for k, v in sample_prediction_data.items()}, names)
+        response = client.post("/api/canada/predict-batch-json", content=body,
+                               headers={"Content-Type": BINARY_MEDIA_TYPE, "X-Features": ",".join(names)})
+        assert response.status_code == 200
+
+    def test_batch_binary_truncated(self, sample_prediction_data):
+        """Un corps binaire tronqué est refusé"""
+        body = encode_columns({k: [v] for k, v in sample_prediction_data.items()}, app.FEATURES_ALL)
+        response = client.post("/api/canada/predict-batch-json", content=body[:-4],
+                               headers={"Content-Type": BINARY_MEDIA_TYPE})
+        assert response.status_code == 422
+
+    def test_unsupported_content_type(self):
+        response = client.post("/api/canada/predict-batch-json", content=b"a,b",
+                               headers={"Content-Type": "text/csv"})
+        assert response.status_code == 415
+
+    def test_predict_all_json_body(self, sample_prediction_data):
+        """/predict-all-json accepte aussi un objet JSON d'une ligne"""
+        response = client.post("/api/canada/predict-all-json", json=sample_prediction_data)
+        assert response.status_code == 200
+        assert response.json() == {"prediction_nouveaux_cas": 1234, "prediction_tendance": "hausse"}
+
+    def test_predict_all_json_form_missing_field(self, sample_prediction_data):
+        row = dict(sample_prediction_data)
+        del row["month"]
+        response = client.post("/api/canada/predict-all-json", data=row)
+        assert response.status_code == 422
+        assert "month" in response.json()["error"]
+
+    def test_predict_all_json_out_of_range(self, sample_prediction_data):
+        """Une ligne hors bornes est refusée en 422 avec le détail des features en cause"""
+        response = client.post("/api/canada/predict-all-json", json=dict(sample_prediction_data, month=13))
+        assert response.status_code == 422
+        assert response.json()["errors"] == ["month : 13 hors de [1, 12]"]
+
+    def test_batch_rejects_invalid_rows_only(self, sample_prediction_data):
+        """Les lignes invalides valent null et sont détaillées, les autres sont prédites"""
+        bad = dict(sample_prediction_data, lag_1=-5)
+        response = client.post("/api/canada/predict-batch-json", json=[sample_prediction_data, bad])
+        assert response.status_code == 200
+        data = response.json()
+        assert data["predictions"] == [
+            {"prediction_nouveaux_cas": 1234, "prediction_tendance": "hausse"},
+            {"prediction_nouveaux_cas": None, "prediction_tendance": None},
+        ]
+        assert data["rejected"] == [{"index": 1, "errors": ["lag_1 : -5 hors de [0, inf]"]}]
+
+    def test_batch_requires_only_schema_features(self, sample_prediction_data):
+        """Seules les features utilisées par les modèles sont exigées"""
+        schema = app.registry.get("canada").schema
+        row = {f: sample_prediction_data[f] for f in schema.inputs}
+        response = client.post("/api/canada/predict-batch-json?format=columns", json=[row])
+        assert response.status_code == 200
+        assert response.json()["cas"] == [1234.0]
+
+class TestHistoryEndpoint:
+    """Tests de /api/canada/predict-history (features calculées côté serveur)"""
+
+    def test_history_csv(self):
+        """Le CSV du dataset renvoie une prédiction par date, hors période de chauffe"""
+        with open(os.path.join(os.path.dirname(__file__), "..", "dataset", "test_data_canada.csv"), "rb") as f:
+            body = f.read()
+        n_rows = body.count(b"\n") - 1
+        response = client.post("/api/canada/predict-history", content=body, headers={"Content-Type": "text/csv"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == n_rows - 7
+        assert data["predictions"][0] == {
+            "date": "2020-05-03", "prediction_nouveaux_cas": 1234, "prediction_tendance": "hausse"
+        }
+
+    def test_history_columns(self):
+        rows = [{"date": f"2025-01-{d:02d}", "new_cases": 100 + d} for d in range(1, 11)]
+        response = client.post("/api/canada/predict-history?format=columns", json=rows)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        assert data["date"] == ["2025-01-08", "2025-01-09", "2025-01-10"]
+        assert data["cas"] == [1234.0] * 3
+
+    def test_history_rejects_negative_counts(self):
+        """Un nombre de cas négatif rend invalides les lignes dont il est un décalage"""
+        rows = [{"date": f"2025-01-{d:02d}", "new_cases": 100 + d} for d in range(1, 11)]
+        rows[8]["new_cases"] = -1
+        response = client.post("/api/canada/predict-history?format=columns", json=rows)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cas"] == [1234.0, 1234.0, None]
+        assert data["rejected"][0]["index"] == 2
+
+    def test_history_json_too_short(self):
+        rows = [{"date": f"2025-01-0{d}", "new_cases": 100} for d in range(1, 4)]
+        response = client.post("/api/canada/predict-history", json=rows)
+        assert response.status_code == 200
+        assert response.json() == {"count": 0, "predictions": []}
+
+    def test_history_missing_new_cases(self):
+        response = client.post("/api/canada/predict-history", json=[{"date": "2025-01-01"}])
+        assert response.status_code == 422
+        assert "new_cases" in response.json()["error"]
+
+class TestMetricsEndpoint:
+    """Tests de /metrics (format texte Prometheus)"""
+
+    def test_request_and_stage_durations(self):
+        client.post("/api/canada/predict-all-json", json={f: 1.0 for f in app.FEATURES_ALL})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert "# TYPE covid_api_request_duration_seconds histogram" in text
+        assert ('covid_api_request_duration_seconds_count{endpoint="/api/{country}/predict-all-json",'
+                'country="canada",method="POST",status="200"}') in text
+        for stage in ("parse", "features", "predict_cas", "predict_tendance", "render"):
+            assert f'covid_api_stage_duration_seconds_count{{stage="{stage}",' in text
+        assert "inference_pool_pending " in text
+        assert 'models_loaded{country="canada"} 1' in text
+
+    def test_unknown_country_label_is_bounded(self):
+        client.post("/api/atlantide/predict-all-json", json={})
+        text = client.get("/metrics").text
+        assert 'country="atlantide"' not in text
+        assert 'country="inconnu",method="POST",status="404"' in text
+
+class TestInferencePool:
+    """Tests du pool d'inférence borné"""
+
+    def test_run_returns_result(self):
+        """Le pool exécute la fonction et renvoie son résultat"""
+        pool = InferencePool(workers=2, max_queue=0)
+        assert asyncio.run(pool.run(sum, [1, 2, 3])) == 6
+        assert pool.pending == 0
+
+    def test_cancelled_wait_keeps_task_counted(self):
+        """Un client qui abandonne ne libère pas la place tant que le predict tourne encore"""
+        pool = InferencePool(workers=1, max_queue=0)
+        release = threading.Event()
+
+        async def abandon():
+            task = asyncio.ensure_future(pool.run(release.wait))
+            while pool.pending == 0:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert pool.pending == 1
+            with pytest.raises(PoolSaturated):
+                await pool.run(sum, [1])
+
+        asyncio.run(abandon())
+        release.set()
+        deadline = time.time() + 5
+        while pool.pending and time.time() < deadline:
+            time.sleep(0.01)
+        assert pool.pending == 0
+
+    def test_saturated_pool_returns_503(self, sample_prediction_data):
+        """Un pool saturé renvoie 503 avec l'en-tête Retry-After"""
+        pool = InferencePool(workers=1, max_queue=0, retry_after=2)
+        release = threading.Event()
+        worker = threading.Thread(target=lambda: asyncio.run(pool.run(release.wait)))
+        worker.start()
+        original = app.inference_pool
+        app.inference_pool = pool
+        try:
+            while pool.pending == 0:
+                time.sleep(0.01)
+            response = client.post("/api/canada/predict-batch-json", json=[sample_prediction_data])
+        finally:
+            app.inference_pool = original
+            release.set()
+            worker.join()
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+
+class TestMicroBatcher:
+    """Tests du micro-batcher des requêtes unitaires"""
+
+    @staticmethod
+    async def _direct_runner(fn, items):
+        return fn(items)
+
+    def test_concurrent_rows_share_one_call(self):
+        """Des soumissions concurrentes sont regroupées en un seul appel"""
+        calls = []
+
+        def batch_fn(items):
+            calls.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(batch_fn, self._direct_runner, max_batch=64, max_wait_ms=20)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+        assert asyncio.run(scenario()) == [i * 2 for i in range(10)]
+        assert calls == [10]
+        assert batcher.batch_size.snapshot()["count"] == 1
+        assert batcher.queue_wait.snapshot()["count"] == 10
+
+    def test_max_batch_splits(self):
+        """Un lot ne dépasse jamais max_batch éléments"""
+        calls = []
+
+        def batch_fn(items):
+            calls.append(len(items))
+            return items
+
+        batcher = MicroBatcher(batch_fn, self._direct_runner, max_batch=4, max_wait_ms=20)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+        assert asyncio.run(scenario()) == list(range(10))
+        assert calls == [4, 4, 2]
+
+    def test_errors_reach_every_caller(self):
+        """Une erreur du predict groupé est renvoyée à chaque requête du lot"""
+        def batch_fn(items):
+            raise ValueError("modèle indisponible")
+
+        batcher = MicroBatcher(batch_fn, self._direct_runner, max_wait_ms=5)
+
+        async def scenario():
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+    def test_predict_all_json_uses_batcher(self, sample_prediction_data):
+        """/api/canada/predict-all-json passe par le micro-batcher quand il est activé"""
+        app.MICRO_BATCH_ENABLED = True
+        try:
+            response = client.post("/api/canada/predict-all-json", data=sample_prediction_data)
+            stats = client.get("/api/batcher/stats").json()
+        finally:
+            app.MICRO_BATCH_ENABLED = False
+            app.micro_batchers.clear()
+        assert response.status_code == 200
+        assert response.json() == {"prediction_nouveaux_cas": 1234, "prediction_tendance": "hausse"}
+        assert stats["enabled"] is True
+        assert stats["countries"]["canada"]["batch_size"]["count"] == 1
+
 class TestErrorHandling:
     """Tests de gestion d'erreurs"""
     
@@ -207,22 +642,21 @@ class TestDataValidation:
     def test_predict_cases_edge_values(self):
         """Test avec des valeurs extrêmes"""
         response = client.post("/canada/predict-cases", data={
-            "new_cases_lag1": 0,  # Valeur minimum
-            "new_cases_lag7": 999999,  # Valeur maximum
-            "new_cases_ma7": 100,
-            "growth_rate": 0.0,
-            "reproduction_rate": 5.0,
-            "positive_rate": 1.0,
-            "icu_patients": 0,
-            "hosp_patients": 10000,
-            "stringency_index": 100.0,
-            "vaccinated_rate": 100.0,
-            "boosted_rate": 100.0
+            "new_cases_7d_avg": 0,  # Valeur minimum
+            "new_deaths_7d_avg": 999999,  # Valeur maximum
+            "reproduction_rate": 10.0,
+            "people_vaccinated": 0,
+            "month": 12,
+            "day_of_week": 6,
+            "lag_1": 0,
+            "lag_2": 999999,
+            "lag_7": 100,
+            "stringency_index": 100.0
         })
         assert response.status_code == 200
-    
+
     def test_predict_tendance_negative_values(self):
-        """Test avec des valeurs négatives"""
+        """Test avec des valeurs négatives : refusées (422) avec le champ en cause"""
         response = client.post("/canada/predict-tendance", data={
             "new_cases_7d_avg": -10,  # Valeur négative
             "new_deaths_7d_avg": 0,
@@ -235,7 +669,8 @@ class TestDataValidation:
             "people_vaccinated": 0,
             "stringency_index": 0.0
         })
-        assert response.status_code == 200
+        assert response.status_code == 422
+        assert "new_cases_7d_avg : -10 hors de [0, inf]" in response.text
 
 class TestResponseFormat:
     """Tests du format des réponses"""
@@ -336,6 +771,24 @@ class TestMultiCountrySupport:
             
             assert response.status_code in [200, 405]  # 405 pour les POST sur GET endpoints
 
+    def test_country_routes(self, sample_prediction_data):
+        """Chaque pays a ses routes, servies par le même processus"""
+        for country in ["canada", "france", "usa", "suisse"]:
+            response = client.post(f"/api/{country}/predict-all-json", data=sample_prediction_data)
+            assert response.status_code == 200
+        assert set(client.get("/api/models").json()["loaded"]) == {"canada", "france", "usa", "suisse"}
+
+    def test_admin_reload(self):
+        """Le rechargement à chaud indique les pays rechargés et inchangés"""
+        response = client.post("/admin/reload")
+        assert response.status_code == 200
+        assert "canada" in response.json()["unchanged"]
+
+    def test_unknown_country(self, sample_prediction_data):
+        """Un pays non servi renvoie 404"""
+        response = client.post("/api/atlantide/predict-all-json", data=sample_prediction_data)
+        assert response.status_code == 404
+
 class TestDocumentation:
     """Tests de la documentation API"""
     
@@ -380,6 +833,59 @@ def sample_prediction_data():
         "people_vaccinated": 8000000
     }
 
+class TestAggregatesEndpoint:
+    """Tests de la lecture des agrégats de l'entrepôt gold (pool asyncpg simulé)"""
+
+    class FakePool:
+        def __init__(self, rows):
+            self.rows = rows
+            self.queries = []
+
+        async def fetch(self, query, *args):
+            self.queries.append((query, args))
+            return self.rows
+
+    def fake_warehouse(self, monkeypatch, rows):
+        warehouse = app.Warehouse("postgresql://test")
+        warehouse._pool = self.FakePool(rows)
+        monkeypatch.setattr(app, "warehouse", warehouse)
+        return warehouse._pool
+
+    def test_page_with_selected_columns(self, monkeypatch):
+        import datetime
+        rows = [
+            {"iso_code": "CAN", "period_start": datetime.date(2021, 3, d), "new_cases": 10.0}
+            for d in (1, 8, 15)
+        ]
+        pool = self.fake_warehouse(monkeypatch, rows)
+        response = client.get("/api/aggregates/week?columns=new_cases&countries=can,fra&from=2021-01-01&limit=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["columns"] == ["iso_code", "period_start", "new_cases"]
+        assert data["rows"] == [["CAN", "2021-03-01", 10.0], ["CAN", "2021-03-08", 10.0]]
+        assert data["next"] == "CAN:2021-03-08"
+        query, args = pool.queries[0]
+        assert args == ("week", ["CAN", "FRA"], datetime.date(2021, 1, 1), 3)
+
+        response = client.get(f"/api/aggregates/week?columns=new_cases&after={data['next']}&limit=2")
+        assert response.status_code == 200
+        assert pool.queries[1][1][1:3] == ("CAN", datetime.date(2021, 3, 8))
+
+    def test_invalid_parameters(self, monkeypatch):
+        self.fake_warehouse(monkeypatch, [])
+        assert client.get("/api/aggregates/day").status_code == 422
+        response = client.get("/api/aggregates/week?columns=secret")
+        assert response.status_code == 422
+        assert "secret" in response.json()["error"]
+        assert client.get("/api/aggregates/week?after=CAN").status_code == 422
+
+    def test_not_configured(self, monkeypatch):
+        monkeypatch.setattr(app, "warehouse", app.Warehouse(""))
+        response = client.get("/api/aggregates/month")
+        assert response.status_code == 503
+        assert "error" in response.json()
+
+
 # Tests de performance basiques
 class TestPerformance:
     """Tests de performance basiques"""
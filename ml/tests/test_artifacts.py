@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# joblib.load peut être remplacé par test_app.py : on garde la vraie fonction
+import joblib
+from joblib.numpy_pickle import load as joblib_load
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBRegressor
+
+import artifacts
+from registry import ModelRegistry, preferred_path
+from tree_ensemble import CompiledRandomForest
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture(scope="module")
+def trained_models():
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 100, size=(300, 3)), columns=FEATURES)
+    labels = np.where(X["a"] > 60, "hausse", np.where(X["a"] < 30, "baisse", "stable"))
+    rf = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X, labels)
+    xgb = XGBRegressor(n_estimators=10, max_depth=3).fit(X, X["a"] * 2 + X["b"])
+    return rf, xgb
+
+
+class TestExport:
+    """Tests des exports sans pickle (UBJSON et tableaux .npy)"""
+
+    def test_round_trip(self, trained_models, tmp_path):
+        X = np.random.default_rng(1).uniform(0, 100, size=(50, 3))
+        for model in trained_models:
+            path = artifacts.export_path(str(tmp_path / "modele.pkl"), model)
+            loaded = artifacts.load_model(artifacts.export_model(model, path))
+            assert np.array_equal(loaded.predict(X), model.predict(X))
+            assert list(loaded.feature_names_in_) == FEATURES
+        assert isinstance(artifacts.load_model(str(tmp_path / "modele.arrays")), CompiledRandomForest)
+
+    def test_export_replaces_previous(self, trained_models, tmp_path):
+        rf, _ = trained_models
+        path = str(tmp_path / "modele.arrays")
+        artifacts.export_model(rf, path)
+        artifacts.export_model(rf, path)
+        assert sorted(os.listdir(tmp_path)) == ["modele.arrays"]
+
+    def test_identical_pickles_are_linked(self, trained_models, tmp_path, monkeypatch):
+        """Deux .pkl identiques (défaut et Canada) : un seul export, l'autre nom pointe sur les mêmes fichiers"""
+        monkeypatch.setattr(joblib, "load", joblib_load)
+        rf, _ = trained_models
+        for name in ("modele_tendance_covid_rf.pkl", "modele_tendance_covid_rf_canada.pkl"):
+            joblib.dump(rf, tmp_path / name)
+        results = list(artifacts.export_all(sorted(str(p) for p in tmp_path.glob("*.pkl"))))
+        assert [linked for _, _, linked in results] == [False, True]
+        first, second = (os.stat(tmp_path / d / "values.npy") for d in (
+            "modele_tendance_covid_rf.arrays", "modele_tendance_covid_rf_canada.arrays"))
+        assert first.st_ino == second.st_ino
+
+
+class TestRegistryFormats:
+    """Le registre préfère les exports, sauf s'ils sont plus anciens que le .pkl"""
+
+    def test_preferred_path(self, trained_models, tmp_path):
+        _, xgb = trained_models
+        pickle = tmp_path / "model_xgboost_covid.pkl"
+        pickle.write_bytes(b"pickle")
+        assert preferred_path(str(pickle)) == str(pickle)
+        artifacts.export_model(xgb, str(tmp_path / "model_xgboost_covid.ubj"))
+        assert preferred_path(str(pickle)) == str(tmp_path / "model_xgboost_covid.ubj")
+        # Un nouveau .pkl déposé après l'export reprend la main
+        later = time.time() + 10
+        os.utime(pickle, (later, later))
+        assert preferred_path(str(pickle)) == str(pickle)
+
+    def test_arrays_only_for_numpy_backend(self, trained_models, tmp_path):
+        """Le .pkl de la forêt reste servi par scikit-learn, sauf avec le moteur numpy"""
+        rf, _ = trained_models
+        pickle = tmp_path / "modele_tendance_covid_rf.pkl"
+        pickle.write_bytes(b"pickle")
+        artifacts.export_model(rf, str(tmp_path / "modele_tendance_covid_rf.arrays"))
+        assert preferred_path(str(pickle)) == str(pickle)
+        assert preferred_path(str(pickle), "auto") == str(pickle)
+        assert preferred_path(str(pickle), "numpy") == str(tmp_path / "modele_tendance_covid_rf.arrays")
+
+    def test_registry_loads_exports(self, trained_models, tmp_path):
+        rf, xgb = trained_models
+        artifacts.export_model(xgb, str(tmp_path / "model_xgboost_covid.ubj"))
+        artifacts.export_model(rf, str(tmp_path / "modele_tendance_covid_rf.arrays"))
+        pair = ModelRegistry(str(tmp_path)).get("canada")
+        X = np.random.default_rng(2).uniform(0, 100, size=(20, 3))
+        assert np.array_equal(pair.model_cas.predict(X), xgb.predict(X))
+        assert np.array_equal(pair.model_tendance.predict(X), rf.predict(X))
+        assert pair.size == sum(
+            os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(tmp_path) for f in files
+        )
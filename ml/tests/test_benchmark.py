@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark import compare, describe
+
+BASELINE = {
+    "predict.native.cas.rows_1": {"median_ms": 1.0, "p95_ms": 2.0},
+    "api.predict_all_json.form": {"median_ms": 10.0, "p95_ms": 20.0, "rps": 100.0},
+}
+
+
+class TestBenchmarkCompare:
+    """Tests de la détection de régressions par rapport à une référence"""
+
+    def test_within_tolerance(self):
+        current = {"predict.native.cas.rows_1": {"median_ms": 1.2, "p95_ms": 2.4}}
+        assert compare(current, BASELINE, tolerance=0.25) == []
+
+    def test_slower_latency(self):
+        current = {"predict.native.cas.rows_1": {"median_ms": 1.5, "p95_ms": 2.0}}
+        regressions = compare(current, BASELINE, tolerance=0.25)
+        assert len(regressions) == 1 and "median_ms" in regressions[0]
+
+    def test_lower_throughput(self):
+        current = {"api.predict_all_json.form": {"median_ms": 10.0, "p95_ms": 20.0, "rps": 60.0}}
+        regressions = compare(current, BASELINE, tolerance=0.25)
+        assert len(regressions) == 1 and "rps" in regressions[0]
+
+    def test_new_measure_ignored(self):
+        assert compare({"simulation.3x365": {"median_ms": 50.0}}, BASELINE, tolerance=0.25) == []
+
+
+def test_describe():
+    assert describe([1.0, 2.0, 3.0, 4.0]) == {"median_ms": 2.5, "p95_ms": 3.85}
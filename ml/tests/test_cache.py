@@ -0,0 +1,89 @@
+import sys
+import os
+import time
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import registry
+from cache import CachedModel, PredictionCache, parse_rounding
+from registry import ModelRegistry
+
+
+class CountingModel:
+    """Modèle factice : prédit la somme des features et compte les lignes évaluées"""
+
+    n_features_in_ = 3
+
+    def __init__(self, feature_names=None):
+        self.rows = 0
+        if feature_names is not None:
+            self.feature_names_in_ = np.array(feature_names)
+
+    def predict(self, X):
+        self.rows += len(X)
+        return np.asarray(X).sum(axis=1)
+
+
+class TestPredictionCache:
+    """Tests du cache de prédictions"""
+
+    def test_repeated_rows_skip_the_model(self):
+        model = CountingModel()
+        cached = CachedModel(model, PredictionCache(maxsize=100))
+        X = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        np.testing.assert_array_equal(cached.predict(X), [6.0, 15.0])
+        np.testing.assert_array_equal(cached.predict(X), [6.0, 15.0])
+        assert model.rows == 2
+        assert cached.cache.stats() == {"size": 2, "maxsize": 100, "hits": 2, "misses": 2}
+
+    def test_duplicates_in_one_batch_predicted_once(self):
+        model = CountingModel()
+        cached = CachedModel(model, PredictionCache())
+        cached.predict(np.ones((5, 3)))
+        assert model.rows == 1
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(maxsize=2)
+        cache.put_many([b"a", b"b"], [1, 2])
+        cache.get_many([b"a"])
+        cache.put_many([b"c"], [3])
+        assert cache.get_many([b"a", b"b", b"c"])[::2] == [1, 3]
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self):
+        cache = PredictionCache(ttl=0.01)
+        cache.put_many([b"a"], [1])
+        time.sleep(0.02)
+        assert cache.get_many([b"a"])[0] != 1
+        assert cache.misses == 1
+
+    def test_per_feature_rounding(self):
+        """Des entrées proches partagent la même entrée une fois arrondies"""
+        model = CountingModel(feature_names=["a", "b", "c"])
+        cached = CachedModel(model, PredictionCache(), rounding=parse_rounding("a:-2, c:0"))
+        cached.predict(np.array([[1234.0, 0.5, 2.2]]))
+        result = cached.predict(np.array([[1210.0, 0.5, 1.9]]))
+        assert model.rows == 1
+        assert result[0] == pytest.approx(1200.0 + 0.5 + 2.0)
+
+    def test_large_batches_bypass_the_cache(self):
+        model = CountingModel()
+        cached = CachedModel(model, PredictionCache(), max_batch=4)
+        cached.predict(np.zeros((10, 3)))
+        assert len(cached.cache) == 0
+
+    def test_registry_reload_starts_with_empty_cache(self, tmp_path, monkeypatch):
+        """Un fichier de modèle modifié arrive avec un nouveau cache"""
+        for name in ("model_xgboost_covid.pkl", "modele_tendance_covid_rf.pkl"):
+            (tmp_path / name).write_bytes(name.encode())
+        monkeypatch.setattr(registry.joblib, "load", lambda path: CountingModel())
+        reg = ModelRegistry(str(tmp_path), cache={"maxsize": 10})
+        before = reg.get("canada").model_cas
+        before.predict(np.ones((1, 3)))
+        (tmp_path / "model_xgboost_covid.pkl").write_bytes(b"v2")
+        reg.reload()
+        after = reg.get("canada").model_cas
+        assert isinstance(after, CachedModel) and after.cache is not before.cache
+        assert len(reg.cache_stats()) == 2
@@ -0,0 +1,93 @@
+import sys
+import os
+import asyncio
+import httpx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from client import AsyncPredictClient, RemoteError
+from features import FEATURES_ALL
+from payloads import columns_from_binary
+from simulation import SCENARIOS, parse_targets, run_scenarios_remote
+
+
+def fake_api(failures=0, status_code=503, calls=None):
+    """Transport factice : répond comme /predict-batch-json après `failures` erreurs"""
+    state = {"failures": failures}
+
+    def handler(request):
+        if calls is not None:
+            calls.append(str(request.url))
+        if state["failures"] > 0:
+            state["failures"] -= 1
+            return httpx.Response(status_code, json={"error": "saturé"}, headers={"Retry-After": "0"})
+        columns = columns_from_binary(request.content, FEATURES_ALL)
+        n_rows = len(columns["lag_1"])
+        country = request.url.path.split("/")[2]
+        assert request.url.params["format"] == "columns"
+        return httpx.Response(200, json={
+            "count": n_rows, "cas": columns["lag_1"].tolist(), "tendance": [country] * n_rows,
+        })
+
+    return httpx.MockTransport(handler)
+
+
+def columns(n):
+    return {f: np.arange(n, dtype=float) for f in FEATURES_ALL}
+
+
+class TestAsyncPredictClient:
+    """Tests du client asynchrone de l'API batch"""
+
+    def test_split_in_batches(self):
+        calls = []
+
+        async def run():
+            async with AsyncPredictClient(transport=fake_api(calls=calls)) as client:
+                return await client.predict_columns("http://api", "canada", columns(25), batch_rows=10)
+
+        pred_cas, pred_tendance = asyncio.run(run())
+        assert len(calls) == 3
+        np.testing.assert_array_equal(pred_cas, np.arange(25))
+        assert pred_tendance[0] == "canada"
+
+    def test_retry_on_503(self):
+        async def run():
+            async with AsyncPredictClient(transport=fake_api(failures=2), backoff=0) as client:
+                return await client.predict_columns("http://api", "canada", columns(3))
+
+        pred_cas, _ = asyncio.run(run())
+        assert len(pred_cas) == 3
+
+    def test_gives_up_after_retries(self):
+        async def run():
+            async with AsyncPredictClient(transport=fake_api(failures=5), retries=1, backoff=0) as client:
+                await client.predict_columns("http://api", "canada", columns(3))
+
+        with pytest.raises(RemoteError):
+            asyncio.run(run())
+
+    def test_no_retry_on_client_error(self):
+        calls = []
+
+        async def run():
+            transport = fake_api(failures=5, status_code=422, calls=calls)
+            async with AsyncPredictClient(transport=transport, backoff=0) as client:
+                await client.predict_columns("http://api", "canada", columns(3))
+
+        with pytest.raises(RemoteError):
+            asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_fan_out_to_several_backends(self):
+        targets = parse_targets("france=http://fr:8001,usa=http://us:8002", "canada")
+        assert targets == [("france", "http://fr:8001"), ("usa", "http://us:8002")]
+        client = AsyncPredictClient(transport=fake_api())
+        results = asyncio.run(run_scenarios_remote(targets, SCENARIOS, horizon=10, seed=1, client=client))
+        assert set(results) == set(targets)
+        france = results[("france", "http://fr:8001")]["relachement"]
+        usa = results[("usa", "http://us:8002")]["relachement"]
+        np.testing.assert_array_equal(france[1], usa[1])  # mêmes entrées envoyées aux deux backends
+        assert france[2][0] == "france" and usa[2][0] == "usa"
@@ -0,0 +1,54 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from features import WARM_UP_ROWS, build_features, history_from_csv, history_from_json
+from payloads import BatchInputError
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "dataset", "test_data_canada.csv")
+
+
+class TestBuildFeatures:
+    """Les features calculées côté serveur sont identiques à celles des notebooks"""
+
+    def test_same_as_notebook(self):
+        with open(DATASET) as f:
+            dates, features = build_features(history_from_csv(f.read()))
+
+        df = pd.read_csv(DATASET, parse_dates=["date"]).sort_values("date").reset_index(drop=True)
+        df["new_cases_7d_avg"] = df["new_cases"].rolling(7).mean()
+        df["lag_1"] = df["new_cases"].shift(1)
+        df["lag_2"] = df["new_cases"].shift(2)
+        df["lag_7"] = df["new_cases"].shift(7)
+        df["month"] = df["date"].dt.month
+        df["day_of_week"] = df["date"].dt.dayofweek
+        df = df.iloc[WARM_UP_ROWS:]
+
+        assert len(dates) == len(df)
+        for name in ["new_cases_7d_avg", "lag_1", "lag_2", "lag_7", "month", "day_of_week", "stringency_index"]:
+            np.testing.assert_array_equal(features[name], df[name].to_numpy(dtype=float))
+
+    def test_unsorted_rows_and_missing_columns(self):
+        """Les lignes sont triées par date ; une colonne absente donne des NaN"""
+        rows = [{"date": f"2025-01-{d:02d}", "new_cases": d} for d in range(10, 0, -1)]
+        dates, features = build_features(history_from_json(rows))
+        assert str(dates[0]) == "2025-01-08"
+        assert features["lag_7"].tolist() == [1.0, 2.0, 3.0]
+        assert features["new_cases_7d_avg"][0] == pytest.approx(5.0)
+        assert np.isnan(features["new_deaths_7d_avg"]).all()
+        assert features["day_of_week"][0] == 2  # 8 janvier 2025 : mercredi
+
+    @pytest.mark.parametrize("history", [
+        {"new_cases": [1]},
+        {"date": ["2025-01-01", "2025-01-01"], "new_cases": [1, 2]},
+        {"date": ["2025-01-01"], "new_cases": [1, 2]},
+        {"date": ["pas une date"], "new_cases": [1]},
+        {"date": ["2025-01-01"], "new_cases": [None]},
+    ])
+    def test_invalid_history(self, history):
+        with pytest.raises(BatchInputError):
+            build_features(history)
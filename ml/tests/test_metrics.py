@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from metrics import Histogram, HistogramFamily, StageTimer, format_labels, render_samples
+
+
+class TestHistogram:
+    """Tests des histogrammes à seaux cumulés"""
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram("duree", "Durée", (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {"0.1": 2, "1.0": 3, "+Inf": 4}
+        assert snapshot["count"] == 4
+        assert abs(snapshot["sum"] - 3.65) < 1e-9
+
+    def test_family_render(self):
+        family = HistogramFamily("duree", "Durée", ("stage",), buckets=(1.0,))
+        family.labels("parse").observe(0.5)
+        family.labels("parse").observe(2.0)
+        lines = family.render().splitlines()
+        assert lines[:2] == ["# HELP duree Durée", "# TYPE duree histogram"]
+        assert 'duree_bucket{stage="parse",le="1.0"} 1' in lines
+        assert 'duree_bucket{stage="parse",le="+Inf"} 2' in lines
+        assert 'duree_count{stage="parse"} 2' in lines
+
+    def test_labels_are_escaped(self):
+        assert format_labels({"endpoint": 'a"b\\c'}) == '{endpoint="a\\"b\\\\c"}'
+        assert format_labels({}) == ""
+
+    def test_render_samples(self):
+        text = render_samples("pending", "En attente", "gauge", [({}, 3)])
+        assert text.splitlines()[-1] == "pending 3"
+
+
+class TestStageTimer:
+    """Tests du chronomètre d'étapes"""
+
+    def test_context_manager_and_wrap(self):
+        family = HistogramFamily("etapes", "Étapes", ("stage", "endpoint", "country"))
+        timer = StageTimer(family, "/api/{country}/predict", "canada")
+        with timer("parse"):
+            pass
+        assert timer.wrap("predict_cas", lambda x: x * 2)(21) == 42
+        assert family.labels("parse", "/api/{country}/predict", "canada").snapshot()["count"] == 1
+        assert family.labels("predict_cas", "/api/{country}/predict", "canada").snapshot()["count"] == 1
+
+    def test_failed_stage_is_still_recorded(self):
+        family = HistogramFamily("etapes", "Étapes", ("stage", "endpoint", "country"))
+        timer = StageTimer(family, "/x", "canada")
+        try:
+            with timer("predict_cas"):
+                raise ValueError("échec")
+        except ValueError:
+            pass
+        assert family.labels("predict_cas", "/x", "canada").snapshot()["count"] == 1
@@ -0,0 +1,97 @@
+import sys
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import montecarlo
+from montecarlo import DailyQuantiles, chunk_sizes, run_monte_carlo, to_records
+from simulation import SCENARIOS, scenario_dates
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "model")
+
+
+class TestDailyQuantiles:
+    """Tests de l'agrégation en flux des trajectoires"""
+
+    def test_quantiles_close_to_exact(self):
+        rng = np.random.default_rng(0)
+        data = rng.lognormal(8, 0.5, size=(20000, 3))
+        acc = DailyQuantiles(3)
+        for block in np.array_split(data, 7):
+            acc.update(block, np.full(block.shape, "stable"))
+        for q in (0.05, 0.5, 0.95):
+            np.testing.assert_allclose(acc.quantile(q), np.quantile(data, q, axis=0), rtol=0.01)
+        np.testing.assert_allclose(acc.summary()["mean"], data.mean(axis=0))
+
+    def test_merge_equals_single_pass(self):
+        rng = np.random.default_rng(1)
+        data = rng.uniform(100, 5000, size=(100, 4))
+        tendance = rng.choice(["hausse", "baisse"], size=data.shape)
+        single = DailyQuantiles(4)
+        single.update(data, tendance)
+        merged = DailyQuantiles(4)
+        merged.update(data[:30], tendance[:30])
+        other = DailyQuantiles(4)
+        other.update(data[30:], tendance[30:])
+        merged.merge(other)
+        np.testing.assert_array_equal(single.counts, merged.counts)
+        np.testing.assert_array_equal(single.summary()["part_hausse"], merged.summary()["part_hausse"])
+        assert merged.n == 100
+
+    def test_negative_predictions_count_as_zero(self):
+        """Moyenne et quantiles décrivent la même distribution : les cas négatifs valent 0"""
+        data = np.array([[-500.0], [-100.0], [0.0], [100.0], [300.0]])
+        acc = DailyQuantiles(1)
+        acc.update(data, np.full(data.shape, "baisse"))
+        summary = acc.summary()
+        np.testing.assert_allclose(summary["mean"], [80.0])
+        # Trois valeurs sur cinq dans la première classe [0, 1) : médiane comprise
+        assert 0.0 <= summary["p5"][0] <= summary["p50"][0] < 1.0
+        assert acc.counts[0, 0] == 0  # aucune valeur sous la première borne
+
+    def test_outstanding_futures_are_bounded(self, monkeypatch):
+        """Au plus 2 blocs par worker en vol ; un bloc fusionné n'est plus référencé"""
+        alive = []
+        futures = []
+
+        class Executor(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                future = super().submit(fn, *args)
+                futures.append(weakref.ref(future))
+                alive.append(sum(ref() is not None for ref in futures))
+                return future
+
+        def run_chunk(params, dates, n_traj, seed_seq):
+            acc = DailyQuantiles(len(dates))
+            acc.update(np.full((n_traj, len(dates)), 100.0), np.full((n_traj, len(dates)), "stable"))
+            return acc
+
+        monkeypatch.setattr(montecarlo, "ProcessPoolExecutor", Executor)
+        monkeypatch.setattr(montecarlo, "_init_worker", lambda *args: None)
+        monkeypatch.setattr(montecarlo, "_run_chunk", run_chunk)
+        dates = scenario_dates(horizon=3)
+        results = run_monte_carlo({"relachement": {}}, dates, 400, MODEL_DIR, "canada", workers=2, chunk=4)
+        assert len(futures) == 100
+        assert max(alive) <= 2 * 2 + 1
+        assert results["relachement"].n == 400
+
+    def test_chunk_sizes(self):
+        assert chunk_sizes(600, 256) == [256, 256, 88]
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(MODEL_DIR, "model_xgboost_covid.pkl")), reason="modèles absents")
+def test_result_independent_of_workers():
+    """La graine par bloc rend le résultat identique quel que soit le nombre de workers"""
+    scenarios = {"relachement": SCENARIOS["relachement"]}
+    dates = scenario_dates(horizon=5)
+    runs = [
+        run_monte_carlo(scenarios, dates, 40, MODEL_DIR, "canada", seed=9, workers=workers, chunk=16)
+        for workers in (1, 2)
+    ]
+    np.testing.assert_array_equal(runs[0]["relachement"].counts, runs[1]["relachement"].counts)
+    records = to_records(dates, runs[0]["relachement"].summary())
+    assert len(records) == 5 and {"date", "p5", "p50", "p95", "mean"} <= set(records[0])
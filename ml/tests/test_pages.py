@@ -0,0 +1,61 @@
+import sys
+import os
+import gzip
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.templating import Jinja2Templates
+
+from features import FEATURES_ALL
+from pages import PageRenderer, accepted_encoding
+
+CONTEXTS = [
+    {},
+    {"prediction": None, "error": "<b>colonne manquante</b>"},
+    {"prediction": "1234 cas / Tendance épidémique : hausse", "type": "all"},
+    {"prediction": 1234.0, "type": "cas"},
+]
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    return PageRenderer(compression=("gzip",))
+
+
+class TestPageRenderer:
+    """Les pages assemblées doivent être identiques au rendu Jinja de la page entière"""
+
+    @pytest.mark.parametrize("context", CONTEXTS)
+    def test_same_html_as_full_render(self, renderer, context):
+        template = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "..", "templates"))
+        expected = template.get_template("template.html").render(dict(context, fields=FEATURES_ALL)).encode("utf-8")
+        assert renderer.render_result(**context) == expected
+
+    def test_form_is_pre_rendered(self, renderer):
+        layout = renderer.layout()
+        assert layout.form == renderer.render_result()
+        assert gzip.decompress(layout.form_encoded["gzip"]) == layout.form
+
+    def test_form_fields_follow_schema(self, renderer):
+        """Seuls les champs demandés sont proposés ; une feature sans champ dédié reçoit un champ numérique"""
+        fields = ["lag_1", "month", "hospital_beds"]
+        layout = renderer.layout(fields)
+        assert layout is renderer.layout(fields)
+        assert layout.etag != renderer.layout().etag
+        for name in fields:
+            assert f'name="{name}"'.encode() in layout.form
+        assert b'name="lag_2"' not in layout.form
+        assert b'name="new_cases_lag1"' not in layout.form
+
+    def test_error_is_escaped(self, renderer):
+        assert b"&lt;b&gt;colonne manquante&lt;/b&gt;" in renderer.render_result(error="<b>colonne manquante</b>")
+
+
+class TestAcceptEncoding:
+    def test_negotiation(self):
+        assert accepted_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+        assert accepted_encoding("gzip;q=0.5", ("br", "gzip")) == "gzip"
+        assert accepted_encoding("gzip;q=0, identity", ("gzip",)) is None
+        assert accepted_encoding("", ("gzip",)) is None
+        assert accepted_encoding("*", ("gzip",)) == "gzip"
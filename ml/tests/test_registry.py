@@ -0,0 +1,298 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import registry
+from registry import ModelRegistry, ModelWatcher, UnknownCountry
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Dossier de modèles : fichiers par défaut + copie identique pour le Canada + modèles suisses différents"""
+    for name, content in [
+        ("model_xgboost_covid.pkl", b"cas-defaut"),
+        ("modele_tendance_covid_rf.pkl", b"tendance-defaut"),
+        ("model_xgboost_covid_canada.pkl", b"cas-defaut"),
+        ("modele_tendance_covid_rf_canada.pkl", b"tendance-defaut"),
+        ("model_xgboost_covid_suisse.pkl", b"cas-suisse" * 10),
+        ("modele_tendance_covid_rf_suisse.pkl", b"tendance-suisse" * 10),
+    ]:
+        (tmp_path / name).write_bytes(content)
+    return tmp_path
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Remplace joblib.load : chaque chargement renvoie un nouvel objet et est comptabilisé"""
+    calls = []
+
+    def fake_load(path):
+        calls.append(os.path.basename(path))
+        return object()
+
+    monkeypatch.setattr(registry.joblib, "load", fake_load)
+    return calls
+
+
+class TestModelRegistry:
+    """Tests du registre multi-pays"""
+
+    def test_lazy_loading(self, model_dir, loads):
+        """Aucun modèle n'est chargé avant le premier appel"""
+        reg = ModelRegistry(str(model_dir))
+        assert loads == []
+        reg.get("suisse")
+        assert loads == ["model_xgboost_covid_suisse.pkl", "modele_tendance_covid_rf_suisse.pkl"]
+        reg.get("suisse")
+        assert len(loads) == 2
+
+    def test_identical_files_are_shared(self, model_dir, loads):
+        """Le Canada et les pays en repli partagent les mêmes objets"""
+        reg = ModelRegistry(str(model_dir))
+        canada = reg.get("canada")
+        france = reg.get("france")
+        assert canada.model_cas is france.model_cas
+        assert canada.model_tendance is france.model_tendance
+        assert len(loads) == 2
+
+    def test_lru_eviction(self, model_dir, loads):
+        """Au-delà du plafond mémoire, le pays le moins récemment utilisé est retiré"""
+        reg = ModelRegistry(str(model_dir), max_bytes=260)
+        reg.get("canada")
+        reg.get("suisse")
+        assert reg.loaded_countries() == ["suisse"]
+        assert reg.loaded_bytes == 250
+
+    def test_shared_artifacts_counted_once(self, model_dir, loads):
+        """Des pays qui partagent leurs modèles ne comptent qu'une fois dans le plafond"""
+        reg = ModelRegistry(str(model_dir), max_bytes=30)
+        reg.get("canada")
+        reg.get("france")
+        reg.get("usa")
+        assert reg.loaded_countries() == ["canada", "france", "usa"]
+        assert reg.loaded_bytes == 25
+
+    def test_numpy_backend_keeps_unsupported_models(self, model_dir, loads):
+        """Un modèle que l'évaluateur NumPy ne sait pas aplatir reste servi tel quel"""
+        reg = ModelRegistry(str(model_dir), backend="auto")
+        assert type(reg.get("canada").model_cas) is object
+
+    def test_loading_does_not_block_peek(self, model_dir, monkeypatch):
+        """Pendant la lecture des fichiers d'un pays, peek et les autres pays répondent sans attendre"""
+        release = threading.Event()
+
+        def slow_load(path):
+            if "suisse" in path:
+                release.wait(5)
+            return object()
+
+        monkeypatch.setattr(registry.joblib, "load", slow_load)
+        reg = ModelRegistry(str(model_dir))
+        canada = reg.get("canada")
+        loader = threading.Thread(target=reg.get, args=("suisse",))
+        loader.start()
+        try:
+            started = time.perf_counter()
+            assert reg.peek("suisse") is None
+            assert reg.peek("canada") is canada
+            assert reg.get("france").model_cas is canada.model_cas
+            assert time.perf_counter() - started < 1
+        finally:
+            release.set()
+            loader.join()
+        assert reg.peek("suisse") is not None
+
+    def test_concurrent_gets_load_once(self, model_dir, loads):
+        """Deux appels simultanés pour le même pays ne lisent ses fichiers qu'une fois"""
+        reg = ModelRegistry(str(model_dir))
+        threads = [threading.Thread(target=reg.get, args=("suisse",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(loads) == 2
+
+    def test_unknown_backend(self, model_dir):
+        with pytest.raises(ValueError):
+            ModelRegistry(str(model_dir), backend="gpu")
+
+    def test_unknown_country(self, model_dir, loads):
+        """Un pays hors de la liste est refusé sans lire de fichier"""
+        reg = ModelRegistry(str(model_dir))
+        with pytest.raises(UnknownCountry):
+            reg.get("../etc")
+        assert loads == []
+
+
+class TestHotReload:
+    """Tests du rechargement à chaud"""
+
+    def test_reload_swaps_changed_models(self, model_dir, loads):
+        """Un fichier modifié est rechargé, l'ancien objet reste valide pour les requêtes en cours"""
+        reg = ModelRegistry(str(model_dir))
+        before = reg.get("suisse")
+        (model_dir / "model_xgboost_covid_suisse.pkl").write_bytes(b"cas-suisse-v2")
+        assert reg.reload() == {"suisse": True}
+        after = reg.get("suisse")
+        assert after.model_cas is not before.model_cas
+        assert after.model_tendance is before.model_tendance
+        assert loads[-1] == "model_xgboost_covid_suisse.pkl"
+        assert before.model_cas is not None
+
+    def test_reload_without_change(self, model_dir, loads):
+        """Sans modification, aucun fichier n'est relu"""
+        reg = ModelRegistry(str(model_dir))
+        reg.get("canada")
+        assert reg.reload() == {"canada": False}
+        assert len(loads) == 2
+
+    def test_failed_reload_keeps_models(self, model_dir, loads, monkeypatch):
+        """Un fichier illisible laisse les modèles actuels en service"""
+        reg = ModelRegistry(str(model_dir))
+        before = reg.get("suisse")
+        (model_dir / "model_xgboost_covid_suisse.pkl").write_bytes(b"corrompu")
+
+        def broken_load(path):
+            raise EOFError("fichier tronqué")
+
+        monkeypatch.setattr(registry.joblib, "load", broken_load)
+        with pytest.raises(EOFError):
+            reg.reload()
+        assert reg.get("suisse") is before
+
+    def test_failed_reload_swaps_nothing(self, model_dir, loads, monkeypatch):
+        """Si le schéma d'un pays est refusé, aucun pays n'est échangé"""
+        reg = ModelRegistry(str(model_dir))
+        canada, suisse = reg.get("canada"), reg.get("suisse")
+        (model_dir / "model_xgboost_covid_canada.pkl").write_bytes(b"cas-canada-v2")
+        (model_dir / "model_xgboost_covid_suisse.pkl").write_bytes(b"cas-suisse-v2")
+
+        def schema_for(country, model_cas, model_tendance):
+            if country == "suisse":
+                raise ValueError("features décalées")
+            return None
+
+        monkeypatch.setattr(reg, "schema_for", schema_for)
+        with pytest.raises(ValueError):
+            reg.reload()
+        assert reg.get("canada") is canada
+        assert reg.get("suisse") is suisse
+        assert reg.loaded_bytes == canada.size + suisse.size
+
+    def test_warm_up_before_swap(self, model_dir, monkeypatch):
+        """Les nouveaux modèles reçoivent un predict factice avant d'être servis"""
+        calls = []
+
+        class Model:
+            n_features_in_ = 10
+
+            def predict(self, X):
+                calls.append(X.shape)
+                return [0] * len(X)
+
+        monkeypatch.setattr(registry.joblib, "load", lambda path: Model())
+        reg = ModelRegistry(str(model_dir))
+        reg.get("suisse")
+        (model_dir / "modele_tendance_covid_rf_suisse.pkl").write_bytes(b"tendance-v2")
+        reg.reload(["suisse"])
+        assert calls == [(1, 10)]
+
+    def test_preload_warms_every_model(self, model_dir, monkeypatch):
+        """Le préchauffage charge les pays demandés et fait un predict sur chaque modèle"""
+        calls = []
+
+        class Model:
+            n_features_in_ = 10
+
+            def predict(self, X):
+                calls.append(X.shape)
+                return [0] * len(X)
+
+        monkeypatch.setattr(registry.joblib, "load", lambda path: Model())
+        reg = ModelRegistry(str(model_dir))
+        durations = reg.preload(["canada", "suisse"])
+        assert set(durations) == {"canada", "suisse"}
+        assert reg.loaded_countries() == ["canada", "suisse"]
+        assert calls == [(1, 10)] * 4
+
+    def test_watcher_reloads_after_change(self, model_dir, loads):
+        """Le mode surveillance recharge les modèles quand un fichier change"""
+        reg = ModelRegistry(str(model_dir))
+        before = reg.get("suisse")
+        watcher = ModelWatcher(reg, interval=0.01)
+        watcher.start()
+        try:
+            (model_dir / "model_xgboost_covid_suisse.pkl").write_bytes(b"cas-suisse-v3")
+            deadline = time.time() + 5
+            while reg.get("suisse") is before and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+        assert reg.get("suisse").model_cas is not before.model_cas
+
+
+class TestFeatureSchema:
+    """Tests du schéma des features construit à partir de model_features*.pkl et des modèles"""
+
+    @pytest.fixture
+    def named_models(self, model_dir, monkeypatch):
+        """joblib.load : listes de features lues dans `listed`, modèles avec feature_names_in_"""
+        listed = {}
+
+        class Model:
+            def __init__(self, names):
+                self.feature_names_in_ = names
+
+        def fake_load(path):
+            name = os.path.basename(path)
+            if name.startswith("model_features"):
+                return listed[name]
+            if "tendance" in name:
+                return Model(["lag_1", "month"])
+            return Model(["month", "lag_7", "lag_1"])
+
+        monkeypatch.setattr(registry.joblib, "load", fake_load)
+        return listed
+
+    def test_order_from_artifact_and_models(self, model_dir, named_models):
+        named_models["model_features_suisse.pkl"] = ["month", "lag_7", "lag_1"]
+        (model_dir / "model_features_suisse.pkl").write_bytes(b"features")
+        schema = ModelRegistry(str(model_dir)).get("suisse").schema
+        assert schema.cas == ["month", "lag_7", "lag_1"]
+        assert schema.tendance == ["lag_1", "month"]
+        assert schema.inputs == ["month", "lag_7", "lag_1"]
+
+    def test_legacy_order_without_metadata(self, model_dir, loads):
+        from features import FEATURES_CAS, FEATURES_TENDANCE
+
+        schema = ModelRegistry(str(model_dir)).get("suisse").schema
+        assert (schema.cas, schema.tendance) == (FEATURES_CAS, FEATURES_TENDANCE)
+
+    def test_mismatch_refuses_to_serve(self, model_dir, named_models):
+        """Une liste de features qui contredit le modèle empêche le chargement"""
+        named_models["model_features_suisse.pkl"] = ["lag_1", "lag_7", "month"]
+        (model_dir / "model_features_suisse.pkl").write_bytes(b"features")
+        reg = ModelRegistry(str(model_dir))
+        with pytest.raises(ValueError, match="model_features_suisse.pkl"):
+            reg.get("suisse")
+        assert reg.loaded_countries() == [] and reg.loaded_bytes == 0
+
+    def test_reload_after_metadata_change(self, model_dir, monkeypatch):
+        listed = {"model_features_suisse.pkl": ["a", "b"]}
+
+        def fake_load(path):
+            name = os.path.basename(path)
+            return listed[name] if name in listed else object()
+
+        monkeypatch.setattr(registry.joblib, "load", fake_load)
+        (model_dir / "model_features_suisse.pkl").write_bytes(b"v1")
+        reg = ModelRegistry(str(model_dir))
+        assert reg.get("suisse").schema.cas == ["a", "b"]
+        listed["model_features_suisse.pkl"] = ["b", "a"]
+        (model_dir / "model_features_suisse.pkl").write_bytes(b"v2")
+        assert reg.reload() == {"suisse": True}
+        assert reg.get("suisse").schema.cas == ["b", "a"]
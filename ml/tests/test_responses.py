@@ -0,0 +1,47 @@
+import sys
+import os
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import responses
+from responses import dumps, ndjson_chunks, prediction_columns, prediction_rows
+
+
+class TestSerialization:
+    """Tests de la sérialisation des prédictions"""
+
+    def test_columns_keep_numpy_until_dumps(self):
+        content = prediction_columns(np.array([1.234, 5.0], dtype=np.float32), np.array(["hausse", "baisse"]))
+        assert isinstance(content["cas"], np.ndarray)
+        assert json.loads(dumps(content)) == {"count": 2, "cas": [1.23, 5.0], "tendance": ["hausse", "baisse"]}
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """Sans orjson, le module json donne le même document"""
+        content = prediction_columns(np.array([1.234, 5.0]), np.array(["hausse", "baisse"], dtype=object),
+                                     dates=np.array(["2025-01-01", "2025-01-02"], dtype="datetime64[D]"))
+        expected = json.loads(dumps(content))
+        monkeypatch.setattr(responses, "orjson", None)
+        assert json.loads(dumps(content)) == expected
+        assert expected["date"] == ["2025-01-01", "2025-01-02"]
+
+    def test_ndjson_chunks(self):
+        pred_cas = np.arange(5, dtype=float)
+        pred_tendance = np.array(["stable"] * 5)
+        chunks = list(ndjson_chunks(pred_cas, pred_tendance, chunk_rows=2))
+        assert len(chunks) == 3
+        lines = b"".join(chunks).decode().splitlines()
+        assert [json.loads(line) for line in lines] == prediction_rows(pred_cas, pred_tendance)
+
+    def test_rejected_rows_are_null(self, monkeypatch):
+        """Les lignes refusées valent null, avec orjson comme avec le module json"""
+        pred_cas = np.array([1.0, np.nan])
+        pred_tendance = np.array(["hausse", None], dtype=object)
+        content = prediction_columns(pred_cas, pred_tendance)
+        assert json.loads(dumps(content))["cas"] == [1.0, None]
+        monkeypatch.setattr(responses, "orjson", None)
+        assert json.loads(dumps(content)) == {"count": 2, "cas": [1.0, None], "tendance": ["hausse", None]}
+        assert prediction_rows(pred_cas, pred_tendance)[1] == {
+            "prediction_nouveaux_cas": None, "prediction_tendance": None
+        }
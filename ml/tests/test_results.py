@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import results
+from results import ResultWriter, SummaryAccumulator, columnar, summarize
+
+DATES = np.datetime64("2025-01-01") + np.arange(40)
+CAS = np.arange(40, dtype=float) * 10
+TENDANCE = np.where(np.arange(40) % 3 == 0, "hausse", "baisse")
+
+
+class TestResultWriter:
+    """Tests de l'écriture des résultats de simulation"""
+
+    def test_journal_written_before_close(self, tmp_path):
+        """Chaque lot est dans le journal dès son écriture"""
+        writer = ResultWriter(tmp_path, "test")
+        writer.write(DATES[:10], CAS[:10], TENDANCE[:10])
+        lines = (tmp_path / "predictions_test.ndjson").read_text().splitlines()
+        assert len(lines) == 10
+        assert json.loads(lines[0]) == {"prediction_nouveaux_cas": 0.0, "prediction_tendance": "hausse", "date": "2025-01-01"}
+        assert not (tmp_path / "predictions_test.json").exists()
+        writer.close()
+
+    def test_final_files(self, tmp_path):
+        """Lots dans le désordre : fichiers finaux identiques à un calcul sur toutes les lignes triées"""
+        with ResultWriter(tmp_path, "test") as writer:
+            writer.write(DATES[20:], CAS[20:], TENDANCE[20:])
+            writer.write(DATES[:20], CAS[:20], TENDANCE[:20])
+        columns = json.loads((tmp_path / "predictions_test.columns.json").read_text())
+        assert columns == columnar(DATES, CAS, TENDANCE)
+        assert columns["prediction_tendance"]["categories"] == ["baisse", "hausse"]
+        assert columns["prediction_tendance"]["codes"][:3] == [1, 0, 0]
+        assert json.loads((tmp_path / "summary_test.json").read_text()) == summarize(DATES, CAS, TENDANCE)
+        # Liste de lignes lue par le frontend (Visualisations.jsx), écrite par défaut
+        rows = json.loads((tmp_path / "predictions_test.json").read_text())
+        assert [r["date"] for r in rows] == DATES.astype(str).tolist()
+        assert sorted(os.listdir(tmp_path)) == [
+            "predictions_test.columns.json", "predictions_test.json", "predictions_test.ndjson", "summary_test.json",
+        ]
+
+    def test_rows_in_chunks(self, tmp_path, monkeypatch):
+        """Le format rows est écrit par tranches, trié par date, avec le contenu du journal"""
+        monkeypatch.setattr(results, "CHUNK_ROWS", 7)
+        with ResultWriter(tmp_path, "test", ["ndjson", "rows"]) as writer:
+            writer.write(DATES[20:], CAS[20:], TENDANCE[20:])
+            writer.write(DATES[:20], CAS[:20], TENDANCE[:20])
+        rows = json.loads((tmp_path / "predictions_test.json").read_text())
+        journal = [json.loads(line) for line in (tmp_path / "predictions_test.ndjson").read_text().splitlines()]
+        assert rows == sorted(journal, key=lambda r: r["date"])
+        assert [r["date"] for r in rows][:2] == ["2025-01-01", "2025-01-02"]
+
+    def test_batches_are_not_kept(self, tmp_path):
+        """Aucun lot n'est gardé en mémoire entre deux appels à write"""
+        with ResultWriter(tmp_path, "test") as writer:
+            writer.write(DATES, CAS, TENDANCE)
+            assert not any(isinstance(v, (list, np.ndarray)) and len(v) for v in vars(writer).values())
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            ResultWriter(tmp_path, "test", ["xml"])
+
+
+def test_summary_periods():
+    summary = summarize(DATES, CAS, TENDANCE)
+    # Le 1er janvier 2025 est un mercredi : première semaine du lundi 30 décembre, 5 jours
+    assert summary["weekly"][0]["period"] == "2024-12-30" and summary["weekly"][0]["days"] == 5
+    january = summary["monthly"][0]
+    assert january["period"] == "2025-01" and january["days"] == 31
+    assert january["mean"] == pytest.approx(CAS[:31].mean())
+    assert january["max"] == 300.0
+    assert january["tendance"] == {"hausse": 11, "baisse": 20}
+
+
+def test_summary_accumulator_matches_summarize():
+    """Les résumés cumulés lot par lot, dans le désordre, sont ceux d'un seul calcul"""
+    accumulator = SummaryAccumulator()
+    for part in (slice(30, 40), slice(0, 13), slice(13, 30)):
+        accumulator.add(DATES[part], CAS[part], TENDANCE[part])
+    assert accumulator.summary() == summarize(DATES, CAS, TENDANCE)
+
+
+def test_columnar_roundtrip():
+    columns = columnar(DATES, CAS, TENDANCE)
+    categories = columns["prediction_tendance"]["categories"]
+    decoded = [categories[c] for c in columns["prediction_tendance"]["codes"]]
+    assert decoded == TENDANCE.tolist()
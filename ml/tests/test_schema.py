@@ -0,0 +1,129 @@
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from features import DEFAULT_SCHEMA, FEATURES_ALL, FEATURES_CAS, FEATURES_TENDANCE, predict_valid_rows
+from schema import FeatureSchema, select_rows
+
+
+def valid_columns(n):
+    columns = {f: np.full(n, 10.0) for f in FEATURES_ALL}
+    columns.update(month=np.full(n, 6.0), day_of_week=np.full(n, 2.0), reproduction_rate=np.full(n, 1.0))
+    return columns
+
+
+class FakeModel:
+    def __init__(self, value):
+        self.value = value
+        self.rows = []
+
+    def predict(self, X):
+        self.rows.append(len(X))
+        return [self.value] * len(X)
+
+
+class FakePair:
+    def __init__(self, schema=DEFAULT_SCHEMA):
+        self.model_cas = FakeModel(1234.0)
+        self.model_tendance = FakeModel("hausse")
+        self.schema = schema
+
+
+class TestFeatureSchema:
+    """Tests de l'ordre des features et de la validation vectorisée"""
+
+    def test_inputs_union_in_order(self):
+        schema = FeatureSchema(["b", "a"], ["a", "c"])
+        assert schema.inputs == ["b", "a", "c"]
+        assert DEFAULT_SCHEMA.inputs == FEATURES_ALL
+
+    def test_matrices_follow_each_model_order(self):
+        schema = FeatureSchema(["b", "a"], ["a", "c"])
+        columns = {"a": np.array([1.0, 2.0]), "b": np.array([3.0, 4.0]), "c": np.array([5.0, 6.0])}
+        X_cas, X_tendance = schema.matrices(columns)
+        assert X_cas.tolist() == [[3.0, 1.0], [4.0, 2.0]]
+        assert X_tendance.tolist() == [[1.0, 5.0], [2.0, 6.0]]
+
+    def test_valid_batch(self):
+        validation = DEFAULT_SCHEMA.validate(valid_columns(100))
+        assert validation.all_valid
+        assert validation.valid.all()
+
+    def test_rejects_rows_individually(self):
+        columns = valid_columns(5)
+        columns["month"][1] = 13
+        columns["lag_1"][3] = -1
+        columns["day_of_week"][3] = 2.5
+        validation = DEFAULT_SCHEMA.validate(columns)
+        assert validation.valid.tolist() == [True, False, True, False, True]
+        assert [r["index"] for r in validation.rejected] == [1, 3]
+        assert validation.rejected[0]["errors"] == ["month : 13 hors de [1, 12]"]
+        assert len(validation.rejected[1]["errors"]) == 2
+
+    def test_missing_values(self):
+        """NaN accepté pour les colonnes facultatives, refusé pour les features calculées ; inf toujours refusé"""
+        columns = valid_columns(3)
+        columns["icu_patients"][0] = np.nan
+        columns["new_cases_7d_avg"][1] = np.nan
+        columns["stringency_index"][2] = np.inf
+        validation = DEFAULT_SCHEMA.validate(columns)
+        assert validation.valid.tolist() == [True, False, False]
+        assert validation.rejected[0]["errors"] == ["new_cases_7d_avg : valeur manquante"]
+        assert validation.rejected[1]["errors"] == ["stringency_index : valeur infinie"]
+
+    def test_unknown_feature_only_rejects_infinite(self):
+        schema = FeatureSchema(["x"], [])
+        validation = schema.validate({"x": np.array([-5.0, np.nan, -np.inf])})
+        assert validation.valid.tolist() == [True, True, False]
+
+    def test_validate_subset(self):
+        columns = valid_columns(1)
+        columns["month"][0] = 0
+        assert DEFAULT_SCHEMA.validate(columns, FEATURES_CAS).all_valid
+        assert not DEFAULT_SCHEMA.validate(columns, FEATURES_TENDANCE).all_valid
+
+    def test_select_rows(self):
+        columns = {"a": np.arange(3.0), "b": np.arange(3.0) * 2}
+        selected = select_rows(columns, np.array([True, False, True]), ["b"])
+        assert list(selected) == ["b"]
+        assert selected["b"].tolist() == [0.0, 4.0]
+
+
+class TestPredictValidRows:
+    """Tests de la prédiction d'un lot partiellement invalide"""
+
+    def test_only_valid_rows_are_predicted(self):
+        pair = FakePair()
+        columns = valid_columns(4)
+        columns["lag_7"][2] = -3
+        pred_cas, pred_tendance, rejected = predict_valid_rows(pair, columns)
+        assert pair.model_cas.rows == [3]
+        assert np.isnan(pred_cas[2]) and pred_tendance[2] is None
+        assert pred_cas[[0, 1, 3]].tolist() == [1234.0] * 3
+        assert [r["index"] for r in rejected] == [2]
+
+    def test_all_rows_rejected(self):
+        pair = FakePair()
+        columns = valid_columns(2)
+        columns["month"][:] = 0
+        pred_cas, pred_tendance, rejected = predict_valid_rows(pair, columns)
+        assert pair.model_cas.rows == []
+        assert np.isnan(pred_cas).all() and len(rejected) == 2
+
+    def test_schema_order_reaches_the_model(self):
+        """Le modèle des cas reçoit ses colonnes dans l'ordre de son schéma"""
+        received = []
+
+        class RecordingModel(FakeModel):
+            def predict(self, X):
+                received.append(X.copy())
+                return super().predict(X)
+
+        pair = FakePair(FeatureSchema(["month", "lag_1"], FEATURES_TENDANCE))
+        pair.model_cas = RecordingModel(1.0)
+        columns = valid_columns(1)
+        columns["lag_1"][0] = 42
+        predict_valid_rows(pair, columns)
+        assert received[0].tolist() == [[6.0, 42.0]]
@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import simulation
+from features import FEATURES_ALL
+from simulation import SCENARIOS, generate_inputs, run_scenarios, scenario_dates
+
+
+class CountingPredictor:
+    """Prédicteur factice : compte les appels et renvoie new_cases_lag1 comme prédiction"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, columns):
+        self.calls.append(len(columns["lag_1"]))
+        return columns["new_cases_lag1"], np.full(len(columns["lag_1"]), "stable")
+
+
+class TestSimulation:
+    """Tests du moteur de simulation"""
+
+    def test_one_predict_per_scenario(self):
+        predictor = CountingPredictor()
+        results = run_scenarios(predictor, SCENARIOS, horizon=365, seed=1)
+        assert predictor.calls == [365, 365, 365]
+        dates, pred_cas, pred_tendance = results["relachement"]
+        assert str(dates[0]) == "2025-01-01" and str(dates[-1]) == "2025-12-31"
+        assert len(pred_cas) == len(pred_tendance) == 365
+
+    def test_seed_is_reproducible(self):
+        first = run_scenarios(CountingPredictor(), SCENARIOS, horizon=30, seed=7)
+        second = run_scenarios(CountingPredictor(), SCENARIOS, horizon=30, seed=7)
+        for name in SCENARIOS:
+            np.testing.assert_array_equal(first[name][1], second[name][1])
+        assert not np.array_equal(first["relachement"][1], first["fortes_mesures"][1])
+
+    def test_generated_inputs(self):
+        dates = scenario_dates(horizon=10)
+        columns = generate_inputs(SCENARIOS["fortes_mesures"], dates, np.random.default_rng(0))
+        assert set(columns) == set(FEATURES_ALL)
+        assert all(len(c) == 10 for c in columns.values())
+        assert (columns["stringency_index"] == 90).all()
+        assert columns["day_of_week"][0] == 2  # 1er janvier 2025 : mercredi
+        assert (columns["new_cases_lag1"] >= 0).all()
+
+    def test_main_writes_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(simulation, "LocalPredictor", lambda *args: CountingPredictor())
+        simulation.main(["--scenarios", "relachement", "--horizon", "5", "--seed", "3", "--output-dir", str(tmp_path)])
+        # Fichier chargé par le frontend (Visualisations.jsx : predictions_${scenario}.json)
+        records = json.loads((tmp_path / "predictions_relachement.json").read_text())
+        assert len(records) == 5
+        assert set(records[0]) == {"prediction_nouveaux_cas", "prediction_tendance", "date"}
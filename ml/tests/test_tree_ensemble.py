@@ -0,0 +1,101 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# joblib.load peut être remplacé par test_app.py : on garde la vraie fonction
+from joblib.numpy_pickle import load as joblib_load
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBRegressor
+
+from tree_ensemble import HybridModel, compile_model, load_arrays, save_arrays
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "model"))
+
+
+def random_inputs(n, seed=0):
+    """Entrées couvrant les ordres de grandeur des features des modèles (cas, taux, mois, population)"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 200000, n), rng.uniform(0, 300, n), rng.uniform(0, 200000, n),
+        rng.uniform(0, 200000, n), rng.uniform(0, 200000, n), rng.integers(1, 13, n),
+        rng.integers(0, 7, n), rng.uniform(0.5, 2, n), rng.uniform(0, 3e7, n), rng.uniform(0, 100, n),
+    ])
+
+
+@pytest.fixture(scope="module")
+def trained_models():
+    """Petits modèles entraînés sur des données synthétiques, avec quelques valeurs manquantes"""
+    X = random_inputs(500, seed=1)
+    X[::11, 2] = np.nan
+    y = X[:, 0] * 0.5 + X[:, 7] * 1000 + np.nan_to_num(X[:, 2]) * 0.1
+    labels = np.where(X[:, 7] > 1.4, "hausse", np.where(X[:, 7] < 0.9, "baisse", "stable"))
+    rf = RandomForestClassifier(n_estimators=30, max_depth=6, random_state=0).fit(X, labels)
+    xgb = XGBRegressor(n_estimators=40, max_depth=4, learning_rate=0.2).fit(X, y)
+    return rf, xgb
+
+
+class TestCompiledModels:
+    """L'évaluateur NumPy doit reproduire exactement les prédictions des bibliothèques"""
+
+    def test_random_forest_exact(self, trained_models):
+        rf, _ = trained_models
+        compiled = compile_model(rf)
+        X = random_inputs(3000)
+        assert np.array_equal(compiled.predict_proba(X), rf.predict_proba(X))
+        assert np.array_equal(compiled.predict(X), rf.predict(X))
+
+    def test_xgboost_exact(self, trained_models):
+        _, xgb = trained_models
+        compiled = compile_model(xgb)
+        X = random_inputs(3000)
+        assert np.array_equal(compiled.predict(X), xgb.predict(X))
+
+    def test_missing_values_follow_library(self, trained_models):
+        """Les valeurs manquantes suivent la même branche que dans la bibliothèque"""
+        rf, xgb = trained_models
+        X = random_inputs(1000)
+        X[::3, 2] = np.nan
+        X[::5, 0] = np.nan
+        assert np.array_equal(compile_model(rf).predict_proba(X), rf.predict_proba(X))
+        assert np.array_equal(compile_model(xgb).predict(X), xgb.predict(X))
+
+    def test_single_row(self, trained_models):
+        rf, xgb = trained_models
+        X = random_inputs(1)
+        assert compile_model(rf).predict(X)[0] == rf.predict(X)[0]
+        assert compile_model(xgb).predict(X)[0] == xgb.predict(X)[0]
+
+    def test_save_and_load_arrays_memory_mapped(self, trained_models, tmp_path):
+        """Dossier .npy projeté en mémoire : mêmes prédictions, tableaux en lecture seule"""
+        rf, xgb = trained_models
+        X = random_inputs(200)
+        X[::7, 2] = np.nan
+        for model in (rf, xgb):
+            path = tmp_path / type(model).__name__
+            save_arrays(compile_model(model), path)
+            loaded = load_arrays(path)
+            assert isinstance(loaded.values, np.memmap)
+            assert not loaded.threshold.flags.writeable
+            assert np.array_equal(loaded.predict(X), model.predict(X))
+
+    def test_hybrid_switches_on_batch_size(self, trained_models):
+        """HybridModel donne le même résultat des deux côtés du seuil"""
+        _, xgb = trained_models
+        hybrid = HybridModel(xgb, compile_model(xgb))
+        for n in (1, hybrid.compiled.crossover_rows + 1):
+            X = random_inputs(n)
+            assert np.array_equal(hybrid.predict(X), xgb.predict(X))
+
+    def test_unsupported_model(self):
+        with pytest.raises(TypeError):
+            compile_model(object())
+
+    @pytest.mark.parametrize("name", ["model_xgboost_covid_canada.pkl", "modele_tendance_covid_rf_canada.pkl"])
+    def test_project_artifacts_exact(self, name):
+        """Les modèles du projet (ml/model) donnent exactement les mêmes prédictions"""
+        model = joblib_load(os.path.join(MODEL_DIR, name))
+        X = random_inputs(5000)
+        assert np.array_equal(compile_model(model).predict(X), model.predict(X))
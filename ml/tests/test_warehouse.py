@@ -0,0 +1,131 @@
+import sys
+import os
+import asyncio
+import datetime
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from warehouse import (
+    AGGREGATE_COLUMNS, QueryError, Warehouse, WarehouseUnavailable,
+    build_query, decode_cursor, encode_cursor, page, select_columns,
+)
+
+
+def aggregate_row(iso_code, day, new_cases=10.0):
+    return {"iso_code": iso_code, "period_start": datetime.date(2021, 3, day), "new_cases": new_cases, "days": 7}
+
+
+class FakePool:
+    """Remplace le pool asyncpg : enregistre les requêtes et renvoie des lignes fixes."""
+
+    def __init__(self, rows, error=None):
+        self.rows = rows
+        self.error = error
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+
+def warehouse_with(rows, page_max=5000):
+    warehouse = Warehouse("postgresql://test", page_max=page_max)
+    warehouse._pool = FakePool(rows)
+    return warehouse
+
+
+class TestQuery:
+    """Tests de la construction des requêtes de l'entrepôt"""
+
+    def test_select_columns(self):
+        assert select_columns("new_cases, iso_code,new_cases") == ["iso_code", "period_start", "new_cases"]
+        assert select_columns(None) == ["iso_code", "period_start"] + list(AGGREGATE_COLUMNS)
+
+    def test_unknown_column_is_rejected(self):
+        with pytest.raises(QueryError, match="population; DROP"):
+            select_columns("new_cases,population; DROP")
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor("FRA", datetime.date(2021, 3, 1))
+        assert cursor == "FRA:2021-03-01"
+        assert decode_cursor(cursor) == ("FRA", datetime.date(2021, 3, 1))
+        with pytest.raises(QueryError):
+            decode_cursor("FRA")
+
+    def test_first_page(self):
+        query, args = build_query("week", ["iso_code", "period_start"], limit=100)
+        assert query == (
+            "SELECT iso_code, period_start FROM gold.mv_country_period"
+            " WHERE granularity = $1 ORDER BY iso_code, period_start LIMIT $2"
+        )
+        assert args == ["week", 101]
+
+    def test_unknown_granularity(self):
+        """Seules les granularités de gold.mv_country_period donnent une requête"""
+        for granularity in ("day", "WEEK", "week' OR '1'='1", None):
+            with pytest.raises(QueryError, match="Granularité"):
+                build_query(granularity, ["iso_code", "period_start"])
+
+    def test_filters_and_keyset(self):
+        after = ("FRA", datetime.date(2021, 3, 1))
+        query, args = build_query(
+            "month", ["iso_code", "period_start"], countries=["FRA", "CAN"],
+            date_from=datetime.date(2021, 1, 1), after=after, limit=10,
+        )
+        assert "iso_code = ANY($2::text[])" in query
+        assert "period_start >= $3" in query
+        assert "(iso_code, period_start) > ($4, $5)" in query
+        assert "OFFSET" not in query
+        assert args == ["month", ["FRA", "CAN"], datetime.date(2021, 1, 1), "FRA", datetime.date(2021, 3, 1), 11]
+
+    def test_page(self):
+        rows = [aggregate_row("CAN", 1), aggregate_row("CAN", 8), aggregate_row("FRA", 1)]
+        content = page(rows, ["iso_code", "period_start", "new_cases"], limit=2)
+        assert content["rows"] == [["CAN", "2021-03-01", 10.0], ["CAN", "2021-03-08", 10.0]]
+        assert content["next"] == "CAN:2021-03-08"
+        assert page(rows, ["iso_code", "period_start"], limit=3)["next"] is None
+
+
+class TestWarehouse:
+    """Tests de la lecture paginée (pool simulé)"""
+
+    def test_pages_follow_the_cursor(self):
+        warehouse = warehouse_with([aggregate_row("CAN", 1), aggregate_row("CAN", 8)])
+        first = asyncio.run(warehouse.aggregates("week", "new_cases", limit=1))
+        assert first["next"] == "CAN:2021-03-01"
+        asyncio.run(warehouse.aggregates("week", "new_cases", after=first["next"], limit=1))
+        query, args = warehouse._pool.queries[-1]
+        assert "(iso_code, period_start) > ($2, $3)" in query
+        assert args[1:] == ("CAN", datetime.date(2021, 3, 1), 2)
+
+    def test_invalid_parameters(self):
+        warehouse = warehouse_with([], page_max=100)
+        with pytest.raises(QueryError, match="Granularité"):
+            asyncio.run(warehouse.aggregates("day"))
+        with pytest.raises(QueryError, match="limit"):
+            asyncio.run(warehouse.aggregates("week", limit=101))
+        assert warehouse._pool.queries == []
+
+    def test_not_configured(self):
+        with pytest.raises(WarehouseUnavailable, match="WAREHOUSE_DATABASE_URL"):
+            asyncio.run(Warehouse("").aggregates("week"))
+
+    def test_timeout_is_unavailable(self):
+        warehouse = warehouse_with([])
+        warehouse._pool.error = asyncio.TimeoutError()
+        with pytest.raises(WarehouseUnavailable):
+            asyncio.run(warehouse.aggregates("week"))
+
+    def test_postgres_error_is_unavailable(self):
+        """Vue absente ou requête annulée par command_timeout : 503, pas 500"""
+        asyncpg = pytest.importorskip("asyncpg")
+        warehouse = warehouse_with([])
+        warehouse._pool.error = asyncpg.exceptions.UndefinedTableError('relation "gold.mv_country_period" does not exist')
+        with pytest.raises(WarehouseUnavailable, match="mv_country_period"):
+            asyncio.run(warehouse.aggregates("week"))
+        warehouse._pool.error = asyncpg.exceptions.QueryCanceledError("canceling statement due to statement timeout")
+        with pytest.raises(WarehouseUnavailable):
+            asyncio.run(warehouse.aggregates("week"))
@@ -0,0 +1,326 @@
+# 🌲 Évaluateur NumPy des forêts d'arbres (RandomForest scikit-learn et XGBoost)
+#
+# Chaque arbre est complété en arbre binaire parfait de profondeur D et rangé
+# « en tas » dans des tableaux contigus : le nœud i a pour enfants 2i+1 et 2i+2.
+# Toutes les lignes descendent tous les arbres en même temps, un niveau par
+# itération, sans pointeurs à suivre. Les comparaisons et l'ordre des sommes
+# reproduisent ceux des bibliothèques pour obtenir exactement les mêmes
+# prédictions, sans le coût de validation et de dispatch de leur predict.
+
+import json
+import os
+
+import numpy as np
+
+# Nombre de lignes évaluées ensemble (borne la mémoire : arbres × lignes indices)
+CHUNK_ROWS = 8192
+# Au-delà, l'arbre complété deviendrait trop gros (2^D feuilles par arbre)
+MAX_DEPTH = 12
+
+
+class CompiledForest:
+    """
+    Forêt aplatie en tas :
+    - feature, threshold, missing_left : (arbres, 2^D - 1) pour les nœuds internes
+    - values : (arbres, 2^D[, classes]) pour les feuilles
+    """
+
+    kind = None
+    # Taille de lot au-delà de laquelle le predict de la bibliothèque redevient plus rapide
+    crossover_rows = 0
+
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.missing_left = arrays["missing_left"]
+        self.values = arrays["values"]
+        self.depth = int(arrays["depth"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.n_trees = self.feature.shape[0]
+        if "feature_names" in arrays:
+            self.feature_names_in_ = arrays["feature_names"]
+        n_internal = self.feature.shape[1]
+        # Décalage de chaque arbre dans les tableaux aplatis
+        self._internal_base = (np.arange(self.n_trees) * n_internal)[:, None]
+        self._leaf_base = (np.arange(self.n_trees) * self.values.shape[1])[:, None] - n_internal
+        self._flat_feature = self.feature.reshape(-1)
+        self._flat_threshold = self.threshold.reshape(-1)
+        # Vues sans copie : des tableaux projetés en mémoire (load_arrays) restent partagés
+        self._flat_missing_left = self.missing_left.reshape(-1)
+        self._flat_values = self.values.reshape((-1,) + self.values.shape[2:])
+
+    def arrays(self):
+        arrays = {
+            "kind": np.array(self.kind),
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "missing_left": self.missing_left,
+            "values": self.values,
+            "depth": np.array(self.depth),
+            "n_features": np.array(self.n_features_in_),
+        }
+        if hasattr(self, "feature_names_in_"):
+            arrays["feature_names"] = np.asarray(self.feature_names_in_).astype(str)
+        return arrays
+
+    def _goes_right(self, x, threshold):
+        raise NotImplementedError
+
+    def leaf_values(self, X):
+        """Valeur de la feuille atteinte dans chaque arbre : tableau (arbres, lignes[, classes])."""
+        n = len(X)
+        columns = np.ascontiguousarray(X.T).reshape(-1)
+        col = np.arange(n)
+        has_nan = np.isnan(columns).any()
+        slot = np.zeros((self.n_trees, n), dtype=np.intp)
+        for _ in range(self.depth):
+            node = slot + self._internal_base
+            x = columns[self._flat_feature[node] * n + col]
+            right = self._goes_right(x, self._flat_threshold[node])
+            if has_nan:
+                right = np.where(np.isnan(x), ~self._flat_missing_left[node], right)
+            slot = 2 * slot + 1 + right
+        return self._flat_values[slot + self._leaf_base]
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X doit avoir {self.n_features_in_} colonnes, reçu {X.shape}")
+        return X
+
+    def _chunks(self, X):
+        for start in range(0, len(X), CHUNK_ROWS):
+            yield start, X[start:start + CHUNK_ROWS]
+
+
+class CompiledRandomForest(CompiledForest):
+    """Équivalent de RandomForestClassifier.predict / predict_proba."""
+
+    kind = "random_forest"
+    crossover_rows = 2048
+
+    def __init__(self, arrays):
+        super().__init__(arrays)
+        self.classes_ = arrays["classes"]
+
+    def arrays(self):
+        return {**super().arrays(), "classes": self.classes_}
+
+    def _goes_right(self, x, threshold):
+        # scikit-learn : X en float32, comparé au seuil float64 avec <=
+        return ~(x <= threshold)
+
+    def predict_proba(self, X):
+        X = self._prepare(X)
+        proba = np.empty((len(X), self.values.shape[2]))
+        for start, chunk in self._chunks(X):
+            # Somme arbre par arbre, dans l'ordre de scikit-learn (accumulate est toujours
+            # séquentiel, alors que reduce passe en sommation par paires sur une seule ligne)
+            proba[start:start + len(chunk)] = np.add.accumulate(self.leaf_values(chunk), axis=0)[-1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompiledXGBRegressor(CompiledForest):
+    """Équivalent de XGBRegressor.predict (objectif de régression à lien identité)."""
+
+    kind = "xgboost_regressor"
+    crossover_rows = 128
+
+    def __init__(self, arrays):
+        super().__init__(arrays)
+        self.base_score = np.float32(arrays["base_score"])
+
+    def arrays(self):
+        return {**super().arrays(), "base_score": np.array(self.base_score)}
+
+    def _goes_right(self, x, threshold):
+        # XGBoost : comparaison stricte en float32
+        return ~(x < threshold)
+
+    def predict(self, X):
+        X = self._prepare(X)
+        out = np.empty(len(X), dtype=np.float32)
+        for start, chunk in self._chunks(X):
+            leaves = self.leaf_values(chunk)
+            # Accumulation float32 à partir de base_score, arbre par arbre comme XGBoost
+            terms = np.concatenate([np.full((1, len(chunk)), self.base_score, dtype=np.float32), leaves])
+            out[start:start + len(chunk)] = np.add.accumulate(terms, axis=0)[-1]
+        return out
+
+
+def _to_heap(trees, depth, value_shape, threshold_dtype):
+    """
+    Range des arbres décrits par (feature, seuil, gauche, droite, manquant→gauche, valeurs)
+    dans des tas de profondeur `depth`. Une feuille moins profonde est recopiée dans
+    tous les emplacements de son sous-arbre : la direction prise n'a alors plus d'effet.
+    """
+    n_internal = 2 ** depth - 1
+    n_trees = len(trees)
+    feature = np.zeros((n_trees, n_internal), dtype=np.intp)
+    threshold = np.zeros((n_trees, n_internal), dtype=threshold_dtype)
+    missing_left = np.ones((n_trees, n_internal), dtype=bool)
+    values = np.zeros((n_trees, 2 ** depth) + value_shape, dtype=trees[0][5].dtype)
+
+    for t, (feat, thr, left, right, miss, val) in enumerate(trees):
+        stack = [(0, 0)]
+        while stack:
+            node, slot = stack.pop()
+            if slot >= n_internal:
+                values[t, slot - n_internal] = val[node]
+                continue
+            if left[node] == -1:
+                stack.append((node, 2 * slot + 1))
+                stack.append((node, 2 * slot + 2))
+                continue
+            feature[t, slot] = feat[node]
+            threshold[t, slot] = thr[node]
+            missing_left[t, slot] = bool(miss[node])
+            stack.append((left[node], 2 * slot + 1))
+            stack.append((right[node], 2 * slot + 2))
+    return {"feature": feature, "threshold": threshold, "missing_left": missing_left, "values": values}
+
+
+def _add_feature_names(arrays, model):
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        arrays["feature_names"] = np.asarray(names).astype(str)
+
+
+def _check_depth(depth):
+    if depth > MAX_DEPTH:
+        raise TypeError(f"Arbres trop profonds pour l'évaluateur NumPy ({depth} > {MAX_DEPTH})")
+
+
+def compile_random_forest(model):
+    trees, depth = [], 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        total = value.sum(axis=1, keepdims=True)
+        # Depuis scikit-learn 1.4, value contient déjà les proportions par classe
+        if not np.allclose(total[tree.children_left == -1], 1):
+            total[total == 0] = 1
+            value = value / total
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+        trees.append((tree.feature, tree.threshold, tree.children_left, tree.children_right, missing_left, value))
+        depth = max(depth, tree.max_depth)
+    _check_depth(depth)
+    arrays = _to_heap(trees, depth, (len(model.classes_),), np.float64)
+    arrays.update(depth=depth, n_features=model.n_features_in_, classes=np.asarray(model.classes_).astype(str))
+    _add_feature_names(arrays, model)
+    return CompiledRandomForest(arrays)
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def _xgb_base_score(learner):
+    # « 2.6E4 » ou « [2.6E4] » selon la version de XGBoost
+    raw = learner["learner_model_param"]["base_score"]
+    return float(raw.strip("[]").split(",")[0])
+
+
+def _xgb_trees(booster):
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("reg:squarederror", "reg:squaredlogerror", "reg:absoluteerror", "reg:pseudohubererror"):
+        raise TypeError(f"Objectif XGBoost non pris en charge : {objective}")
+    gbtree = learner["gradient_booster"]
+    if gbtree["name"] != "gbtree" or int(learner["learner_model_param"].get("num_target", "1")) != 1:
+        raise TypeError("Seuls les modèles gbtree à une seule sortie sont pris en charge")
+    trees = gbtree["model"]["trees"]
+    best_iteration = booster.attr("best_iteration")
+    if best_iteration is not None:
+        trees = trees[:int(best_iteration) + 1]
+    return learner, trees
+
+
+def compile_xgb_regressor(model):
+    learner, raw_trees = _xgb_trees(model.get_booster())
+    trees, depth = [], 0
+    for tree in raw_trees:
+        left = np.array(tree["left_children"], dtype=np.intp)
+        right = np.array(tree["right_children"], dtype=np.intp)
+        conditions = np.array(tree["split_conditions"], dtype=np.float32)
+        # Pour une feuille, split_conditions contient la valeur de la feuille
+        trees.append((
+            np.array(tree["split_indices"], dtype=np.intp), conditions, left, right,
+            np.array(tree["default_left"], dtype=bool), conditions,
+        ))
+        depth = max(depth, _tree_depth(left, right))
+    _check_depth(depth)
+    arrays = _to_heap(trees, depth, (), np.float32)
+    arrays.update(
+        depth=depth,
+        n_features=int(learner["learner_model_param"]["num_feature"]),
+        base_score=_xgb_base_score(learner),
+    )
+    _add_feature_names(arrays, model)
+    return CompiledXGBRegressor(arrays)
+
+
+def compile_model(model):
+    """Aplatit un modèle pris en charge ; lève TypeError pour les autres."""
+    if isinstance(model, CompiledForest):
+        return model
+    name = type(model).__name__
+    if name == "RandomForestClassifier":
+        return compile_random_forest(model)
+    if name == "XGBRegressor":
+        return compile_xgb_regressor(model)
+    raise TypeError(f"Modèle non pris en charge par l'évaluateur NumPy : {name}")
+
+
+class HybridModel:
+    """
+    Utilise l'évaluateur NumPy pour les petits lots (latence minimale) et le predict
+    de la bibliothèque au-delà de `crossover_rows` lignes (débit maximal).
+    """
+
+    def __init__(self, model, compiled):
+        self.model = model
+        self.compiled = compiled
+        self.n_features_in_ = compiled.n_features_in_
+        if hasattr(compiled, "feature_names_in_"):
+            self.feature_names_in_ = compiled.feature_names_in_
+
+    def predict(self, X):
+        if len(X) <= self.compiled.crossover_rows:
+            return self.compiled.predict(X)
+        return self.model.predict(X)
+
+
+def save_arrays(compiled, directory):
+    """Un fichier .npy par tableau, chacun pouvant être projeté en mémoire (format `.arrays` d'`artifacts.py`)."""
+    os.makedirs(directory, exist_ok=True)
+    for name, array in compiled.arrays().items():
+        np.save(os.path.join(directory, name + ".npy"), array, allow_pickle=False)
+
+
+def load_arrays(directory, mmap_mode="r"):
+    """
+    Charge un dossier écrit par `save_arrays`. Avec `mmap_mode="r"`, les tableaux sont
+    projetés en lecture seule : les processus qui chargent le même dossier partagent
+    les pages du cache du système au lieu d'en garder chacun une copie.
+    """
+    arrays = {
+        name[:-len(".npy")]: np.load(os.path.join(directory, name), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in os.listdir(directory) if name.endswith(".npy")
+    }
+    return _from_arrays(arrays)
+
+
+def _from_arrays(arrays):
+    kinds = {cls.kind: cls for cls in (CompiledRandomForest, CompiledXGBRegressor)}
+    return kinds[str(arrays["kind"])](arrays)
+
@@ -0,0 +1,180 @@
+# 🏛️ Lecture de l'entrepôt gold (PostgreSQL) : agrégats par pays et par semaine/mois,
+# pagination par clé (keyset), choix des colonnes et pool de connexions asynchrone (asyncpg)
+
+import asyncio
+import datetime
+import os
+
+try:
+    import asyncpg
+except ImportError:  # lecture de l'entrepôt facultative
+    asyncpg = None
+
+# Vue matérialisée de etl/scripts/gold/aggregates.sql, rafraîchie après chaque chargement gold
+AGGREGATE_VIEW = "gold.mv_country_period"
+GRANULARITIES = ("week", "month")
+# Clé de pagination, toujours renvoyée (index unique de la vue)
+KEY_COLUMNS = ("iso_code", "period_start")
+AGGREGATE_COLUMNS = (
+    "country", "continent", "days",
+    "new_cases", "new_deaths", "total_cases", "total_deaths",
+    "new_cases_per_million", "new_deaths_per_million",
+    "total_vaccinations", "people_vaccinated", "people_fully_vaccinated", "total_boosters",
+    "stringency_index_avg", "stringency_index_max",
+)
+DEFAULT_PAGE_SIZE = 500
+
+
+class QueryError(ValueError):
+    """Paramètres de lecture invalides (colonne, granularité, curseur ou taille de page)."""
+
+
+class WarehouseUnavailable(RuntimeError):
+    """Entrepôt non configuré, asyncpg absent, base injoignable ou requête refusée par la base."""
+
+
+# Erreurs d'une requête à signaler comme indisponibilité (503) : réseau, délai dépassé, et erreurs
+# PostgreSQL (vue pas encore créée, requête annulée par command_timeout...)
+QUERY_ERRORS = (OSError, asyncio.TimeoutError) + ((asyncpg.PostgresError,) if asyncpg is not None else ())
+
+
+def select_columns(requested=None):
+    """Colonnes demandées (`"a,b"`), précédées de la clé de pagination ; toutes si rien n'est demandé."""
+    if not requested:
+        return list(KEY_COLUMNS + AGGREGATE_COLUMNS)
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in KEY_COLUMNS + AGGREGATE_COLUMNS]
+    if unknown:
+        raise QueryError(f"Colonnes inconnues : {', '.join(unknown)}")
+    return list(KEY_COLUMNS) + [name for name in dict.fromkeys(names) if name not in KEY_COLUMNS]
+
+
+def encode_cursor(iso_code, period_start):
+    return f"{iso_code}:{period_start.isoformat()}"
+
+
+def decode_cursor(cursor):
+    """"FRA:2021-03-01" -> ("FRA", date) : dernière clé de la page précédente."""
+    iso_code, _, period = cursor.partition(":")
+    try:
+        return iso_code, datetime.date.fromisoformat(period)
+    except ValueError:
+        raise QueryError(f"Curseur invalide : {cursor}")
+
+
+def build_query(granularity, columns, countries=None, date_from=None, date_to=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Requête paramétrée ($1, $2...) d'une page : les lignes qui suivent `after` dans l'ordre de
+    la clé (iso_code, period_start), lues par l'index unique de la vue au lieu d'un OFFSET.
+    Une ligne de plus que `limit` est demandée pour savoir s'il reste une page.
+    Les noms de colonnes viennent de `select_columns` (liste fermée) ; une granularité absente
+    de la vue (`GRANULARITIES`) lève QueryError.
+    """
+    if granularity not in GRANULARITIES:
+        raise QueryError(f"Granularité inconnue : {granularity} (attendu : {', '.join(GRANULARITIES)})")
+    args = [granularity]
+    conditions = ["granularity = $1"]
+    if countries:
+        args.append(list(countries))
+        conditions.append(f"iso_code = ANY(${len(args)}::text[])")
+    if date_from is not None:
+        args.append(date_from)
+        conditions.append(f"period_start >= ${len(args)}")
+    if date_to is not None:
+        args.append(date_to)
+        conditions.append(f"period_start <= ${len(args)}")
+    if after is not None:
+        args.extend(after)
+        conditions.append(f"(iso_code, period_start) > (${len(args) - 1}, ${len(args)})")
+    args.append(limit + 1)
+    query = (
+        f"SELECT {', '.join(columns)} FROM {AGGREGATE_VIEW}"
+        f" WHERE {' AND '.join(conditions)}"
+        f" ORDER BY iso_code, period_start LIMIT ${len(args)}"
+    )
+    return query, args
+
+
+def page(rows, columns, limit):
+    """{"columns", "rows", "next"} : lignes en listes dans l'ordre de `columns`, curseur de la page suivante ou None."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    start = columns.index("period_start")
+    values = []
+    for row in rows:
+        values.append([row[c] for c in columns])
+        values[-1][start] = values[-1][start].isoformat()
+    cursor = encode_cursor(rows[-1]["iso_code"], rows[-1]["period_start"]) if has_more else None
+    return {"columns": columns, "rows": values, "next": cursor}
+
+
+class Warehouse:
+    """
+    Accès en lecture à l'entrepôt gold.
+
+    Le pool asyncpg est créé à la première requête (le démarrage de l'API ne dépend pas de la
+    base) puis partagé par toutes les requêtes ; `close` le ferme à l'arrêt du serveur.
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=10, page_max=5000, timeout=10.0):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.page_max = page_max
+        self.timeout = timeout
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Construit l'accès à partir des variables d'environnement WAREHOUSE_*."""
+        return cls(
+            os.getenv("WAREHOUSE_DATABASE_URL", ""),
+            min_size=int(os.getenv("WAREHOUSE_POOL_MIN", "1")),
+            max_size=int(os.getenv("WAREHOUSE_POOL_MAX", "10")),
+            page_max=int(os.getenv("WAREHOUSE_PAGE_MAX", "5000")),
+            timeout=float(os.getenv("WAREHOUSE_TIMEOUT", "10")),
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.dsn) and asyncpg is not None
+
+    async def pool(self):
+        if self._pool is not None:
+            return self._pool
+        if not self.dsn:
+            raise WarehouseUnavailable("Entrepôt non configuré (WAREHOUSE_DATABASE_URL)")
+        if asyncpg is None:
+            raise WarehouseUnavailable("La lecture de l'entrepôt nécessite asyncpg")
+        async with self._lock:
+            if self._pool is None:
+                try:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn, min_size=self.min_size, max_size=self.max_size, command_timeout=self.timeout,
+                    )
+                except (OSError, asyncpg.PostgresError) as e:
+                    raise WarehouseUnavailable(f"Entrepôt injoignable : {e}")
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def aggregates(self, granularity, columns=None, countries=None, date_from=None, date_to=None,
+                         after=None, limit=DEFAULT_PAGE_SIZE):
+        """Une page des agrégats de `granularity` ("week" ou "month"), voir `build_query` et `page`."""
+        columns = select_columns(columns)
+        query, args = build_query(
+            granularity, columns, countries, date_from, date_to,
+            decode_cursor(after) if after else None, limit,
+        )
+        if not 1 <= limit <= self.page_max:
+            raise QueryError(f"limit doit être entre 1 et {self.page_max}")
+        pool = await self.pool()
+        try:
+            rows = await pool.fetch(query, *args)
+        except QUERY_ERRORS as e:
+            raise WarehouseUnavailable(f"Entrepôt indisponible : {e}")
+        return page(rows, columns, limit)